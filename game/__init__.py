@@ -1,27 +1,34 @@
-from game.menu import Menu
-from game.sprites import (
-    Boss,
-    BossOne,
-    Enemy,
-    Explosion,
-    Laser,
-    Meteor,
-    Player,
-    Pow,
-    Spritesheet,
-)
-from game.game import Game
+import importlib
 
-__all__ = [
-    "Boss",
-    "BossOne",
-    "Enemy",
-    "Explosion",
-    "Game",
-    "Laser",
-    "Menu",
-    "Meteor",
-    "Player",
-    "Pow",
-    "Spritesheet",
-]
+# Public names and the modules defining them. They are imported on first
+# use, so importing a single module of the package doesn't load pygame,
+# kezmenu3 and every sprite.
+_EXPORTS = {
+    "Boss": "game.sprites",
+    "Enemy": "game.sprites",
+    "EnemyLaser": "game.sprites",
+    "Explosion": "game.sprites",
+    "Game": "game.game",
+    "Laser": "game.sprites",
+    "Menu": "game.menu",
+    "Meteor": "game.sprites",
+    "Player": "game.sprites",
+    "Pow": "game.sprites",
+    "ScriptedBoss": "game.sprites",
+    "Spritesheet": "game.sprites",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
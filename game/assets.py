@@ -0,0 +1,194 @@
+import json
+import logging
+import mmap
+import os
+
+import pygame
+
+from game import settings
+
+logger = logging.getLogger(__name__)
+
+
+class AssetStore(object):
+    """Spritesheets decoded once into a file shared by every game on a host.
+
+    The first game to open the store decodes the spritesheets and writes
+    their pixels to the store file. The color key is turned into an alpha
+    channel, so frames need no colorkey of their own. Every game, in any
+    process, maps the file read only, so the pixels are in memory once no
+    matter how many games use them. Atlases are surfaces over the mapped
+    pixels and frames are subsurfaces of them, nothing is copied. Frames
+    aren't RLE accelerated, SDL would keep an encoded copy of each one in
+    every process. Games in the same process share the same atlases and
+    frames.
+
+    The store is rebuilt whenever a spritesheet changes.
+
+    Attributes:
+        VERSION: Bumped whenever the file layout changes.
+        ALIGNMENT: Bytes atlases are aligned to in the file, SDL expects
+            pixels to be aligned.
+        stores: Stores opened in this process, by file name.
+    """
+
+    VERSION = 2
+    ALIGNMENT = 64
+    stores = {}
+
+    @classmethod
+    def open(cls, file_name, sheets, color_key=settings.BLACK):
+        """Get the store of a file, opened once per process.
+
+        Args:
+            file_name: The store file path.
+            sheets: The spritesheets file paths.
+            color_key: The color of the transparent pixels.
+
+        Returns:
+            An AssetStore.
+        """
+        store = cls.stores.get(file_name)
+        if store is None:
+            store = cls.stores[file_name] = cls(file_name, sheets, color_key)
+        return store
+
+    def __init__(self, file_name, sheets, color_key=settings.BLACK):
+        """Maps the store file, building it if it's missing or stale.
+
+        Args:
+            file_name: The store file path.
+            sheets: The spritesheets file paths.
+            color_key: The color of the transparent pixels.
+        """
+        self.file_name = file_name
+        self.atlases = {}
+        self.frames = {}
+        key = self.describe(sheets, color_key)
+        self.index = self.load(key)
+        if self.index is None:
+            self.build(key, sheets, color_key)
+            self.index = self.load(key)
+        if self.index is None:
+            raise OSError(f"Can't open the asset store {file_name}.")
+
+    def describe(self, sheets, color_key):
+        """Get what the stored pixels depend on.
+
+        Args:
+            sheets: The spritesheets file paths.
+            color_key: The color of the transparent pixels.
+
+        Returns:
+            A dict.
+        """
+        files = {}
+        for sheet in sheets:
+            stat = os.stat(sheet)
+            files[os.path.abspath(sheet)] = [stat.st_mtime_ns, stat.st_size]
+        return {
+            "version": self.VERSION,
+            "color_key": list(color_key),
+            "sheets": files,
+        }
+
+    def load(self, key):
+        """Maps the store file.
+
+        Args:
+            key: What the stored pixels must depend on.
+
+        Returns:
+            A dict of sheet path to (offset, width, height) or None if the
+            file is missing or stale.
+        """
+        try:
+            with open(self.file_name, "rb") as f:
+                size = int.from_bytes(f.read(8), "little")
+                header = json.loads(f.read(size))
+                if header["key"] != key:
+                    return None
+                # Pages written to, if any, become private copies instead
+                # of crashing the game.
+                self.buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+        except (OSError, ValueError, KeyError):
+            return None
+        # Pixels follow the header, offsets are counted from there.
+        self.start = 8 + size
+        return header["atlases"]
+
+    def build(self, key, sheets, color_key):
+        """Decodes the spritesheets and writes the store file.
+
+        It's written aside and moved in place, so other processes never
+        see it half written.
+
+        Args:
+            key: What the stored pixels depend on.
+            sheets: The spritesheets file paths.
+            color_key: The color of the transparent pixels.
+        """
+        pixels = []
+        atlases = {}
+        offset = 0
+        for sheet in sheets:
+            image = pygame.image.load(sheet).convert()
+            image.set_colorkey(color_key)
+            data = pygame.image.tobytes(image.convert_alpha(), "BGRA")
+            data += bytes(-len(data) % self.ALIGNMENT)
+            atlases[os.path.abspath(sheet)] = (offset, *image.get_size())
+            pixels.append(data)
+            offset += len(data)
+        header = json.dumps({"key": key, "atlases": atlases}).encode()
+        # Padded with spaces so the pixels start aligned.
+        header += b" " * (-(8 + len(header)) % self.ALIGNMENT)
+        temporary = f"{self.file_name}.{os.getpid()}"
+        with open(temporary, "wb") as f:
+            f.write(len(header).to_bytes(8, "little"))
+            f.write(header)
+            for data in pixels:
+                f.write(data)
+        os.replace(temporary, self.file_name)
+        logger.info(
+            "Built the asset store %s, %.1fMB.",
+            self.file_name,
+            offset / 1024 / 1024,
+        )
+
+    def atlas(self, sheet):
+        """Get a spritesheet as a surface over the stored pixels.
+
+        Args:
+            sheet: The spritesheet file path.
+
+        Returns:
+            A pygame.Surface with per-pixel alpha. Drawing on it is safe
+            but copies the pages written to into this process.
+        """
+        sheet = os.path.abspath(sheet)
+        atlas = self.atlases.get(sheet)
+        if atlas is None:
+            offset, width, height = self.index[sheet]
+            start = self.start + offset
+            view = memoryview(self.buffer)[start : start + width * height * 4]
+            atlas = self.atlases[sheet] = pygame.image.frombuffer(
+                view, (width, height), "BGRA"
+            )
+        return atlas
+
+    def frame(self, sheet, area):
+        """Get a frame as a view of its spritesheet.
+
+        Args:
+            sheet: The spritesheet file path.
+            area: The frame (x, y, width, height) in the spritesheet.
+
+        Returns:
+            A pygame.Surface, shared with any other game in the process.
+            Drawing on it changes it for all of them.
+        """
+        key = (sheet, tuple(area))
+        frame = self.frames.get(key)
+        if frame is None:
+            frame = self.frames[key] = self.atlas(sheet).subsurface(area)
+        return frame
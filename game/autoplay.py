@@ -0,0 +1,305 @@
+import time
+from collections import defaultdict, deque
+
+import numpy
+
+from game import settings
+from game.controls import Action, Controller, InputState
+
+
+class Grid(object):
+    """Points bucketed in square cells, to find what's near something."""
+
+    def __init__(self, cell):
+        """Initializes an empty grid.
+
+        Args:
+            cell: The cell side in pixels.
+        """
+        self.cell = cell
+        self.cells = defaultdict(list)
+
+    def clear(self):
+        """Removes every item."""
+        self.cells.clear()
+
+    def insert(self, x, y, item):
+        """Adds an item at a point.
+
+        Args:
+            x: The X position.
+            y: The Y position.
+            item: Anything.
+        """
+        self.cells[(int(x) // self.cell, int(y) // self.cell)].append(item)
+
+    def near(self, x, y, distance):
+        """Get the items in the cells within a distance of a point.
+
+        Args:
+            x: The X position.
+            y: The Y position.
+            distance: How far to look, along each axis.
+
+        Returns:
+            A list of items, some may be farther than distance.
+        """
+        cell = self.cell
+        left, right = int(x - distance) // cell, int(x + distance) // cell
+        top, bottom = int(y - distance) // cell, int(y + distance) // cell
+        items = []
+        for i in range(left, right + 1):
+            for j in range(top, bottom + 1):
+                found = self.cells.get((i, j))
+                if found:
+                    items.extend(found)
+        return items
+
+
+class Autopilot(Controller):
+    """A bot playing the game, for unattended load and soak runs.
+
+    Each tick the threats near the player (enemies, meteors, bosses and
+    their shots) are looked up in a grid and their positions extrapolated
+    a few ticks ahead. Every move is tried against them at once, checking
+    hits like collide_rect_80 does, and the one leading to the fewest hits
+    wins, ties broken by getting closer to the nearest power up or below
+    the nearest target. It fires when a target is right above.
+
+    Deciding has a time budget. The nearest threats are considered first
+    and, while decisions go over budget, fewer of them are considered.
+
+    Attributes:
+        MOVES: The (actions, x, y) moves tried, x and y being directions.
+    """
+
+    MOVES = tuple(
+        (frozenset(a for a in (h, v) if a), x, y)
+        for h, x in ((None, 0), (Action.LEFT, -1), (Action.RIGHT, 1))
+        for v, y in ((None, 0), (Action.UP, -1), (Action.DOWN, 1))
+    )
+
+    def __init__(
+        self,
+        game,
+        budget=settings.AUTOPLAY_BUDGET,
+        cell=settings.AUTOPLAY_CELL,
+        lookahead=settings.AUTOPLAY_LOOKAHEAD,
+        threats=settings.AUTOPLAY_THREATS,
+    ):
+        """Initializes the bot.
+
+        Args:
+            game: The running game instance.
+            budget: The decision time budget per tick in milliseconds.
+            cell: The grid cell side in pixels.
+            lookahead: The ticks ahead where moves are tried.
+            threats: The maximum number of threats considered.
+        """
+        self.game = game
+        self.budget = budget / 1000
+        self.grid = Grid(cell)
+        self.ticks = numpy.array(lookahead, numpy.float32)
+        # Sooner collisions are worse.
+        self.weights = 1 / self.ticks
+        self.directions = numpy.array(
+            [(x, y) for _, x, y in self.MOVES], numpy.float32
+        )
+        self.max_threats = threats
+        self.limit = threats
+        self.times = deque(maxlen=settings.TICK_RATE)
+        self.decisions = 0
+        self.over_budget = 0
+
+    @property
+    def decision_time(self):
+        """Average decision time in milliseconds."""
+        return sum(self.times) / len(self.times) * 1000 if self.times else 0
+
+    def control(self, player):
+        """Decides what the player does this tick.
+
+        Args:
+            player: The Player being controlled.
+
+        Returns:
+            An InputState.
+        """
+        if player.hidden:
+            return InputState.EMPTY
+        start = time.perf_counter()
+        state = self.decide(player)
+        elapsed = time.perf_counter() - start
+        self.times.append(elapsed)
+        self.decisions += 1
+        if elapsed > self.budget:
+            self.over_budget += 1
+            self.limit = max(self.limit // 2, 4)
+        elif elapsed < self.budget / 2 and self.limit < self.max_threats:
+            self.limit += 1
+        return state
+
+    def threats(self, player, distance):
+        """Get the threats near the player.
+
+        Args:
+            player: The Player being controlled.
+            distance: How far to look.
+
+        Returns:
+            An array of (x, y, speed x, speed y, half width, half height)
+            rows, only the nearest when there are too many. Sizes are
+            scaled down to 80% like collide_rect_80 does.
+        """
+        game = self.game
+        px, py = player.rect.center
+        self.grid.clear()
+        for group in (game.enemies, game.meteors, game.enemies_shots):
+            for sprite in group:
+                rect = sprite.rect
+                self.grid.insert(
+                    rect.centerx,
+                    rect.centery,
+                    (
+                        rect.centerx,
+                        rect.centery,
+                        sprite.speedx,
+                        sprite.speedy,
+                        rect.width * 0.4,
+                        rect.height * 0.4,
+                    ),
+                )
+        found = self.grid.near(px, py, distance)
+        # Bosses are few and big, they're always near.
+        found.extend(
+            (
+                *boss.rect.center,
+                0,
+                0,
+                boss.rect.width * 0.4,
+                boss.rect.height * 0.4,
+            )
+            for boss in game.bosses
+        )
+        rows = numpy.array(found, numpy.float32).reshape(-1, 6)
+        shots = game.projectiles
+        if shots.count:
+            pos, vel = shots.pos[: shots.count], shots.vel[: shots.count]
+            near = numpy.abs(pos - (px, py)).max(axis=1) < distance
+            flying = near & (shots.impact[: shots.count] < 0)
+            if flying.any():
+                rows = numpy.concatenate(
+                    (
+                        rows,
+                        numpy.column_stack(
+                            (
+                                pos[flying],
+                                vel[flying],
+                                numpy.full(
+                                    (int(flying.sum()), 2),
+                                    shots.radius,
+                                    numpy.float32,
+                                ),
+                            )
+                        ),
+                    )
+                )
+        if len(rows) > self.limit:
+            away = numpy.abs(rows[:, :2] - (px, py)).sum(axis=1)
+            rows = rows[numpy.argsort(away)[: self.limit]]
+        return rows
+
+    def goal(self, player):
+        """Get where the player wants to be and its target.
+
+        Args:
+            player: The Player being controlled.
+
+        Returns:
+            A ((x, y), target) tuple, target is a sprite or None.
+        """
+        game = self.game
+        px, py = player.rect.center
+        home = game.display.current_h - 100
+        pows = [p for p in game.pows if p.rect.bottom < player.rect.top]
+        if pows:
+            pow_ = min(pows, key=lambda p: abs(p.rect.centerx - px))
+            return (pow_.rect.centerx, home), None
+        targets = [
+            sprite
+            for group in (game.bosses, game.enemies)
+            for sprite in group
+            if 0 < sprite.rect.bottom < player.rect.top
+        ]
+        if not targets:
+            return (game.display.current_w / 2, home), None
+        target = min(targets, key=lambda t: abs(t.rect.centerx - px))
+        # Lead the target by the time the laser takes to get there.
+        lead = (py - target.rect.centery) / 10 * target.speedx
+        return (target.rect.centerx + lead, home), target
+
+    def decide(self, player):
+        """Picks the safest move towards the goal.
+
+        Args:
+            player: The Player being controlled.
+
+        Returns:
+            An InputState.
+        """
+        game = self.game
+        rect = player.rect
+        speed = settings.SPEED
+        distance = self.ticks[-1] * (speed + 10) + 100
+        threats = self.threats(player, distance)
+        (gx, gy), target = self.goal(player)
+
+        # Player positions for each move and tick, kept on screen.
+        steps = self.directions[:, None, :] * self.ticks[None, :, None]
+        positions = numpy.array(rect.center, numpy.float32) + steps * speed
+        half_w, half_h = rect.width / 2, rect.height / 2
+        numpy.clip(
+            positions[..., 0],
+            10 + half_w,
+            game.display.current_w - 10 - half_w,
+            out=positions[..., 0],
+        )
+        numpy.clip(
+            positions[..., 1],
+            30 + half_h,
+            game.display.current_h - 10 - half_h,
+            out=positions[..., 1],
+        )
+        cost = numpy.abs(positions[:, 0, 0] - gx) + numpy.abs(
+            positions[:, 0, 1] - gy
+        )
+        if len(threats):
+            # Threat positions for each tick.
+            ahead = (
+                threats[None, :, :2]
+                + threats[None, :, 2:4] * self.ticks[:, None, None]
+            )
+            gap = numpy.abs(positions[:, :, None, :] - ahead[None, :, :, :])
+            reach = threats[:, 4:6] + (half_w * 0.8 + 8, half_h * 0.8 + 8)
+            hits = (gap < reach).all(axis=-1)
+            danger = (hits.sum(axis=-1) * self.weights).sum(axis=-1)
+            cost += danger * 10000
+        actions, _, _ = self.MOVES[int(numpy.argmin(cost))]
+        if target is not None and (
+            abs(target.rect.centerx - rect.centerx) < target.rect.width / 2
+        ):
+            actions |= {Action.FIRE}
+        return InputState(actions, frozenset(), frozenset(), False, ())
+
+    def report(self):
+        """Describes the decision cost.
+
+        Returns:
+            A string with the average decision time, the threats
+            considered and the decisions over budget.
+        """
+        return (
+            f"autoplay {self.decision_time:.2f}ms/tick "
+            f"{self.limit} threats {self.over_budget}/{self.decisions} "
+            f"over budget"
+        )
@@ -0,0 +1,111 @@
+import logging
+import random
+import time
+from collections import deque
+
+import pygame
+
+from game import settings
+
+logger = logging.getLogger(__name__)
+
+
+class Starfield(object):
+    """Scrolling parallax starfield.
+
+    Each layer is rendered once into a screen sized surface that tiles
+    vertically, so drawing a frame only takes two copies per layer. The
+    layers never change afterwards, renderers drawing from textures
+    upload them once. The cost is measured on every frame and the nearest
+    layers are dropped if the average goes over the budget. Scrolling can
+    be paused, it resumes from where it stopped.
+    """
+
+    def __init__(
+        self,
+        size,
+        layers=settings.STARFIELD_LAYERS,
+        budget=settings.STARFIELD_BUDGET,
+    ):
+        """Renders the starfield layers.
+
+        Args:
+            size: The width and height of the screen.
+            layers: A list of (stars, speed, brightness, radius) tuples,
+                from the farthest to the nearest layer. Speed is given in
+                pixels per second.
+            budget: The maximum average draw time in milliseconds.
+        """
+        self.width, self.height = size
+        self.budget = budget
+        self.layers = []
+        for i, (stars, speed, brightness, radius) in enumerate(layers):
+            surface = pygame.Surface(size).convert()
+            surface.fill(settings.BLACK)
+            for _ in range(stars):
+                x = random.randrange(self.width)
+                y = random.randrange(self.height)
+                shade = random.randint(brightness // 2, brightness)
+                # Stars crossing the top or bottom edge are drawn on the
+                # other side too, so tiles join without a seam.
+                for dy in (-self.height, 0, self.height):
+                    pygame.draw.circle(
+                        surface, (shade, shade, shade), (x, y + dy), radius
+                    )
+            # Only the farthest layer is opaque, it clears the screen.
+            if i:
+                surface.set_colorkey(settings.BLACK, pygame.RLEACCEL)
+            self.layers.append((surface, speed))
+        self.times = deque(maxlen=settings.FPS)
+        # Milliseconds spent paused and when the current pause started.
+        self.offset = 0
+        self.paused = None
+
+    @property
+    def draw_time(self):
+        """Average draw time in milliseconds."""
+        return sum(self.times) / len(self.times) * 1000 if self.times else 0
+
+    def pause(self):
+        """Stops scrolling."""
+        if self.paused is None:
+            self.paused = pygame.time.get_ticks()
+
+    def resume(self):
+        """Scrolls again from where it stopped."""
+        if self.paused is not None:
+            self.offset += pygame.time.get_ticks() - self.paused
+            self.paused = None
+
+    def draw(self, renderer):
+        """Draws the starfield under whatever is drawn next.
+
+        Args:
+            renderer: The game Renderer, layers are copied with it.
+
+        Returns:
+            The number of copies.
+        """
+        start = time.perf_counter()
+        now = pygame.time.get_ticks() if self.paused is None else self.paused
+        seconds = (now - self.offset) / 1000
+        for layer, speed in self.layers:
+            y = int(seconds * speed) % self.height
+            renderer.copy(layer, (0, y))
+            renderer.copy(layer, (0, y - self.height))
+        self.times.append(time.perf_counter() - start)
+
+        if (
+            len(self.times) == self.times.maxlen
+            and self.draw_time > self.budget
+            and len(self.layers) > 1
+        ):
+            logger.warning(
+                "Starfield takes %.2fms per frame, over the %.2fms budget, "
+                "dropping a layer.",
+                self.draw_time,
+                self.budget,
+            )
+            self.layers.pop()
+            self.times.clear()
+        return len(self.layers) * 2
@@ -0,0 +1,128 @@
+import json
+import math
+
+from game import settings
+
+
+class Pattern(object):
+    """A bullet pattern with every volley computed up front.
+
+    Each volley is a list of shots as (x, y, speedx, speedy) tuples, where
+    x and y are offsets from the bottom center of the boss. Patterns are
+    compiled once when loaded, firing is just a lookup.
+
+    Pattern types:
+        shots: A fixed list of shots.
+        spread: A fan of shots facing down.
+        spiral: Shots all around, rotated a bit on each volley.
+        aimed: A fan of shots facing the player.
+    """
+
+    def __init__(self, definition):
+        """Compiles a pattern.
+
+        Args:
+            definition: A dict describing the pattern.
+
+        Raises:
+            ValueError: If the pattern type is unknown.
+        """
+        kind = definition["type"]
+        count = definition.get("count", 1)
+        arc = definition.get("arc", 0)
+        speed = definition.get("speed", 10)
+        origin = definition.get("origin", (0, 30))
+        self.aimed = kind == "aimed"
+        if kind == "shots":
+            self.volleys = [[tuple(shot) for shot in definition["shots"]]]
+        elif kind == "spread":
+            self.volleys = [fan(count, arc, 90, speed, origin)]
+        elif kind == "spiral":
+            step = definition["step"]
+            turns = 360 // math.gcd(step, 360)
+            self.volleys = [
+                fan(count, 360, 90 + i * step, speed, origin)
+                for i in range(turns)
+            ]
+        elif kind == "aimed":
+            directions = settings.AIM_DIRECTIONS
+            self.volleys = [
+                fan(count, arc, i * 360 / directions, speed, origin)
+                for i in range(directions)
+            ]
+        else:
+            raise ValueError(f"Unknown bullet pattern {kind}.")
+
+    def volley(self, count, aim=90):
+        """Get the shots of a volley.
+
+        Args:
+            count: How many volleys were fired before this one.
+            aim: The direction of the player in degrees, 90 is down.
+
+        Returns:
+            A list of (x, y, speedx, speedy) tuples.
+        """
+        if self.aimed:
+            index = round(aim * len(self.volleys) / 360)
+            return self.volleys[index % len(self.volleys)]
+        return self.volleys[count % len(self.volleys)]
+
+
+def fan(count, arc, direction, speed, origin):
+    """Computes shots evenly spread over an arc.
+
+    Args:
+        count: Number of shots.
+        arc: The arc width in degrees, 360 for a full circle.
+        direction: The arc center in degrees, 90 is down.
+        speed: The shots speed.
+        origin: The X and Y offsets the shots start from.
+
+    Returns:
+        A list of (x, y, speedx, speedy) tuples.
+    """
+    if count == 1:
+        angles = [direction]
+    elif arc >= 360:
+        angles = [direction + i * 360 / count for i in range(count)]
+    else:
+        step = arc / (count - 1)
+        angles = [direction - arc / 2 + i * step for i in range(count)]
+    x, y = origin
+    return [
+        (
+            x,
+            y,
+            round(math.cos(math.radians(a)) * speed, 2),
+            round(math.sin(math.radians(a)) * speed, 2),
+        )
+        for a in angles
+    ]
+
+
+def load_bosses(file_name=settings.BOSSES_DEF):
+    """Loads the bosses definitions.
+
+    Patterns referenced by the bosses attacks are replaced by compiled
+    Pattern instances, shared by every boss using them. The spritesheet
+    has a single boss ship, so every boss shows it on purpose and they
+    are told apart by their moves and attacks.
+
+    Args:
+        file_name (str): Bosses definitions (full path) file name.
+
+    Returns:
+        A list of dicts, one per boss in order of appearance.
+    """
+    with open(file_name) as f:
+        data = json.load(f)
+    patterns = {
+        name: Pattern(definition)
+        for name, definition in data["patterns"].items()
+    }
+    bosses = data["bosses"]
+    for boss in bosses:
+        for attack in boss["attacks"]:
+            attack["pattern"] = patterns[attack["pattern"]]
+    return bosses
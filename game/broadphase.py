@@ -0,0 +1,397 @@
+import logging
+import math
+
+import numpy
+import pygame
+
+from game import settings
+
+logger = logging.getLogger(__name__)
+
+# Columns of the sprites array: center, speed, extent and group.
+COLUMNS = 6
+# (source, target) groups the worker finds pairs for.
+PAIRS = (
+    ("shots", "enemies"),
+    ("shots", "meteors"),
+    ("enemies_shots", "enemies"),
+    ("enemies_shots", "meteors"),
+    ("meteors", "meteors"),
+)
+GROUPS = ("enemies", "meteors", "shots", "enemies_shots")
+
+
+def boxes(sprites, margin):
+    """Get the boxes sprites can be in during the next tick.
+
+    Each box covers a sprite at its current position and moved by its
+    speed, with any rotation, plus a margin for speed changes.
+
+    Args:
+        sprites: An array of sprites rows.
+        margin: Pixels added on each side.
+
+    Returns:
+        A (left, top, right, bottom) tuple of arrays.
+    """
+    x, y, speedx, speedy, extent = sprites[:, :5].T
+    reach = extent + margin
+    return (
+        numpy.minimum(x, x + speedx) - reach,
+        numpy.minimum(y, y + speedy) - reach,
+        numpy.maximum(x, x + speedx) + reach,
+        numpy.maximum(y, y + speedy) + reach,
+    )
+
+
+def find_pairs(sprites, margin):
+    """Finds the sprites that may collide during the next tick.
+
+    Args:
+        sprites: An array of sprites rows, the group column being the
+            index of the group in GROUPS.
+        margin: Pixels added around each sprite.
+
+    Returns:
+        An array of (source row, target row) pairs, sorted by source.
+    """
+    left, top, right, bottom = boxes(sprites, margin)
+    group = sprites[:, 5].astype(numpy.int32)
+    found = []
+    for source, target in PAIRS:
+        sources = numpy.flatnonzero(group == GROUPS.index(source))
+        targets = numpy.flatnonzero(group == GROUPS.index(target))
+        if not len(sources) or not len(targets):
+            continue
+        overlap = (
+            (left[sources, None] <= right[None, targets])
+            & (right[sources, None] >= left[None, targets])
+            & (top[sources, None] <= bottom[None, targets])
+            & (bottom[sources, None] >= top[None, targets])
+        )
+        i, j = numpy.nonzero(overlap)
+        pairs = numpy.column_stack((sources[i], targets[j]))
+        found.append(pairs[pairs[:, 0] != pairs[:, 1]])
+    if not found:
+        return numpy.zeros((0, 2), numpy.int32)
+    pairs = numpy.concatenate(found)
+    return pairs[numpy.argsort(pairs[:, 0], kind="stable")]
+
+
+def work(memory, capacity, max_pairs, margin, connection):
+    """Worker process main loop, finds pairs until told to stop.
+
+    The main process sends the number of sprites written to the shared
+    memory, pairs are written back and their number sent, or -1 when
+    there are more than max_pairs.
+
+    Args:
+        memory: The shared multiprocessing.RawArray.
+        capacity: The maximum number of sprites.
+        max_pairs: The maximum number of pairs.
+        margin: Pixels added around each sprite.
+        connection: The worker end of a multiprocessing.Pipe.
+    """
+    sprites, pairs = views(memory, capacity, max_pairs)
+    try:
+        while True:
+            count = connection.recv()
+            if count is None:
+                break
+            found = find_pairs(sprites[:count], margin)
+            if len(found) > max_pairs:
+                connection.send(-1)
+                continue
+            pairs[: len(found)] = found
+            connection.send(len(found))
+    except (EOFError, KeyboardInterrupt):
+        pass
+
+
+def views(memory, capacity, max_pairs):
+    """Get the arrays over the shared memory.
+
+    Args:
+        memory: A multiprocessing.RawArray of bytes.
+        capacity: The maximum number of sprites.
+        max_pairs: The maximum number of pairs.
+
+    Returns:
+        A (sprites, pairs) tuple of arrays.
+    """
+    sprites = numpy.frombuffer(
+        memory, numpy.float32, capacity * COLUMNS
+    ).reshape(capacity, COLUMNS)
+    pairs = numpy.frombuffer(
+        memory, numpy.int32, max_pairs * 2, sprites.nbytes
+    ).reshape(max_pairs, 2)
+    return sprites, pairs
+
+
+class Broadphase(object):
+    """Finds what sprites may hit in a worker process.
+
+    At the end of each tick the center, speed and extent of enemies,
+    meteors, shots and enemies shots are written to arrays in shared
+    memory. While the main process draws the frame, a worker process
+    moves their boxes one tick ahead and finds the pairs that may meet,
+    with a margin for speed changes. The next tick, sprites only test
+    those for collision. Hit tests are still done by the sprites, in the
+    same order, so results are the same as testing whole groups.
+
+    Sprites that teleport, like respawning mobs, tell so with moved().
+    Those and the sprites added since the arrays were written are always
+    tested, sprites the worker doesn't know test whole groups. Without a
+    worker every sprite tests whole groups.
+
+    Sprites still move in the main process. Their moves are interleaved
+    with their hit tests, which queue effects and change speeds, so only
+    finding the pairs runs in parallel with the game.
+    """
+
+    def __init__(
+        self,
+        game,
+        worker=settings.COLLISION_WORKER,
+        capacity=settings.COLLISION_WORKER_CAPACITY,
+        max_pairs=settings.COLLISION_WORKER_PAIRS,
+        margin=settings.COLLISION_WORKER_MARGIN,
+        verify=settings.COLLISION_WORKER_VERIFY,
+    ):
+        """Starts the worker process, if any.
+
+        Args:
+            game: The running game instance.
+            worker: True to find pairs in a worker process.
+            capacity: The maximum number of sprites sent to the worker.
+            max_pairs: The maximum number of pairs found by the worker.
+            margin: Pixels a sprite may stray per tick from where the
+                worker expects it.
+            verify: True to check every list of candidates against the
+                whole group, for testing.
+        """
+        self.game = game
+        self.capacity = capacity
+        self.margin = margin
+        self.verify = verify
+        self.enabled = False
+        self.pending = False
+        self.rows = {}
+        self.sprites = []
+        self.starts = []
+        self.found = []
+        self.moved_sprites = set()
+        self.fresh = {}
+        self.queries = 0
+        self.narrowed = 0
+        self.misses = 0
+        if not worker:
+            return
+        import multiprocessing
+
+        # Forking a process using SDL isn't safe.
+        context = multiprocessing.get_context("spawn")
+        size = capacity * COLUMNS * 4 + max_pairs * 2 * 4
+        # Shared with the worker when it's started.
+        self.memory = context.RawArray("b", size)
+        self.array, self.pairs = views(self.memory, capacity, max_pairs)
+        self.connection, child = context.Pipe()
+        self.process = context.Process(
+            target=work,
+            args=(self.memory, capacity, max_pairs, margin, child),
+            name="broadphase",
+            daemon=True,
+        )
+        self.process.start()
+        self.enabled = True
+
+    def submit(self):
+        """Sends the sprites to the worker, called at the end of a tick."""
+        if not self.enabled:
+            return
+        self.collect()
+        game = self.game
+        self.sprites = [
+            sprite for name in GROUPS for sprite in getattr(game, name)
+        ][: self.capacity]
+        self.rows = {sprite: i for i, sprite in enumerate(self.sprites)}
+        groups = {name: i for i, name in enumerate(GROUPS)}
+        count = len(self.sprites)
+        if count:
+            self.array[:count] = [
+                (
+                    s.rect.centerx,
+                    s.rect.centery,
+                    s.speedx,
+                    s.speedy,
+                    max(math.hypot(*s.rect.size) / 2, s.radius),
+                    groups[s.component],
+                )
+                for s in self.sprites
+            ]
+        self.moved_sprites.clear()
+        self.fresh.clear()
+        self.connection.send(count)
+        self.pending = True
+
+    def collect(self):
+        """Gets the pairs found by the worker, waiting if needed."""
+        if not self.pending:
+            return
+        self.pending = False
+        count = self.connection.recv()
+        if count < 0:
+            logger.warning("Too many pairs, testing whole groups.")
+            self.rows = {}
+            count = 0
+        pairs = self.pairs[:count]
+        # The targets of each row are found[starts[row]:starts[row + 1]].
+        self.starts = numpy.searchsorted(
+            pairs[:, 0], numpy.arange(len(self.sprites) + 1)
+        ).tolist()
+        self.found = [self.sprites[j] for j in pairs[:, 1].tolist()]
+
+    def moved(self, sprite):
+        """Tells a sprite has moved other than by its speed.
+
+        Args:
+            sprite: The pygame.sprite.Sprite moved.
+        """
+        if self.enabled:
+            self.moved_sprites.add(sprite)
+
+    def near(self, sprite, group):
+        """Get what a sprite may hit in a group this tick.
+
+        Args:
+            sprite: A sprite testing for collisions.
+            group: The Index of the sprites it tests.
+
+        Returns:
+            The sprites to test, in the group order. It may be the group
+            itself.
+        """
+        if not self.enabled:
+            return group
+        self.collect()
+        row = self.rows.get(sprite)
+        if row is None or sprite in self.moved_sprites:
+            return group
+        self.queries += 1
+        positions = group.positions
+        # Targets are found in the group order, as long as no other
+        # sprite is added.
+        found = [
+            s
+            for s in self.found[self.starts[row] : self.starts[row + 1]]
+            if s in positions
+        ]
+        extra = self.added(group) + [
+            s for s in self.moved_sprites if s in positions
+        ]
+        if extra:
+            found = sorted(set(found).union(extra), key=positions.get)
+        self.narrowed += len(group) - len(found)
+        if self.verify:
+            return self.check(sprite, group, found)
+        return found
+
+    def added(self, group):
+        """Get the sprites added to a group since the worker got it.
+
+        Sprites are only appended and slots compacted before the systems
+        update, so they're the ones after the first unknown sprite.
+
+        Args:
+            group: An Index.
+
+        Returns:
+            A list of sprites.
+        """
+        start = self.fresh.get(group.name)
+        if start is None:
+            start = len(group.slots)
+            for i, sprite in enumerate(group.slots):
+                if sprite is not None and sprite not in self.rows:
+                    start = i
+                    break
+            self.fresh[group.name] = start
+        return [sprite for sprite in group.slots[start:] if sprite is not None]
+
+    def check(self, sprite, group, found):
+        """Checks nothing a sprite may hit was left out.
+
+        Args:
+            sprite: A sprite testing for collisions.
+            group: The Index of the sprites it tests.
+            found: The candidates.
+
+        Returns:
+            The candidates or the group if any was missing.
+        """
+        area = self.reach(sprite)
+        missing = [
+            target
+            for target in group
+            if target not in found
+            and target is not sprite
+            and area.colliderect(self.reach(target))
+        ]
+        if not missing:
+            return found
+        self.misses += 1
+        logger.warning(
+            "%s missed %d %s, testing the whole group.",
+            type(sprite).__name__,
+            len(missing),
+            group.name,
+        )
+        return group
+
+    @staticmethod
+    def reach(sprite):
+        """Get the area hit tests may find a sprite in this tick.
+
+        It covers the sprite rect where it is and moved back by its speed,
+        as swept tests see it, and its circle, as circle tests see it.
+
+        Args:
+            sprite: A pygame.sprite.Sprite with speedx, speedy and radius.
+
+        Returns:
+            A pygame.Rect, with a pixel more on each side for rounding.
+        """
+        rect = sprite.rect
+        radius = sprite.radius
+        circle = pygame.Rect(0, 0, 2 * radius, 2 * radius)
+        circle.center = rect.center
+        return (
+            rect.union(rect.move(-sprite.speedx, -sprite.speedy))
+            .union(circle)
+            .inflate(2, 2)
+        )
+
+    def close(self):
+        """Stops the worker and frees the shared memory."""
+        if not self.enabled:
+            return
+        self.enabled = False
+        try:
+            self.collect()
+            self.connection.send(None)
+        except (OSError, EOFError):
+            pass
+        self.process.join(1)
+        del self.array, self.pairs, self.memory
+
+    def report(self):
+        """Describes the candidates.
+
+        Returns:
+            A string with the share of the tests left out and the
+            candidates found missing when verifying.
+        """
+        if not self.enabled:
+            return "broadphase off"
+        narrowed = self.narrowed / max(self.queries, 1)
+        return f"broadphase {narrowed:.1f} skipped/query {self.misses} misses"
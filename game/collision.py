@@ -0,0 +1,249 @@
+import math
+import weakref
+from operator import itemgetter
+
+import pygame
+
+from game import settings
+
+# Bitmasks are built once per image and dropped along with it.
+masks = weakref.WeakKeyDictionary()
+# Rotated variants are keyed by the original image and the angle.
+rotated_masks = weakref.WeakKeyDictionary()
+# Number of sprite pairs tested for collision since the game started.
+pairs = 0
+
+
+def count_pairs(amount):
+    """Counts collision tests done without a collided callback.
+
+    Args:
+        amount: The number of pairs tested.
+    """
+    global pairs
+    pairs += amount
+
+
+def counted(collided):
+    """Wraps a collided callback so every pair it tests is counted.
+
+    Args:
+        collided: A callback taking two sprites, like the ones given to
+            pygame.sprite.spritecollide.
+
+    Returns:
+        The wrapped callback.
+    """
+
+    def wrapper(left, right):
+        global pairs
+        pairs += 1
+        return collided(left, right)
+
+    return wrapper
+
+
+collide_circle = counted(pygame.sprite.collide_circle)
+# The player is hit when rects scaled down to 80% overlap.
+collide_rect_80 = counted(pygame.sprite.collide_rect_ratio(0.8))
+
+
+def get_mask(image):
+    """Get the bitmask of an image.
+
+    The mask is built on first use and cached for as long as the image
+    exists, so atlas frames are only processed once.
+
+    Args:
+        image: A pygame.Surface.
+
+    Returns:
+        A pygame.mask.Mask instance.
+    """
+    mask = masks.get(image)
+    if mask is None:
+        mask = masks[image] = pygame.mask.from_surface(image)
+    return mask
+
+
+def get_sprite_mask(sprite):
+    """Get the bitmask of what a sprite is showing.
+
+    Rotated sprites (e.g. meteors) get a new surface on each rotation, so
+    their masks are cached by original image and angle instead. They're
+    built from the original rotated, sprites drawn from textures show
+    their original and are only rotated when drawn.
+
+    Args:
+        sprite: A pygame.sprite.Sprite.
+
+    Returns:
+        A pygame.mask.Mask instance.
+    """
+    original = getattr(sprite, "_image", None)
+    if original is None:
+        return get_mask(sprite.image)
+    angles = rotated_masks.get(original)
+    if angles is None:
+        angles = rotated_masks[original] = {}
+    mask = angles.get(sprite.rot)
+    if mask is None:
+        mask = angles[sprite.rot] = pygame.mask.from_surface(
+            pygame.transform.rotate(original, sprite.rot)
+        )
+    return mask
+
+
+def mask_position(sprite, mask):
+    """Get where the bitmask of a sprite is.
+
+    Masks are centered on the sprite rect, it's the rect top left corner
+    unless the rect is the unrotated one of a sprite rotated when drawn.
+
+    Args:
+        sprite: A pygame.sprite.Sprite.
+        mask: The sprite pygame.mask.Mask.
+
+    Returns:
+        The X and Y position of the mask top left corner.
+    """
+    width, height = mask.get_size()
+    rect = sprite.rect
+    return rect.centerx - width // 2, rect.centery - height // 2
+
+
+def time_of_impact(offset, motion, radius):
+    """Get when a point moving in a straight line is within a circle.
+
+    Args:
+        offset: The X and Y position of the point from the circle center
+            at the start of the tick.
+        motion: How far the point moves from the circle center, on X and
+            Y axis, during the tick.
+        radius: The circle radius.
+
+    Returns:
+        An (enter, leave) tuple of fractions of the tick or None if the
+        point isn't within the circle during the tick.
+    """
+    x, y = offset
+    dx, dy = motion
+    a = dx * dx + dy * dy
+    b = x * dx + y * dy
+    c = x * x + y * y - radius * radius
+    if a == 0:
+        return (0, 1) if c <= 0 else None
+    discriminant = b * b - a * c
+    if discriminant < 0:
+        return None
+    root = math.sqrt(discriminant)
+    enter, leave = (-b - root) / a, (-b + root) / a
+    if leave < 0 or enter > 1:
+        return None
+    return max(enter, 0), min(leave, 1)
+
+
+def sweep_masks(mask, rect, motion, target, enter, leave):
+    """Get when a moving bitmask first overlaps a moving sprite.
+
+    The masks are compared at steps short enough for the thinner of them
+    not to be skipped over.
+
+    Args:
+        mask: The moving pygame.mask.Mask.
+        rect: Where the mask is at the end of the tick.
+        motion: How far the mask moved, on X and Y axis, during the tick.
+        target: A sprite with rect and image, at the end of the tick and
+            moving by its speedx and speedy, if any.
+        enter: When to start comparing, a fraction of the tick.
+        leave: When to stop comparing, a fraction of the tick.
+
+    Returns:
+        The fraction of the tick when they first overlap or None.
+    """
+    target_mask = get_sprite_mask(target)
+    dx = motion[0] - getattr(target, "speedx", 0)
+    dy = motion[1] - getattr(target, "speedy", 0)
+    target_x, target_y = mask_position(target, target_mask)
+    x = target_x - rect.x
+    y = target_y - rect.y
+    step = max(min(*rect.size, *target.rect.size) / 2, 1)
+    steps = max(math.ceil(math.hypot(dx, dy) * (leave - enter) / step), 1)
+    for i in range(steps + 1):
+        time = enter + (leave - enter) * i / steps
+        back = 1 - time
+        offset = (round(x + dx * back), round(y + dy * back))
+        if mask.overlap(target_mask, offset) is not None:
+            return time
+    return None
+
+
+def sweep(shot, start, targets, pixels=None):
+    """Swept collision detection of a fast shot during the last tick.
+
+    Testing only where the shot ends up lets it go through anything
+    thinner than its step, so the whole way is tested instead. Shot and
+    targets are moved back to where they were at the start of the tick
+    and the shot path, relative to each target, is tested against their
+    bounding circles. With pixels on, the masks along the part of the path
+    within the circles are then compared.
+
+    Args:
+        shot: A sprite with rect, radius and image, at the end of the tick.
+        start: The X and Y center of the shot at the start of the tick.
+        targets: Sprites with rect and image, at the end of the tick and
+            moving by their speedx and speedy, if any.
+        pixels: False to test circles only, like collide_circle, None to
+            follow settings.PIXEL_COLLISION.
+
+    Returns:
+        A list of (time, target) tuples ordered by time of impact, times
+        are fractions of the tick.
+    """
+    global pairs
+    if pixels is None:
+        pixels = settings.PIXEL_COLLISION
+    rect = shot.rect
+    motion = (rect.centerx - start[0], rect.centery - start[1])
+    area = rect.union(rect.move(-motion[0], -motion[1]))
+    if pixels:
+        mask = get_sprite_mask(shot)
+        reach = math.hypot(*rect.size) / 2
+    else:
+        reach = shot.radius
+    hits = []
+    for target in targets:
+        speedx = getattr(target, "speedx", 0)
+        speedy = getattr(target, "speedy", 0)
+        target_rect = target.rect
+        if not area.colliderect(
+            target_rect.union(target_rect.move(-speedx, -speedy))
+        ):
+            continue
+        pairs += 1
+        if pixels:
+            radius = math.hypot(*target_rect.size) / 2
+        else:
+            radius = getattr(target, "radius", None)
+            if radius is None:
+                radius = math.hypot(*target_rect.size) / 2
+        # The shot path as seen from the target.
+        dx, dy = motion[0] - speedx, motion[1] - speedy
+        times = time_of_impact(
+            (
+                start[0] - target_rect.centerx + speedx,
+                start[1] - target_rect.centery + speedy,
+            ),
+            (dx, dy),
+            reach + radius,
+        )
+        if times is None:
+            continue
+        time = times[0]
+        if pixels:
+            time = sweep_masks(mask, rect, motion, target, *times)
+            if time is None:
+                continue
+        hits.append((time, target))
+    hits.sort(key=itemgetter(0))
+    return hits
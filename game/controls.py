@@ -0,0 +1,282 @@
+import time
+from collections import deque, namedtuple
+from enum import Enum
+
+import pygame
+
+from game import settings
+
+
+class Action(Enum):
+    """Things the player can do, keys and buttons are bound to them."""
+
+    LEFT = "left"
+    RIGHT = "right"
+    UP = "up"
+    DOWN = "down"
+    FIRE = "fire"
+    CONFIRM = "confirm"
+    BACK = "back"
+    REWIND = "rewind"
+    PAUSE = "pause"
+
+
+class InputState(
+    namedtuple("InputState", ["held", "pressed", "released", "quit", "events"])
+):
+    """The input of a single tick, it never changes once sampled.
+
+    Attributes:
+        held: A frozenset of actions held down at the end of the tick.
+        pressed: A frozenset of actions pressed during the tick.
+        released: A frozenset of actions released during the tick.
+        quit: True if the window was closed.
+        events: A tuple of the pygame events read during the tick, for
+            widgets handling events on their own.
+    """
+
+    def active(self, action):
+        """Tells if an action is held or was pressed during the tick.
+
+        A key tapped between two ticks is not held anymore when sampled,
+        but it still counts.
+        """
+        return action in self.held or action in self.pressed
+
+
+InputState.EMPTY = InputState(frozenset(), frozenset(), frozenset(), False, ())
+
+
+class Controller(object):
+    """Decides what a player does, a human at the controls or a bot."""
+
+    def control(self, player):
+        """Must be overridden.
+
+        Get what a player does this tick, called once per tick.
+
+        Args:
+            player: The Player being controlled.
+
+        Returns:
+            An InputState.
+        """
+        pass
+
+
+class Input(Controller):
+    """Collects keyboard and gamepad events into per tick input states.
+
+    Events are pumped every frame and stamped with the time they were
+    read. Once per tick they are sampled into an InputState which sprites
+    read instead of polling the keyboard. When the frame showing a tick is
+    presented the time since its oldest event is recorded as the input
+    latency.
+    """
+
+    def __init__(
+        self,
+        keys=settings.KEY_BINDINGS,
+        buttons=settings.PAD_BINDINGS,
+    ):
+        """Initializes the input and opens connected gamepads.
+
+        Args:
+            keys: A dict mapping action names to lists of key names.
+            buttons: A dict mapping action names to lists of buttons.
+        """
+        self.keys = {}
+        self.buttons = {}
+        for name, names in keys.items():
+            self.bind(Action(name), *map(pygame.key.key_code, names))
+        for name, numbers in buttons.items():
+            self.bind_button(Action(name), *numbers)
+        pygame.joystick.init()
+        self.pads = {}
+        for i in range(pygame.joystick.get_count()):
+            self.open_pad(i)
+        self.events = []
+        self.waited = []
+        self.unsampled = []
+        self.held = set()
+        self.axes = set()
+        self.pressed = set()
+        self.released = set()
+        self.quit = False
+        self.stamps = []
+        self.showing = []
+        self.latencies = deque(maxlen=settings.TICK_RATE)
+        self.state = InputState.EMPTY
+
+    @property
+    def latency(self):
+        """Average input to screen latency in milliseconds."""
+        if not self.latencies:
+            return 0
+        return sum(self.latencies) / len(self.latencies) * 1000
+
+    def bind(self, action, *keys):
+        """Binds keys to an action, replacing its previous keys.
+
+        Args:
+            action: An Action.
+            keys: pygame key codes.
+        """
+        self.keys = {k: a for k, a in self.keys.items() if a != action}
+        self.keys.update((key, action) for key in keys)
+
+    def bind_button(self, action, *buttons):
+        """Binds gamepad buttons to an action, replacing its previous ones.
+
+        Args:
+            action: An Action.
+            buttons: Gamepad button numbers.
+        """
+        self.buttons = {b: a for b, a in self.buttons.items() if a != action}
+        self.buttons.update((button, action) for button in buttons)
+
+    def open_pad(self, index):
+        """Opens a gamepad.
+
+        Args:
+            index: The device index.
+        """
+        pad = pygame.joystick.Joystick(index)
+        self.pads[pad.get_instance_id()] = pad
+
+    def press(self, action):
+        """Starts holding an action."""
+        self.held.add(action)
+        self.pressed.add(action)
+
+    def release(self, action):
+        """Stops holding an action."""
+        self.held.discard(action)
+        self.released.add(action)
+
+    def move(self, x, y):
+        """Holds directions from a stick or a hat.
+
+        Args:
+            x: Horizontal position from -1 to 1.
+            y: Vertical position from -1 to 1, negative is up.
+        """
+        axes = set()
+        if x < -settings.PAD_DEADZONE:
+            axes.add(Action.LEFT)
+        elif x > settings.PAD_DEADZONE:
+            axes.add(Action.RIGHT)
+        if y < -settings.PAD_DEADZONE:
+            axes.add(Action.UP)
+        elif y > settings.PAD_DEADZONE:
+            axes.add(Action.DOWN)
+        for action in axes - self.axes:
+            self.press(action)
+        for action in self.axes - axes:
+            self.release(action)
+        self.axes = axes
+
+    def pump(self):
+        """Reads pending events, must be called every frame.
+
+        Returns:
+            The list of events read, for anyone else interested.
+        """
+        self.events = self.waited + pygame.event.get()
+        self.waited = []
+        self.unsampled.extend(self.events)
+        now = time.perf_counter()
+        for event in self.events:
+            action = None
+            if event.type in (pygame.QUIT, pygame.WINDOWCLOSE):
+                self.quit = True
+            elif event.type in (pygame.KEYDOWN, pygame.KEYUP):
+                action = self.keys.get(event.key)
+                if action and event.type == pygame.KEYDOWN:
+                    self.press(action)
+                elif action:
+                    self.release(action)
+            elif event.type in (pygame.JOYBUTTONDOWN, pygame.JOYBUTTONUP):
+                action = self.buttons.get(event.button)
+                if action and event.type == pygame.JOYBUTTONDOWN:
+                    self.press(action)
+                elif action:
+                    self.release(action)
+            elif event.type == pygame.JOYAXISMOTION and event.axis < 2:
+                pad = self.pads.get(event.instance_id)
+                if pad:
+                    action = True
+                    self.move(pad.get_axis(0), pad.get_axis(1))
+            elif event.type == pygame.JOYHATMOTION:
+                action = True
+                x, y = event.value
+                self.move(x, -y)
+            elif event.type == pygame.JOYDEVICEADDED:
+                self.open_pad(event.device_index)
+            elif event.type == pygame.JOYDEVICEREMOVED:
+                self.pads.pop(event.instance_id, None)
+            if action:
+                self.stamps.append(now)
+        return self.events
+
+    def wait(self, timeout):
+        """Sleeps until an event comes, the next pump reads it.
+
+        Args:
+            timeout: The longest wait in seconds.
+        """
+        event = pygame.event.wait(int(timeout * 1000))
+        if event.type != pygame.NOEVENT:
+            self.waited.append(event)
+
+    def sample(self):
+        """Samples the input of a tick, must be called once per tick.
+
+        Returns:
+            The new InputState, also available as state.
+        """
+        self.state = InputState(
+            frozenset(self.held),
+            frozenset(self.pressed),
+            frozenset(self.released),
+            self.quit,
+            tuple(self.unsampled),
+        )
+        self.unsampled.clear()
+        self.pressed.clear()
+        self.released.clear()
+        self.quit = False
+        if self.stamps:
+            self.showing.append(self.stamps[0])
+            self.stamps.clear()
+        return self.state
+
+    def control(self, player):
+        """Get the sampled input, the player does what the human says.
+
+        Args:
+            player: The Player being controlled.
+
+        Returns:
+            The current InputState.
+        """
+        return self.state
+
+    def presented(self):
+        """Records latencies, must be called after a frame is shown."""
+        now = time.perf_counter()
+        for stamp in self.showing:
+            self.latencies.append(now - stamp)
+        self.showing.clear()
+
+    def clear(self):
+        """Forgets every key held and event not sampled yet."""
+        self.waited.clear()
+        self.unsampled.clear()
+        self.held.clear()
+        self.axes.clear()
+        self.pressed.clear()
+        self.released.clear()
+        self.stamps.clear()
+        self.showing.clear()
+        self.state = InputState.EMPTY
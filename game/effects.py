@@ -0,0 +1,135 @@
+from collections import deque
+
+from game import settings
+
+
+class Effects(object):
+    """Side effects queued during a tick and applied all at once.
+
+    Collision handlers only queue what should happen (damages, kills,
+    spawns, sounds and score) so groups are never changed while they are
+    being scanned. Everything is applied in one batch at the end of the
+    tick, repeated sounds are played once and spawns are limited per tick,
+    the exceeding ones are left for the next ticks.
+    """
+
+    def __init__(self, game, spawn_limit=settings.SPAWN_LIMIT):
+        """Initializes an empty queue.
+
+        Args:
+            game: The running game instance.
+            spawn_limit: The maximum number of spawns applied per tick.
+        """
+        self.game = game
+        self.spawn_limit = spawn_limit
+        self.damages = []
+        self.kills = {}
+        self.spawns = deque()
+        self.sounds = {}
+        self.points = 0
+
+    def clear(self):
+        """Discards all queued effects."""
+        self.damages.clear()
+        self.kills.clear()
+        self.spawns.clear()
+        self.sounds.clear()
+        self.points = 0
+
+    def damage(self, target, amount, source=None):
+        """Queues damage to a sprite.
+
+        Args:
+            target: A sprite with a take_damage method.
+            amount: How much damage.
+            source: A sprite to be killed if the target is destroyed.
+        """
+        self.damages.append((target, amount, source))
+
+    def wear(self, target, amount):
+        """Adds damage to a sprite destroyed past its endurance.
+
+        When it's destroyed the player scores its endurance and its kill
+        is queued.
+
+        Args:
+            target: A sprite with damage and endurance attributes.
+            amount: How much damage.
+
+        Returns:
+            True if the sprite has been destroyed.
+        """
+        target.damage += amount
+        if target.damage >= target.endurance:
+            self.score(target.endurance)
+            self.kill(target)
+            return True
+        return False
+
+    def kill(self, sprite):
+        """Queues the destruction of a sprite.
+
+        Args:
+            sprite: The sprite, its destroy method is used when it has one.
+        """
+        self.kills[sprite] = None
+
+    def spawn(self, factory, *args, **kwargs):
+        """Queues the creation of something new.
+
+        Args:
+            factory: A callable creating sprites, like a sprite class.
+            args: Positional arguments for the factory.
+            kwargs: Keyword arguments for the factory.
+        """
+        self.spawns.append((factory, args, kwargs))
+
+    def sound(self, sfx):
+        """Queues a sound, it plays only once per tick.
+
+        Args:
+            sfx: A pygame.mixer.Sound instance.
+        """
+        self.sounds[sfx] = None
+
+    def score(self, points):
+        """Queues points for the player.
+
+        Args:
+            points: How many points.
+        """
+        self.points += points
+
+    def apply(self):
+        """Applies all queued effects.
+
+        Damages go first since they may kill, then kills which may spawn
+        and at last spawns, sounds and score. Sprites already killed this
+        tick take no more damage.
+        """
+        for target, amount, source in self.damages:
+            if (
+                target.alive()
+                and target not in self.kills
+                and target.take_damage(amount)
+                and source
+            ):
+                self.kill(source)
+        self.damages.clear()
+
+        kills = self.kills
+        self.kills = {}
+        for sprite in kills:
+            if sprite.alive():
+                getattr(sprite, "destroy", sprite.kill)()
+
+        for _ in range(min(self.spawn_limit, len(self.spawns))):
+            factory, args, kwargs = self.spawns.popleft()
+            factory(*args, **kwargs)
+
+        for sfx in self.sounds:
+            sfx.play()
+        self.sounds.clear()
+
+        self.game.score += self.points
+        self.points = 0
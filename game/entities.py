@@ -0,0 +1,139 @@
+from itertools import islice
+
+from game import settings
+
+
+class Index(object):
+    """The sprites having a component.
+
+    Sprites are kept in a list of slots and a dict of their positions, so
+    counting and membership are O(1) and iterating doesn't copy anything.
+    Removing a sprite leaves a tombstone in its slot, so sprites can be
+    killed while iterating. Slots are only compacted by compact(), which
+    must not be called while iterating.
+
+    It speaks the protocol pygame sprites use with their groups, so
+    Sprite.kill, Sprite.alive and pygame.sprite.spritecollide work with it.
+    """
+
+    _spritegroup = True
+
+    def __init__(self, name):
+        """Initializes an empty index.
+
+        Args:
+            name: The component name.
+        """
+        self.name = name
+        self.slots = []
+        self.positions = {}
+
+    def __len__(self):
+        return len(self.positions)
+
+    def __bool__(self):
+        return bool(self.positions)
+
+    def __contains__(self, sprite):
+        return sprite in self.positions
+
+    def __iter__(self):
+        # Sprites added while iterating are left for the next time and
+        # tombstones are skipped, sprites are never false.
+        return filter(None, islice(self.slots, len(self.slots)))
+
+    def has_internal(self, sprite):
+        return sprite in self.positions
+
+    def add_internal(self, sprite, layer=None):
+        if sprite not in self.positions:
+            self.positions[sprite] = len(self.slots)
+            self.slots.append(sprite)
+
+    def remove_internal(self, sprite):
+        self.slots[self.positions.pop(sprite)] = None
+
+    def compact(self):
+        """Drops the tombstones when they outnumber the sprites."""
+        if len(self.slots) <= 2 * len(self.positions) + 16:
+            return
+        self.slots = [sprite for sprite in self.slots if sprite is not None]
+        self.positions = {sprite: i for i, sprite in enumerate(self.slots)}
+
+    def sprites(self):
+        """Get a list of the sprites."""
+        return [sprite for sprite in self.slots if sprite is not None]
+
+    def update(self, *args):
+        """Updates every sprite."""
+        for sprite in self:
+            sprite.update(*args)
+
+    def clear(self):
+        """Removes every sprite at once."""
+        for sprite in self.slots:
+            if sprite is not None:
+                sprite.remove_internal(self)
+        self.slots = []
+        self.positions = {}
+
+
+class Registry(object):
+    """Every entity of the game, indexed by component.
+
+    Sprite classes name their component in a component attribute and
+    register themselves when created, they're added to the index of all
+    sprites and to the index of their component. Each component is a
+    system updated as a whole, in the order the components are given.
+    Indexes are compacted before updating, when nothing is iterating them.
+    """
+
+    def __init__(self, systems=settings.ENTITY_SYSTEMS):
+        """Initializes the indexes.
+
+        Args:
+            systems: The component names in update order.
+        """
+        self.all = Index("sprites")
+        self.indexes = {name: Index(name) for name in systems}
+
+    def __getitem__(self, name):
+        return self.indexes[name]
+
+    def add(self, sprite):
+        """Registers a sprite by its component.
+
+        Args:
+            sprite: A pygame.sprite.Sprite with a component attribute.
+        """
+        sprite.add(self.all, self.indexes[sprite.component])
+
+    def compact(self):
+        """Compacts every index, must not be called while iterating."""
+        self.all.compact()
+        for index in self.indexes.values():
+            index.compact()
+
+    def update(self):
+        """Updates the systems in order."""
+        self.compact()
+        for index in self.indexes.values():
+            index.update()
+
+    def clear(self):
+        """Removes every entity."""
+        self.all.clear()
+        for index in self.indexes.values():
+            index.clear()
+
+    def counts(self):
+        """Get the number of entities of each component.
+
+        Returns:
+            A dict with the count of all sprites and of each component.
+        """
+        counts = {self.all.name: len(self.all)}
+        counts.update(
+            (name, len(index)) for name, index in self.indexes.items()
+        )
+        return counts
@@ -0,0 +1,181 @@
+import json
+import logging
+import platform
+import time
+
+import pygame
+
+from game import settings
+
+logger = logging.getLogger(__name__)
+
+
+def convert(image, storage, color_key=settings.BLACK):
+    """Stores a frame cut from an atlas in a given way.
+
+    Args:
+        image: A pygame.Surface in the display format, like the ones
+            returned by Spritesheet.get_image.
+        storage: One of BlitFormats.STORAGES.
+        color_key: The color of the transparent pixels.
+
+    Returns:
+        A pygame.Surface, it may be the same one.
+    """
+    if storage == "opaque":
+        image.set_colorkey(None)
+        return image
+    if storage == "rle":
+        image.set_colorkey(color_key, pygame.RLEACCEL)
+        return image
+    image.set_colorkey(color_key)
+    if storage == "alpha":
+        return image.convert_alpha()
+    return image
+
+
+class BlitFormats(object):
+    """Picks the fastest way to store the frames of each atlas.
+
+    Each frame set is blitted on the host in every storage it can use:
+    plain colorkey (how frames used to be stored), RLE accelerated
+    colorkey, per-pixel alpha and, when no pixel is transparent, opaque.
+    The fastest one is kept. Choices are saved to a metadata file along
+    with the host they were measured on, and reused until the host
+    changes.
+
+    Attributes:
+        STORAGES: The ways frames can be stored.
+    """
+
+    STORAGES = ("colorkey", "rle", "alpha", "opaque")
+
+    def __init__(
+        self, file_name=settings.BLIT_FORMATS_FILE, sample=16, enabled=True
+    ):
+        """Loads the saved choices.
+
+        Args:
+            file_name: The metadata file path.
+            sample: How many frames of each set are measured.
+            enabled: False to keep frames as they are, when they're not
+                going to be blitted.
+        """
+        self.file_name = file_name
+        self.sample = sample
+        self.enabled = enabled
+        self.host = self.describe_host()
+        self.choices = {}
+        self.measured = False
+        try:
+            with open(file_name, encoding="utf-8") as f:
+                metadata = json.load(f)
+        except (OSError, ValueError):
+            metadata = {}
+        if metadata.get("host") == self.host:
+            self.choices = metadata.get("atlases", {})
+
+    @staticmethod
+    def describe_host():
+        """Get what blit speed depends on besides the frames."""
+        surface = pygame.display.get_surface()
+        return {
+            "machine": platform.machine(),
+            "pygame": pygame.version.ver,
+            "sdl": ".".join(map(str, pygame.get_sdl_version())),
+            "driver": pygame.display.get_driver(),
+            "bits": surface.get_bitsize() if surface else 0,
+        }
+
+    def measure(self, frames, storage, color_key):
+        """Measures how fast frames stored some way are blitted.
+
+        Args:
+            frames: A list of pygame.Surface.
+            storage: One of STORAGES.
+            color_key: The color of the transparent pixels.
+
+        Returns:
+            Blits per second.
+        """
+        images = [convert(f.copy(), storage, color_key) for f in frames]
+        target = pygame.Surface(pygame.display.get_surface().get_size())
+        target = target.convert()
+        batch = [(image, (0, 0)) for image in images]
+        # The first blit encodes RLE surfaces, it's not measured.
+        target.blits(batch, False)
+        blits = 0
+        start = time.perf_counter()
+        while time.perf_counter() - start < 0.005:
+            target.blits(batch, False)
+            blits += len(batch)
+        return blits / (time.perf_counter() - start)
+
+    def choose(self, name, frames, color_key=settings.BLACK):
+        """Stores a frame set the fastest way.
+
+        Args:
+            name: The frame set name, used as key in the metadata.
+            frames: A list of pygame.Surface returned by
+                Spritesheet.get_image.
+            color_key: The color of the transparent pixels.
+
+        Returns:
+            A list with the stored frames.
+        """
+        if not frames or not self.enabled:
+            return frames
+        choice = self.choices.get(name)
+        if choice is None:
+            step = max(len(frames) // self.sample, 1)
+            sample = frames[::step][: self.sample]
+            storages = list(self.STORAGES)
+            if any(self.transparent(f, color_key) for f in frames):
+                storages.remove("opaque")
+            speeds = {
+                storage: self.measure(sample, storage, color_key)
+                for storage in storages
+            }
+            best = max(speeds, key=speeds.get)
+            choice = self.choices[name] = {
+                "storage": best,
+                "gain": round(speeds[best] / speeds["colorkey"], 2),
+                "blits_per_second": {s: int(v) for s, v in speeds.items()},
+            }
+            self.measured = True
+        return [
+            convert(frame, choice["storage"], color_key) for frame in frames
+        ]
+
+    @staticmethod
+    def transparent(image, color_key):
+        """Tells if any pixel of an image is the transparent color."""
+        image.set_colorkey(color_key)
+        mask = pygame.mask.from_surface(image)
+        return mask.count() < image.get_width() * image.get_height()
+
+    def save(self):
+        """Saves the choices if any was measured."""
+        if not self.measured:
+            return
+        try:
+            with open(self.file_name, "w", encoding="utf-8") as f:
+                json.dump(
+                    {"host": self.host, "atlases": self.choices}, f, indent=2
+                )
+        except OSError as e:
+            logger.warning("Can't save blit formats: %s", e)
+        self.measured = False
+
+    def report(self):
+        """Describes the choices.
+
+        Returns:
+            A string with the storage and blit speed gain of each set.
+        """
+        if not self.enabled:
+            return "blit formats off"
+        return "blit formats " + ", ".join(
+            f"{name} {choice['storage']} x{choice['gain']:.2f}"
+            for name, choice in self.choices.items()
+        )
@@ -1,107 +1,427 @@
+import logging
+import time
+from functools import partial
+
 import pygame
 
-from game import BossOne, Enemy, Menu, Meteor, Player, Spritesheet, settings
+from game import (
+    Enemy,
+    EnemyLaser,
+    Explosion,
+    Menu,
+    Meteor,
+    Player,
+    ScriptedBoss,
+    Spritesheet,
+    settings,
+)
+from game.background import Starfield
+from game.broadphase import Broadphase
+from game.bosses import load_bosses
+from game.collision import get_mask
+from game.controls import Input
+from game.effects import Effects
+from game.entities import Registry
+from game.formats import BlitFormats
+from game.garbage import GarbageCollector
+from game.particles import Particles
+from game.projectiles import Projectiles
+from game.quality import QualityGovernor
+from game.render import Layer, Renderer, TextureRenderer
+from game.rewind import Rewind
+from game.scenes import GameOver, Pause, Play, SceneStack
+
+logger = logging.getLogger(__name__)
 
 
 class Game(object):
     """Intergalactic Uprising Game"""
 
-    def __init__(self):
-        """Creates a new Game."""
+    def __init__(
+        self,
+        startup=None,
+        backend=settings.RENDER_BACKEND,
+        gc_mode=settings.GC_MODE,
+        autoplay=False,
+        asset_store=settings.ASSET_STORE,
+        main_loop=settings.MAIN_LOOP,
+        collision_worker=settings.COLLISION_WORKER,
+        hot_reload=settings.HOT_RELOAD,
+    ):
+        """Creates a new Game.
+
+        Args:
+            startup: A dict of startup times in seconds measured before the
+                game was created. When given, the time taken to init the
+                display, load the assets and draw the first frame are added
+                and logged after the first frame.
+            backend: "surface" or "texture", see RENDER_BACKEND.
+            gc_mode: "default" or "deferred", see GC_MODE.
+            autoplay: True to let a bot play, starting right away and
+                again after every game over.
+            asset_store: The path of an asset store file shared by all
+                the games on the host, or None to load assets in each.
+            main_loop: "blocking" or "asyncio", see MAIN_LOOP.
+            collision_worker: True to find what sprites may hit in a
+                worker process, see COLLISION_WORKER.
+            hot_reload: True to reload assets when their files change,
+                see HOT_RELOAD.
+        """
+        self.startup = startup
+        start = time.perf_counter()
+        self.garbage = GarbageCollector(gc_mode)
         pygame.init()
         pygame.mixer.init()
         pygame.mixer.music.load(settings.MAIN_THEME_SFX)
         pygame.mouse.set_visible(False)
         pygame.display.set_caption("Intergalactic Uprising")
-        self.screen = pygame.display.set_mode(
-            (settings.WIDTH, settings.HEIGHT)
-        )
+        self.init_display(backend)
         self.display = pygame.display.Info()
-        self.load_resources()
-        self.sprites = pygame.sprite.Group()
-        self.players = pygame.sprite.Group()
-        self.enemies = pygame.sprite.Group()
-        self.bosses = pygame.sprite.Group()
-        self.meteors = pygame.sprite.Group()
-        self.shots = pygame.sprite.Group()
-        self.enemies_shots = pygame.sprite.Group()
-        self.explosions = pygame.sprite.Group()
-        self.pows = pygame.sprite.Group()
-        self.shields = pygame.sprite.Group()
-        self.running = False
+        loading = time.perf_counter()
+        self.input = Input()
+        self.autoplay = autoplay
+        self.controller = self.input
+        if autoplay:
+            # Optional subsystems are only imported when they're enabled.
+            from game.autoplay import Autopilot
+
+            self.controller = Autopilot(self)
+        self.fonts = {}
+        self.load_resources(asset_store)
+        self.projectiles = Projectiles(self)
+        self.starfield = Starfield(
+            (self.display.current_w, self.display.current_h)
+        )
+        self.entities = Registry()
+        # Shortcuts to the entity indexes.
+        self.sprites = self.entities.all
+        self.players = self.entities["players"]
+        self.enemies = self.entities["enemies"]
+        self.bosses = self.entities["bosses"]
+        self.meteors = self.entities["meteors"]
+        self.shots = self.entities["shots"]
+        self.enemies_shots = self.entities["enemies_shots"]
+        self.explosions = self.entities["explosions"]
+        self.pows = self.entities["pows"]
+        self.shields = self.entities["shields"]
+        self.broadphase = Broadphase(self, collision_worker)
+        self.quality = QualityGovernor()
+        self.effects = Effects(self)
+        self.particles = Particles()
+        self.rewind = Rewind(self)
+        self.renderer.add(
+            Layer.BACKGROUND, partial(self.starfield.draw, self.renderer)
+        )
+        self.renderer.add(
+            Layer.MOBS,
+            self.meteors,
+            self.enemies,
+            self.bosses,
+            self.pows,
+            self.players,
+            self.shields,
+        )
+        self.renderer.add(
+            Layer.SHOTS,
+            self.shots,
+            self.enemies_shots,
+            partial(self.projectiles.draw, self.screen),
+        )
+        self.renderer.add(
+            Layer.EXPLOSIONS,
+            self.explosions,
+            partial(self.particles.draw, self.screen),
+        )
+        self.renderer.add(Layer.HUD, self.draw_hud)
+        self.rewinding = False
+        self.rewound = False
         self.clock = pygame.time.Clock()
+        self.lag = 0
+        self.last = 0
+        # Ticks run since the measured tick rate was last updated.
+        self.ticks = 0
+        self.ticks_since = 0
+        self.tick_rate = 0
+        # When the last input came.
+        self.active = 0
+        # Tasks run alongside the game, only with the asyncio main loop.
+        self.tasks = None
+        if main_loop == "asyncio":
+            # Importing asyncio takes a while, it's done only when used.
+            from game.loop import AsyncLoop
+
+            self.tasks = AsyncLoop(self)
+        self.scenes = SceneStack()
         self.main_menu = Menu(self)
-        self.main_menu.draw()
+        self.play = Play(self)
+        self.pause = Pause(self)
+        self.game_over = GameOver(self)
+        self.scenes.push(self.main_menu)
+        if autoplay:
+            self.main_menu.new_game()
+        self.hot_reload = None
+        if hot_reload:
+            from game.hotreload import HotReload
+
+            self.hot_reload = HotReload(self, hot_reload)
+        self.garbage.freeze()
+        self.created = time.perf_counter()
+        self.load_time = self.created - loading
+        self.telemetry = None
+        if settings.TELEMETRY_TARGET:
+            from game.telemetry import Telemetry
+
+            self.telemetry = Telemetry(self)
+        if self.startup is not None:
+            self.startup["display init"] = loading - start
+            self.startup["asset load"] = self.load_time
+
+    def init_display(self, backend):
+        """Sets the video mode and creates the renderer.
+
+        The texture backend falls back to blitting surfaces when SDL can't
+        create its renderer.
+
+        Args:
+            backend: "surface" or "texture".
+        """
+        size = (settings.WIDTH, settings.HEIGHT)
+        if backend == "texture":
+            # The hidden display surface only gives loaded images their
+            # pixel format, the renderer has a window of its own.
+            pygame.display.set_mode(size, pygame.HIDDEN)
+            self.screen = pygame.Surface(size, pygame.SRCALPHA)
+            try:
+                self.renderer = TextureRenderer(
+                    self.screen, pygame.display.get_caption()[0]
+                )
+                return
+            except (ImportError, RuntimeError) as e:
+                logger.warning("Can't draw with textures: %s", e)
+        self.screen = pygame.display.set_mode(size)
+        self.renderer = Renderer(self.screen)
 
     def new(self):
         """Initializes a new game."""
-        self.sprites.empty()
-        self.players.empty()
-        self.enemies.empty()
-        self.bosses.empty()
-        self.meteors.empty()
-        self.shots.empty()
-        self.enemies_shots.empty()
-        self.explosions.empty()
-        self.pows.empty()
-        self.shields.empty()
+        self.entities.clear()
         self.mob_limit = 10
+        self.level = 0
         self.enemies_remaining = 100
-        self.player = Player(self, groups=[self.sprites, self.players])
+        self.player = Player(self)
         self.release_mobs()
         self.score = 0
-        self.running = True
+        self.effects.clear()
+        self.particles.clear()
+        self.projectiles.clear()
+        self.rewind.clear()
+        self.input.clear()
+        self.rewinding = False
+        self.rewound = False
 
     def run(self):
-        """Game main loop."""
-        pygame.mixer.music.play(loops=-1)
-        while self.running:
-            self.clock.tick(settings.FPS)
-            self.events()
-            self.update()
-            self.draw()
-            self.over()
-        pygame.mixer.music.fadeout(500)
-
-    def events(self):
-        """Event handler.
-
-        Decide which action perform based on window and keyboard events.
-        """
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                self.running = False
-            if event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_ESCAPE:
-                    self.running = False
-                if event.key == pygame.K_RETURN and not self.player.alive():
-                    self.new()
+        """Game main loop, runs until there are no scenes left.
+
+        Scenes are updated at a fixed TICK_RATE no matter how many frames
+        are drawn, frames are drawn interpolating between ticks. Events are
+        read every frame and sampled once per tick.
+
+        With the asyncio main loop, frames are run from an event loop and
+        the tasks spawned with self.tasks run between them.
+        """
+        if self.tasks is not None:
+            self.tasks.run()
+            return
+        self.start()
+        while self.scenes:
+            timeout = self.idle()
+            if timeout is None:
+                self.clock.tick(settings.FPS)
+            else:
+                self.input.wait(timeout)
+                self.clock.tick()
+                self.wake()
+            self.frame()
+        self.close()
+
+    def start(self):
+        """Called right before the first frame."""
+        self.lag = 0
+        self.last = self.active = self.ticks_since = time.perf_counter()
+
+    def wake(self):
+        """Called after waiting for input in an idle scene.
+
+        The time spent waiting isn't caught up with, the next frame runs
+        a single tick for the input that came.
+        """
+        self.lag = 1 / settings.TICK_RATE
+        self.last = time.perf_counter()
+
+    def idle(self):
+        """Tells how long the next frame may wait for input.
+
+        Scenes that only change with input wait for it once no input came
+        for IDLE_DELAY, and the background stops scrolling meanwhile.
+
+        Returns:
+            The longest wait in seconds or None if the next frame is due
+            at FPS.
+        """
+        scene = self.scenes.top
+        idle = (
+            scene is not None
+            and scene.idle()
+            and time.perf_counter() - self.active >= settings.IDLE_DELAY
+        )
+        if idle or (scene is not None and scene.still):
+            self.starfield.pause()
+        else:
+            self.starfield.resume()
+        return settings.IDLE_TIMEOUT if idle else None
+
+    def frame(self):
+        """Reads events, runs the ticks due and draws a frame."""
+        tick = 1 / settings.TICK_RATE
+        now = time.perf_counter()
+        self.lag = min(
+            self.lag + now - self.last, tick * settings.MAX_TICKS_PER_FRAME
+        )
+        self.last = now
+        if self.hot_reload is not None:
+            self.hot_reload.frame()
+        self.input.pump()
+        while self.lag >= tick and self.scenes:
+            self.lag -= tick
+            self.ticks += 1
+            if self.input.sample().quit:
+                self.scenes.clear()
+            self.scenes.update()
+        if now - self.ticks_since >= 1:
+            self.tick_rate = self.ticks / (now - self.ticks_since)
+            self.ticks = 0
+            self.ticks_since = now
+        if self.input.events or self.scenes.started is not None:
+            self.active = now
+        self.draw(self.lag / tick)
+        self.garbage.frame()
+        work = time.perf_counter() - now
+        if self.telemetry is not None:
+            self.telemetry.frame(work)
+        if self.quality.frame(work) and self.scenes.top is self.play:
+            # Fill the room left if the mob limit went up.
+            self.release_mobs()
+
+    def close(self):
+        """Called once there are no scenes left."""
+        self.broadphase.close()
+        if self.hot_reload is not None:
+            self.hot_reload.close()
+        if self.telemetry is not None:
+            self.telemetry.close()
+        self.garbage.close()
+
+    def step(self):
+        """Runs a game tick."""
+        self.renderer.save()
+        self.update()
+        self.over()
 
     def update(self):
-        """Update sprites."""
-        self.sprites.update()
+        """Update sprites, system by system in ENTITY_SYSTEMS order.
 
-    def draw(self):
-        """Put everything on screen."""
-        self.fill_background()
-        self.sprites.draw(self.screen)
+        Side effects queued by the sprites are applied at the end of the
+        tick. While rewinding the game goes back one tick instead, when the
+        rewind key is released it resumes from that point.
+        """
+        if self.rewinding:
+            self.effects.clear()
+            self.entities.compact()
+            self.rewind.step_back()
+            self.rewound = True
+        else:
+            if self.rewound:
+                # Spawns left for later ticks aren't recorded, the mobs
+                # they would have replaced are refilled instead.
+                self.rewound = False
+                self.release_mobs()
+            self.entities.update()
+            self.projectiles.update()
+            self.particles.update()
+            self.effects.apply()
+            self.rewind.record()
+        # The worker looks for pairs while the frame is drawn.
+        self.broadphase.submit()
+
+    def draw(self, alpha=1):
+        """Put the current scene on screen.
+
+        Args:
+            alpha: How far the next tick is, from 0 to 1.
+        """
+        if not self.scenes:
+            return
+        self.scenes.draw(alpha)
+        self.renderer.present()
+        self.input.presented()
+        if self.startup is not None and "first frame" not in self.startup:
+            self.startup["first frame"] = time.perf_counter() - self.created
+            logger.info(
+                "Startup %.0fms: %s",
+                sum(self.startup.values()) * 1000,
+                ", ".join(
+                    f"{step} {seconds * 1000:.0f}ms"
+                    for step, seconds in self.startup.items()
+                ),
+            )
+
+    def draw_world(self, alpha=1):
+        """Draws the game and the HUD.
+
+        Args:
+            alpha: How far the next tick is, from 0 to 1.
+        """
+        self.projectiles.alpha = alpha
+        self.particles.alpha = alpha
+        self.renderer.draw(alpha)
+
+    def draw_hud(self):
+        """Draws score, energy, lives and messages over the game."""
         if settings.DEBUG:
-            # Draw a red rectangle around each sprite for debugging.
-            for sprite in self.sprites.sprites():
-                pygame.draw.rect(self.screen, settings.RED, sprite.rect, 2)
+            self.draw_debug()
         self.draw_text(str(self.score), (self.display.current_w / 2, 10))
         self.draw_bar((self.player.energy / 100), (75, 15))
         self.draw_lives()
-        if not self.player.alive():
-            # Show game over message.
-            centerx = self.display.current_w / 2
-            centery = self.display.current_h / 2
-            self.draw_text(
-                "Game Over", (centerx, centery - 48), settings.FONT_LG_SIZE
-            )
-            self.draw_text("[Return] play again.", (centerx, centery + 24))
-            self.draw_text("[Escape] main menu.", (centerx, centery + 48))
-        pygame.display.flip()
+
+    def draw_debug(self):
+        """Draws sprites bounds and performance readouts."""
+        # Draw a red rectangle around each sprite for debugging.
+        for sprite in self.sprites:
+            pygame.draw.rect(self.screen, settings.RED, sprite.rect, 2)
+        lines = [
+            f"{self.tick_rate:.0f} ticks/s {self.clock.get_fps():.0f} fps",
+            self.renderer.report(),
+            f"enemy shots {len(self.projectiles)} "
+            f"{self.projectiles.update_time:.2f}ms",
+            f"background {self.starfield.draw_time:.2f}ms",
+            f"particles {len(self.particles)} "
+            f"{self.particles.nbytes / 1024:.0f}KB",
+            self.rewind.report(),
+            self.quality.report(),
+            self.garbage.report(),
+            f"input latency {self.input.latency:.1f}ms "
+            f"scene switch {self.scenes.transition_time:.2f}ms",
+        ]
+        if self.autoplay:
+            lines.append(self.controller.report())
+        if self.tasks is not None:
+            lines.append(self.tasks.report())
+        if self.broadphase.enabled:
+            lines.append(self.broadphase.report())
+        centerx = self.display.current_w / 2
+        y = self.display.current_h - 30
+        for line in reversed(lines):
+            self.draw_text(line, (centerx, y))
+            y -= 24
 
     def draw_text(
         self, text, pos, size=settings.FONT_SIZE, color=settings.WHITE
@@ -114,12 +434,38 @@ class Game(object):
             size: Text size.
             color: Text color.
         """
-        font = pygame.font.Font(settings.FONT, size)
-        surface = font.render(text, True, color)
+        surface = self.render_text(text, size, color)
         rect = surface.get_rect()
         rect.midtop = pos
         self.screen.blit(surface, rect)
 
+    def render_text(self, text, size=settings.FONT_SIZE, color=settings.WHITE):
+        """Renders a text.
+
+        Args:
+            text: The text string to be rendered.
+            size: Text size.
+            color: Text color.
+
+        Returns:
+            A pygame.Surface.
+        """
+        return self.font(size).render(text, True, color)
+
+    def font(self, size):
+        """Get the game font, it's loaded once per size.
+
+        Args:
+            size: Text size.
+
+        Returns:
+            A pygame.font.Font.
+        """
+        font = self.fonts.get(size)
+        if font is None:
+            font = self.fonts[size] = pygame.font.Font(settings.FONT, size)
+        return font
+
     def draw_bar(self, percent, pos, color=None):
         """Draws a status bar on screen.
 
@@ -155,19 +501,53 @@ class Game(object):
 
     def fill_background(self):
         """Fill screen background."""
-        self.screen.fill(settings.BLACK)
+        self.starfield.draw(self.renderer)
+
+    def explode(self, pos, xtype=None):
+        """Makes an explosion.
+
+        Args:
+            pos: The X and Y positions on screen.
+            xtype: The explosion type.
+        """
+        if settings.PARTICLE_EXPLOSIONS:
+            self.particles.emit(pos, xtype, self.quality.explosion_step)
+            self.effects.sound(self.explosion_sfx)
+        else:
+            Explosion(self, pos, xtype)
+
+    def enemy_shot(self, pos, speed):
+        """Fires an enemy shot.
+
+        Args:
+            pos: The X and Y position of the bottom center of the shot.
+            speed: The speed of the shot on X and Y axis.
+        """
+        if settings.BULLET_ENGINE:
+            self.projectiles.fire(pos, speed)
+        else:
+            EnemyLaser(self, pos, speed)
+
+    @property
+    def mob_cap(self):
+        """The mob limit lowered by the current quality."""
+        return int(self.mob_limit * self.quality.mob_scale)
 
     def spawn_enemy(self):
-        """Spawns a new enemy."""
+        """Spawns a new enemy unless there are enough already."""
         if self.enemies_remaining:
+            if len(self.enemies) >= int(self.mob_cap * 2 / 3):
+                return
             self.enemies_remaining -= 1
-            Enemy(self, groups=[self.sprites, self.enemies])
-        elif not self.bosses.sprites():
-            BossOne(self, groups=[self.sprites, self.bosses])
+            Enemy(self)
+        elif not self.bosses:
+            ScriptedBoss(self, self.level % len(self.bosses_def))
 
     def spawn_meteor(self):
-        """Spawns a new meteor."""
-        Meteor(self, groups=[self.sprites, self.meteors])
+        """Spawns a new meteor unless there are enough already."""
+        if len(self.meteors) >= int(self.mob_cap / 3):
+            return
+        Meteor(self)
 
     def release_mobs(self):
         """Release the mobs.
@@ -181,52 +561,114 @@ class Game(object):
         for _ in range(moteors):
             self.spawn_meteor()
 
-    def load_resources(self):
-        """Loads resource data like images and sfx."""
-        self.spritesheet = Spritesheet(settings.SPRITESHEET_IMG)
-        self.player_spritesheet = Spritesheet(settings.PLAYER_SPRITESHEET_IMG)
-        self.enemies_spritesheet = Spritesheet(
-            settings.ENEMIES_SPRITESHEET_IMG
+    def load_resources(self, asset_store=None):
+        """Loads resource data like images and sfx.
+
+        Each frame set is stored the way it blits fastest on this host,
+        or uploaded with its atlas when sprites are drawn from textures.
+        Frames from an asset store are views of the shared pixels and are
+        kept that way.
+
+        Args:
+            asset_store: The path of an asset store file or None.
+        """
+        sheets = [
+            settings.SPRITESHEET_IMG,
+            settings.PLAYER_SPRITESHEET_IMG,
+            settings.ENEMIES_SPRITESHEET_IMG,
+        ]
+        # Particle explosions don't need the explosions frames.
+        if not settings.PARTICLE_EXPLOSIONS:
+            sheets.append(settings.EXPLOSIONS_SPRITESHEET_IMG)
+        store = None
+        if asset_store:
+            from game.assets import AssetStore
+
+            store = AssetStore.open(asset_store, sheets)
+        self.formats = BlitFormats(
+            enabled=not self.renderer.textures and store is None
         )
-        self.explosions_spritesheet = Spritesheet(
-            settings.EXPLOSIONS_SPRITESHEET_IMG
+        self.spritesheet = Spritesheet(settings.SPRITESHEET_IMG, store=store)
+        self.player_spritesheet = Spritesheet(
+            settings.PLAYER_SPRITESHEET_IMG, store=store
+        )
+        self.enemies_spritesheet = Spritesheet(
+            settings.ENEMIES_SPRITESHEET_IMG, store=store
         )
-        self.player_img = [
-            self.player_spritesheet.get_image(p) for p in settings.PLAYER_IMG
-        ]
         self.player_ico_img = self.spritesheet.get_image(
             settings.PLAYER_ICO_IMG
         )
-        self.enemies_img = [
-            self.enemies_spritesheet.get_image(e) for e in settings.ENEMIES_IMG
-        ]
-        self.bosses_img = [
-            self.spritesheet.get_image(b) for b in settings.BOSSES_IMG
-        ]
-        self.meteors_img = [
-            self.spritesheet.get_image(m) for m in settings.METEORS_IMG
-        ]
-        self.explosions_img = [
-            self.explosions_spritesheet.get_image(e)
-            for e in settings.EXPLOSIONS_IMG
-        ]
-        self.pows_img = [
-            self.spritesheet.get_image(p) for p in settings.POWS_IMG
-        ]
-        self.laser_img = [
-            self.spritesheet.get_image(l) for l in settings.LASER_IMG
-        ]
-        self.shield_img = [
-            self.spritesheet.get_image(s) for s in settings.SHIELD_IMG
-        ]
+        self.bosses_def = load_bosses()
+        self.explosions_spritesheet = None
+        self.explosions_img = []
+        if not settings.PARTICLE_EXPLOSIONS:
+            self.explosions_spritesheet = Spritesheet(
+                settings.EXPLOSIONS_SPRITESHEET_IMG, store=store
+            )
+        for name, sheet, images in self.frame_sets():
+            setattr(
+                self,
+                f"{name}_img",
+                self.formats.choose(
+                    name, [sheet.get_image(i) for i in images]
+                ),
+            )
+        self.formats.save()
+        logger.info(self.formats.report())
+        for sheet in (
+            self.spritesheet,
+            self.player_spritesheet,
+            self.enemies_spritesheet,
+            self.explosions_spritesheet,
+        ):
+            if sheet is not None:
+                self.renderer.add_atlas(sheet)
+        if settings.PIXEL_COLLISION:
+            # Enemies masks are built on their first collision instead.
+            for image in self.bosses_img + self.meteors_img + self.laser_img:
+                get_mask(image)
         self.shot_sfx = pygame.mixer.Sound(settings.SHOT_SFX)
         self.killed_sfx = pygame.mixer.Sound(settings.KILLED_SFX)
         self.explosion_sfx = pygame.mixer.Sound(settings.EXPLOSION_SFX)
         self.hit_sfx = pygame.mixer.Sound(settings.HIT_SFX)
         self.pows_sfx = [pygame.mixer.Sound(s) for s in settings.POWS_SFX]
 
+    def frame_sets(self):
+        """Get the frame sets cut from the spritesheets.
+
+        Returns:
+            A list of (name, spritesheet, image names) tuples, the frames
+            of each set are kept in its name + "_img" attribute.
+        """
+        sets = [
+            ("player", self.player_spritesheet, settings.PLAYER_IMG),
+            ("enemies", self.enemies_spritesheet, settings.ENEMIES_IMG),
+            (
+                "bosses",
+                self.spritesheet,
+                [b["image"] for b in self.bosses_def],
+            ),
+            ("meteors", self.spritesheet, settings.METEORS_IMG),
+            ("pows", self.spritesheet, settings.POWS_IMG),
+            ("laser", self.spritesheet, settings.LASER_IMG),
+            ("shield", self.spritesheet, settings.SHIELD_IMG),
+        ]
+        if self.explosions_spritesheet is not None:
+            sets.append(
+                (
+                    "explosions",
+                    self.explosions_spritesheet,
+                    settings.EXPLOSIONS_IMG,
+                )
+            )
+        return sets
+
     def over(self):
         """Checks if the game is over."""
-        if self.player.lives == 0 and not self.explosions.sprites():
+        if (
+            self.player.lives == 0
+            and not self.explosions
+            and not self.particles
+        ):
             # Kill the player after losing all lives.
             self.player.kill()
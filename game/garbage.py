@@ -0,0 +1,147 @@
+import gc
+import logging
+import time
+
+from game import settings
+
+logger = logging.getLogger(__name__)
+
+
+class GarbageCollector(object):
+    """Keeps cyclic garbage collection from pausing the game mid-frame.
+
+    Every collection is timed through gc.callbacks and logged at debug
+    level, along with its generation and whether it ran at a safe point
+    or on Python's own.
+
+    In deferred mode, whatever exists once assets are loaded is frozen so
+    collections never go through it again. Automatic collection is
+    disabled while playing. Only the youngest generation is collected
+    then, at the end of a frame and only after many allocations. Full
+    collections are left for safe points: when the game stops being
+    played and at wave transitions.
+    """
+
+    def __init__(
+        self,
+        mode=settings.GC_MODE,
+        young=settings.GC_YOUNG_LIMIT,
+        hitch=settings.GC_HITCH,
+    ):
+        """Starts timing collections.
+
+        Args:
+            mode: "default" to leave collection to Python or "deferred".
+            young: Allocations after which the youngest generation is
+                collected while deferring.
+            hitch: Pause in milliseconds over which a collection made
+                mid-frame while playing is logged.
+        """
+        self.deferred = mode == "deferred"
+        self.young = young
+        self.hitch = hitch / 1000
+        self.playing = False
+        self.pending = False
+        self.safe = False
+        self.started = 0
+        self.collections = [0, 0, 0]
+        self.total = 0.0
+        self.longest = 0.0
+        self.unsafe = 0
+        gc.callbacks.append(self.callback)
+
+    def callback(self, phase, info):
+        """Times a collection, called by the gc module."""
+        if phase == "start":
+            self.started = time.perf_counter()
+            return
+        seconds = time.perf_counter() - self.started
+        generation = info["generation"]
+        logger.debug(
+            "Generation %d collection %.3fms%s.",
+            generation,
+            seconds * 1000,
+            "" if self.safe else " (unsafe)",
+        )
+        self.collections[generation] += 1
+        self.total += seconds
+        if not self.playing:
+            return
+        self.longest = max(self.longest, seconds)
+        if not self.safe:
+            self.unsafe += 1
+            if seconds > self.hitch:
+                logger.warning(
+                    "Generation %d collection paused the game %.2fms.",
+                    generation,
+                    seconds * 1000,
+                )
+
+    def freeze(self):
+        """Collects and freezes everything alive, like the loaded assets."""
+        if not self.deferred:
+            return
+        self.collect(now=True)
+        gc.freeze()
+        logger.info("Froze %d objects.", gc.get_freeze_count())
+
+    def start(self):
+        """Called when playing starts, stops automatic collection."""
+        self.playing = True
+        if self.deferred:
+            gc.disable()
+
+    def stop(self):
+        """Called when playing stops, restores automatic collection."""
+        self.playing = False
+        if self.deferred:
+            self.collect(now=True)
+            gc.enable()
+
+    def collect(self, now=False):
+        """Collects all generations at a safe point when deferring.
+
+        Args:
+            now: False to wait until the current frame is drawn.
+        """
+        if not self.deferred:
+            return
+        if not now:
+            self.pending = True
+            return
+        self.pending = False
+        self.safe = True
+        try:
+            gc.collect()
+        finally:
+            self.safe = False
+
+    def frame(self):
+        """Runs deferred collections, called after a frame is drawn."""
+        if self.pending:
+            self.collect(now=True)
+        elif self.deferred and self.playing and gc.get_count()[0] > self.young:
+            self.safe = True
+            try:
+                gc.collect(0)
+            finally:
+                self.safe = False
+
+    def close(self):
+        """Stops timing collections and restores automatic collection."""
+        gc.callbacks.remove(self.callback)
+        self.playing = False
+        gc.enable()
+
+    def report(self):
+        """Describes the collections.
+
+        Returns:
+            A string with the collections of each generation, how many
+            were made mid-frame while playing and the longest pause while
+            playing.
+        """
+        return (
+            f"gc {'/'.join(map(str, self.collections))} "
+            f"{self.unsafe} mid-frame {self.longest * 1000:.2f}ms max"
+        )
@@ -0,0 +1,367 @@
+import logging
+import os
+import time
+from collections import defaultdict
+
+import pygame
+
+from game import Spritesheet, settings
+from game.collision import get_mask
+
+logger = logging.getLogger(__name__)
+
+
+class HotReload(object):
+    """Reloads the spritesheets, sounds and font while the game runs.
+
+    Every interval the files assets were loaded from are checked for
+    changes. Changed spritesheets and sounds are loaded in a thread, so
+    frames keep coming meanwhile. A spritesheet is decoded and its XML
+    parsed again, then each of its frames is compared to the last pixels
+    seen for it and only the ones that changed are cut, stored like the
+    rest of their set and swapped in. Swapping replaces the frames in the
+    game frame sets, in the frames lists sprites copied from them, in the
+    images sprites show and in the rewind history, between two frames.
+
+    The font and the music are reloaded right away, the scenes render
+    their texts again with the new font.
+
+    Files being written may fail to load, they're loaded again once they
+    change again.
+    """
+
+    def __init__(
+        self,
+        game,
+        enabled=settings.HOT_RELOAD,
+        interval=settings.HOT_RELOAD_INTERVAL,
+    ):
+        """Starts watching the assets files.
+
+        Args:
+            game: The running game instance, with its assets loaded.
+            enabled: True to reload assets when their files change.
+            interval: Seconds between checks.
+        """
+        self.game = game
+        self.enabled = enabled
+        self.interval = interval
+        self.pending = None
+        self.last = 0
+        if not enabled:
+            return
+        # Only needed in this mode, so it's not imported with the module.
+        from concurrent.futures import ThreadPoolExecutor
+
+        self.executor = ThreadPoolExecutor(1, thread_name_prefix="hot-reload")
+        # Frames are compared to the last version of their spritesheet.
+        self.sheets = {
+            sheet.file_name: sheet for _, sheet, _ in game.frame_sets()
+        }
+        # Sound file to (attribute, index in the list or None).
+        self.sounds = defaultdict(list)
+        for name in ("shot", "killed", "explosion", "hit"):
+            self.sounds[getattr(settings, f"{name.upper()}_SFX")].append(
+                (f"{name}_sfx", None)
+            )
+        for i, sound in enumerate(settings.POWS_SFX):
+            self.sounds[sound].append(("pows_sfx", i))
+        # File to the (kind, asset) reloaded when it changes.
+        self.watched = defaultdict(list)
+        for sheet in self.sheets:
+            self.watched[sheet].append(("sheet", sheet))
+            self.watched[sheet.replace(".png", ".xml")].append(
+                ("sheet", sheet)
+            )
+        for sound in self.sounds:
+            self.watched[sound].append(("sound", sound))
+        self.watched[settings.MAIN_THEME_SFX].append(
+            ("music", settings.MAIN_THEME_SFX)
+        )
+        self.watched[settings.FONT].append(("font", settings.FONT))
+        self.stamps = {path: self.stamp(path) for path in self.watched}
+
+    @staticmethod
+    def stamp(path):
+        """Get what tells a file changed.
+
+        Args:
+            path: The file path.
+
+        Returns:
+            A (modification time, size) tuple or None if it's missing.
+        """
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def changes(self):
+        """Get the assets whose files changed since the last check.
+
+        Returns:
+            A list of (kind, asset) tuples.
+        """
+        changed = []
+        for path, assets in self.watched.items():
+            stamp = self.stamp(path)
+            if stamp == self.stamps[path]:
+                continue
+            self.stamps[path] = stamp
+            # Removed files are reloaded once they're back.
+            if stamp is not None:
+                changed.extend(a for a in assets if a not in changed)
+        return changed
+
+    def frame(self):
+        """Swaps in the assets loaded, if any, and checks for changes.
+
+        Called at the start of each frame.
+        """
+        if not self.enabled:
+            return
+        if self.pending is not None:
+            if not self.pending.done():
+                return
+            self.swap(self.pending.result())
+            self.pending = None
+        now = time.perf_counter()
+        if now - self.last < self.interval:
+            return
+        self.last = now
+        loads = []
+        for kind, asset in self.changes():
+            if kind == "font":
+                self.reload_font()
+            elif kind == "music":
+                self.reload_music()
+            else:
+                loads.append((kind, asset, self.frame_names(asset)))
+        if loads:
+            self.pending = self.executor.submit(self.load, loads)
+
+    def frame_names(self, file_name):
+        """Get the names of the frames the game cuts from a spritesheet.
+
+        Args:
+            file_name: The spritesheet file path.
+
+        Returns:
+            A list of image names, empty for other files.
+        """
+        names = [
+            name
+            for _, sheet, images in self.game.frame_sets()
+            if sheet.file_name == file_name
+            for name in images
+        ]
+        if file_name == self.game.spritesheet.file_name:
+            names.append(settings.PLAYER_ICO_IMG)
+        return names
+
+    def load(self, loads):
+        """Loads changed assets, called by the reload thread.
+
+        Args:
+            loads: A list of (kind, file name, frame names) tuples.
+
+        Returns:
+            A list of (kind, file name, asset) tuples, asset being a
+            (Spritesheet, changed frame names) tuple for spritesheets and
+            a pygame.mixer.Sound for sounds. Assets that failed to load are
+            left out.
+        """
+        loaded = []
+        for kind, file_name, names in loads:
+            try:
+                if kind == "sheet":
+                    asset = self.compare(file_name, names)
+                else:
+                    asset = pygame.mixer.Sound(file_name)
+            except (OSError, ValueError, SyntaxError, pygame.error) as e:
+                # Like half written files or frames missing from the XML.
+                logger.warning("Can't reload %s: %s", file_name, e)
+                continue
+            loaded.append((kind, file_name, asset))
+        return loaded
+
+    def compare(self, file_name, names):
+        """Decodes a spritesheet and finds the frames that changed.
+
+        Frames are compared by size and pixels, frames only moved in the
+        spritesheet didn't change.
+
+        Args:
+            file_name: The spritesheet file path.
+            names: The names of the frames to compare.
+
+        Returns:
+            A (Spritesheet, changed frame names) tuple.
+
+        Raises:
+            ValueError: If a frame is missing or out of the spritesheet.
+        """
+        old = self.sheets[file_name]
+        # It's not converted, only the changed frames will be.
+        new = Spritesheet(
+            file_name, old.color_key, image=pygame.image.load(file_name)
+        )
+        changed = set()
+        for name in names:
+            before = old.get_info(name)
+            after = new.get_info(name)
+            if before[2:] != after[2:] or pygame.image.tobytes(
+                old.image.subsurface(before), "RGB"
+            ) != pygame.image.tobytes(new.image.subsurface(after), "RGB"):
+                changed.add(name)
+        return new, changed
+
+    def swap(self, loaded):
+        """Swaps loaded assets in.
+
+        Args:
+            loaded: A list of (kind, file name, asset) tuples.
+        """
+        for kind, file_name, asset in loaded:
+            if kind == "sheet":
+                self.swap_frames(file_name, *asset)
+            else:
+                self.swap_sound(file_name, asset)
+
+    def swap_frames(self, file_name, sheet, changed):
+        """Cuts the changed frames of a spritesheet and swaps them in.
+
+        Args:
+            file_name: The spritesheet file path.
+            sheet: The new Spritesheet.
+            changed: The names of the frames that changed.
+        """
+        start = time.perf_counter()
+        game = self.game
+        self.sheets[file_name] = sheet
+        replacements = {}
+        total = 0
+        for name, old_sheet, images in game.frame_sets():
+            if old_sheet.file_name != file_name:
+                continue
+            total += len(images)
+            indexes = [i for i, n in enumerate(images) if n in changed]
+            if not indexes:
+                continue
+            frames = getattr(game, f"{name}_img")
+            cut = game.formats.choose(
+                name, [sheet.get_image(images[i]) for i in indexes]
+            )
+            # The set is changed in place, some sprites share it.
+            for i, image in zip(indexes, cut):
+                replacements[frames[i]] = image
+                frames[i] = image
+        if settings.PLAYER_ICO_IMG in changed:
+            game.player_ico_img = sheet.get_image(settings.PLAYER_ICO_IMG)
+        if replacements:
+            self.replace(replacements)
+        logger.info(
+            "Reloaded %s, %d of %d frames cut again in %.2fms.",
+            os.path.basename(file_name),
+            len(replacements),
+            total,
+            (time.perf_counter() - start) * 1000,
+        )
+
+    def replace(self, replacements):
+        """Replaces frames wherever the game keeps them.
+
+        Args:
+            replacements: A dict of old to new frames.
+        """
+        game = self.game
+        sprites = set(game.sprites)
+        # Sprites that may come back when rewinding.
+        for segment in game.rewind.segments:
+            sprites.update(segment.sprites)
+        for sprite in sprites:
+            frames = getattr(sprite, "frames", None)
+            if frames is not None:
+                frames[:] = [replacements.get(f, f) for f in frames]
+            original = getattr(sprite, "_image", None)
+            if original in replacements:
+                # Rotated sprites keep their frame aside.
+                sprite._image = replacements[original]
+                if sprite.image is not original:
+                    self.show(
+                        sprite,
+                        pygame.transform.rotate(sprite._image, sprite.rot),
+                    )
+            image = replacements.get(sprite.image)
+            if image is not None:
+                self.show(sprite, image)
+        game.rewind.replace_images(replacements)
+        game.projectiles.load_frames()
+        if settings.PIXEL_COLLISION:
+            for image in game.bosses_img + game.meteors_img + game.laser_img:
+                get_mask(image)
+
+    @staticmethod
+    def show(sprite, image):
+        """Changes the image of a sprite, keeping it centered.
+
+        Args:
+            sprite: A pygame.sprite.Sprite.
+            image: A pygame.Surface.
+        """
+        sprite.image = image
+        if image.get_size() != sprite.rect.size:
+            center = sprite.rect.center
+            sprite.rect.size = image.get_size()
+            sprite.rect.center = center
+
+    def swap_sound(self, file_name, sound):
+        """Swaps a sound in, sounds playing keep playing the old one.
+
+        Args:
+            file_name: The sound file path.
+            sound: The new pygame.mixer.Sound.
+        """
+        for name, index in self.sounds[file_name]:
+            if index is None:
+                setattr(self.game, name, sound)
+            else:
+                getattr(self.game, name)[index] = sound
+        logger.info("Reloaded %s.", os.path.basename(file_name))
+
+    def reload_music(self):
+        """Loads the music again, restarting it if it was playing."""
+        playing = pygame.mixer.music.get_busy()
+        try:
+            pygame.mixer.music.load(settings.MAIN_THEME_SFX)
+        except pygame.error as e:
+            logger.warning("Can't reload %s: %s", settings.MAIN_THEME_SFX, e)
+            return
+        if playing:
+            pygame.mixer.music.play(loops=-1)
+        logger.info("Reloaded %s.", os.path.basename(settings.MAIN_THEME_SFX))
+
+    def reload_font(self):
+        """Loads the font again and renders the scenes texts with it."""
+        game = self.game
+        try:
+            # The old fonts are kept if the new one can't be loaded.
+            pygame.font.Font(settings.FONT, settings.FONT_SIZE)
+        except (OSError, pygame.error) as e:
+            logger.warning("Can't reload %s: %s", settings.FONT, e)
+            return
+        game.fonts.clear()
+        for scene in (game.main_menu, game.pause, game.game_over):
+            scene.render()
+        logger.info("Reloaded %s.", os.path.basename(settings.FONT))
+
+    def close(self):
+        """Stops the reload thread."""
+        if not self.enabled:
+            return
+        self.enabled = False
+        if self.pending is not None:
+            self.pending.cancel()
+            self.pending = None
+        self.executor.shutdown(wait=False)
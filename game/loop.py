@@ -0,0 +1,204 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from functools import partial
+
+import pygame
+
+from game import settings
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncLoop(object):
+    """Runs the game from an asyncio event loop, along with other tasks.
+
+    Between frames the loop sleeps until shortly before the next one is
+    due, so tasks run then, and spends the last spin milliseconds of the
+    wait yielding to them until the frame is due, which is more precise
+    than sleeping but keeps the CPU busy.
+
+    Task steps run between frames and must be short. Blocking work, like
+    file or socket I/O without asyncio, should be offloaded to a thread.
+    How late each frame starts is measured and frames starting later than
+    the jitter threshold are counted and logged.
+
+    Screens waiting for input are left idle, the tasks run until an event
+    comes.
+    """
+
+    def __init__(
+        self,
+        game,
+        fps=settings.FPS,
+        jitter=settings.ASYNC_JITTER,
+        spin=settings.ASYNC_SPIN,
+    ):
+        """Initializes the loop, it's started by Game.run.
+
+        Args:
+            game: The running game instance.
+            fps: The frames drawn per second.
+            jitter: How late in milliseconds a frame may start before
+                it's reported.
+            spin: How long in milliseconds the loop yields to the tasks,
+                instead of sleeping, before a frame.
+        """
+        self.game = game
+        self.period = 1 / fps
+        self.jitter = jitter / 1000
+        self.spin = spin / 1000
+        # Running tasks and their names.
+        self.tasks = {}
+        self.pending = []
+        self.running = False
+        self.lateness = deque(maxlen=fps)
+        self.late = 0
+        self.frames = 0
+        self.last_warning = 0
+
+    @property
+    def frame_jitter(self):
+        """Largest delay of the recent frames in milliseconds."""
+        return max(self.lateness, default=0) * 1000
+
+    def spawn(self, coroutine, name=None):
+        """Runs a coroutine alongside the game.
+
+        Coroutines spawned before the loop runs are started with it. They
+        are cancelled when the game ends.
+
+        Args:
+            coroutine: A coroutine object.
+            name: The task name, for logs.
+
+        Returns:
+            An asyncio.Task or None if the loop isn't running yet.
+        """
+        if not self.running:
+            self.pending.append((coroutine, name))
+            return None
+        task = asyncio.create_task(coroutine)
+        self.tasks[task] = name or repr(coroutine)
+        task.add_done_callback(self.done)
+        return task
+
+    async def offload(self, function, *args, **kwargs):
+        """Calls a blocking function in a thread without stalling frames.
+
+        Args:
+            function: The function to call.
+            args: Positional arguments for the function.
+            kwargs: Keyword arguments for the function.
+
+        Returns:
+            What the function returns.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            None, partial(function, *args, **kwargs)
+        )
+
+    def done(self, task):
+        """Forgets a finished task and logs its error, if any."""
+        name = self.tasks.pop(task, None)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error("Task %s failed.", name, exc_info=task.exception())
+
+    async def wait(self, deadline):
+        """Lets the tasks run until a frame is due.
+
+        Args:
+            deadline: When the frame is due, in time.perf_counter seconds.
+        """
+        delay = deadline - time.perf_counter() - self.spin
+        if delay > 0:
+            await asyncio.sleep(delay)
+        # The last stretch is spent yielding, which is more precise.
+        while time.perf_counter() < deadline:
+            await asyncio.sleep(0)
+
+    def run(self):
+        """Runs the event loop until there are no scenes left."""
+        asyncio.run(self.main())
+
+    async def idle(self, timeout):
+        """Lets the tasks run until an event comes.
+
+        Waiting for events would block the tasks, they're checked for
+        every IDLE_POLL seconds instead.
+
+        Args:
+            timeout: The longest wait in seconds.
+        """
+        end = time.perf_counter() + timeout
+        while time.perf_counter() < end and not pygame.event.peek():
+            await asyncio.sleep(settings.IDLE_POLL)
+
+    async def main(self):
+        """Game main loop, runs until there are no scenes left."""
+        game = self.game
+        self.running = True
+        for coroutine, name in self.pending:
+            self.spawn(coroutine, name)
+        self.pending.clear()
+        game.start()
+        deadline = time.perf_counter()
+        while game.scenes:
+            timeout = game.idle()
+            if timeout is not None:
+                await self.idle(timeout)
+                deadline = time.perf_counter()
+                game.clock.tick()
+                game.wake()
+                game.frame()
+                continue
+            deadline += self.period
+            now = time.perf_counter()
+            # After a long frame the next one is due right away, lost
+            # time isn't caught up with shorter frames.
+            deadline = max(deadline, now)
+            await self.wait(deadline)
+            self.measure(time.perf_counter() - deadline)
+            game.clock.tick()
+            game.frame()
+        tasks = list(self.tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self.running = False
+        game.close()
+
+    def measure(self, late):
+        """Records how late a frame started.
+
+        Args:
+            late: The delay in seconds.
+        """
+        self.frames += 1
+        self.lateness.append(late)
+        if late <= self.jitter:
+            return
+        self.late += 1
+        now = time.perf_counter()
+        # Logged at most once per second.
+        if now - self.last_warning > 1:
+            self.last_warning = now
+            logger.warning(
+                "Frame started %.2fms late, %d tasks running.",
+                late * 1000,
+                len(self.tasks),
+            )
+
+    def report(self):
+        """Describes the frame pacing.
+
+        Returns:
+            A string with the running tasks, the largest recent frame
+            delay and how many frames started late.
+        """
+        return (
+            f"async {len(self.tasks)} tasks {self.frame_jitter:.2f}ms "
+            f"jitter {self.late}/{self.frames} late"
+        )
@@ -1,4 +1,78 @@
-from game import Game
+import argparse
+import logging
+import time
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Intergalactic Uprising")
+    parser.add_argument(
+        "--profile-startup",
+        action="store_true",
+        help="log how long importing, display init, asset load and the "
+        "first frame take",
+    )
+    parser.add_argument(
+        "--renderer",
+        choices=("surface", "texture"),
+        help="blit sprites on the display surface or copy them from "
+        "textures, defaults to the RENDER_BACKEND setting",
+    )
+    parser.add_argument(
+        "--gc",
+        choices=("default", "deferred"),
+        help="leave garbage collection to Python or defer it to safe "
+        "points, defaults to the GC_MODE setting",
+    )
+    parser.add_argument(
+        "--autoplay",
+        action="store_true",
+        help="let a bot play, restarting after every game over, for "
+        "unattended load and soak runs",
+    )
+    parser.add_argument(
+        "--asset-store",
+        metavar="PATH",
+        help="decode the spritesheets once into PATH and share them with "
+        "every game on the host, defaults to the ASSET_STORE setting",
+    )
+    parser.add_argument(
+        "--loop",
+        choices=("blocking", "asyncio"),
+        help="sleep between frames or run them from an asyncio event loop "
+        "along with background tasks, defaults to the MAIN_LOOP setting",
+    )
+    parser.add_argument(
+        "--collision-worker",
+        action="store_true",
+        help="find what sprites may hit in a worker process while frames "
+        "are drawn",
+    )
+    parser.add_argument(
+        "--hot-reload",
+        action="store_true",
+        help="reload sprites, sounds and the font when their files change, "
+        "for tuning assets while playing",
+    )
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    start = time.perf_counter()
+    from game import Game, settings
+
+    startup = None
+    if args.profile_startup:
+        startup = {"import": time.perf_counter() - start}
+    Game(
+        startup,
+        args.renderer or settings.RENDER_BACKEND,
+        args.gc or settings.GC_MODE,
+        args.autoplay,
+        args.asset_store or settings.ASSET_STORE,
+        args.loop or settings.MAIN_LOOP,
+        args.collision_worker or settings.COLLISION_WORKER,
+        args.hot_reload or settings.HOT_RELOAD,
+    ).run()
+
 
 if __name__ == "__main__":
-    Game()
+    main()
@@ -1,10 +1,8 @@
-import pygame
-from kezmenu3 import KezMenu
-
 from game import settings
+from game.scenes import Scene
 
 
-class Menu(object):
+class Menu(Scene):
     """Display game options."""
 
     def __init__(self, game):
@@ -13,7 +11,10 @@ class Menu(object):
         Args:
             game: The running game instance.
         """
-        self.game = game
+        super().__init__(game)
+        # kezmenu3 is only needed once the menu is shown.
+        from kezmenu3 import KezMenu
+
         self.menu = KezMenu(["NEW GAME", self.new_game], ["EXIT", self.exit])
 
         pos = (
@@ -23,41 +24,50 @@ class Menu(object):
         self.menu.position = pos
         self.menu.color = settings.MENU_FONT_COLOR
         self.menu.focus_color = settings.MENU_FONT_FOCUS_COLOR
-        self.menu.font = pygame.font.Font(
-            settings.FONT, settings.MENU_FONT_SIZE
-        )
+        self.render()
         self.menu.enableEffect("raise-col-padding-on-focus", enlarge_time=0.1)
-        self.running = False
+
+    def render(self):
+        """Renders the title and sets the options font.
+
+        The title never changes, it's only rendered again when the font
+        does.
+        """
+        self.menu.font = self.game.font(settings.MENU_FONT_SIZE)
+        centerx = self.game.display.current_w / 2
+        self.titles = []
+        for text, pos in (
+            ("Intergalactic", (centerx - 15, 140)),
+            ("Uprising", (centerx + 108, 171)),
+        ):
+            surface = self.game.render_text(text, settings.FONT_LG_SIZE)
+            self.titles.append((surface, surface.get_rect(midtop=pos)))
 
     def new_game(self):
         """Starts a new game."""
         self.game.new()
-        self.game.run()
+        self.game.scenes.switch(self.game.play)
 
     def exit(self):
         """Exit game."""
-        self.running = False
+        self.game.scenes.clear()
 
-    def draw(self):
-        """Draws menu on screen."""
-        centerx = self.game.display.current_w / 2
-        title1 = {
-            "text": "Intergalactic",
-            "pos": (centerx - 15, 140),
-            "size": settings.FONT_LG_SIZE,
-        }
-        title2 = {
-            "text": "Uprising",
-            "pos": (centerx + 108, 171),
-            "size": settings.FONT_LG_SIZE,
-        }
-        self.running = True
-        while self.running:
-            self.menu.update(
-                pygame.event.get(), self.game.clock.tick(settings.FPS) / 1000.0
-            )
-            self.game.fill_background()
-            self.game.draw_text(**title1)
-            self.game.draw_text(**title2)
-            self.menu.draw(self.game.screen)
-            pygame.display.flip()
+    def idle(self):
+        """The menu only changes with input."""
+        return True
+
+    def update(self):
+        """Updates the menu with the events of the tick."""
+        self.menu.update(
+            list(self.game.input.state.events), 1 / settings.TICK_RATE
+        )
+
+    def draw(self, alpha=1):
+        """Draws menu on screen.
+
+        Args:
+            alpha: Ignored, the menu is not interpolated.
+        """
+        self.game.fill_background()
+        self.game.screen.blits(self.titles, False)
+        self.menu.draw(self.game.screen)
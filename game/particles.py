@@ -0,0 +1,132 @@
+import numpy
+import pygame
+
+from game import settings
+from game.sprites import Explosion
+
+# How each explosion type bursts: number of particles, maximum speed,
+# maximum lifetime in ticks and the colors particles start with.
+BURSTS = {
+    Explosion.Type.ONE: (240, 7, 30, ((255, 240, 150), (255, 160, 40))),
+    Explosion.Type.TWO: (120, 4, 24, ((160, 110, 70), (120, 120, 120))),
+    Explosion.Type.THREE: (300, 8, 34, ((120, 200, 255), (255, 255, 255))),
+    Explosion.Type.FOUR: (300, 8, 34, ((255, 120, 40), (255, 40, 20))),
+    Explosion.Type.FIVE: (400, 9, 40, ((255, 255, 255), (255, 220, 90))),
+}
+
+
+class Particles(object):
+    """Explosions made of particles.
+
+    Positions, velocities, lifetimes and colors of every particle are kept
+    in NumPy arrays. Live particles are packed at the beginning of the
+    arrays, they are all updated at once and drawn writing straight into
+    the target surface pixels.
+    """
+
+    def __init__(self, capacity=settings.PARTICLES_MAX):
+        """Initializes the particle arrays.
+
+        Args:
+            capacity: The maximum number of live particles.
+        """
+        self.capacity = capacity
+        self.pos = numpy.zeros((capacity, 2), numpy.float32)
+        self.vel = numpy.zeros((capacity, 2), numpy.float32)
+        self.life = numpy.zeros(capacity, numpy.float32)
+        self.ttl = numpy.ones(capacity, numpy.float32)
+        self.color = numpy.zeros((capacity, 3), numpy.float32)
+        self.count = 0
+        # How far the next tick is, used to interpolate when drawing.
+        self.alpha = 1
+        self.rng = numpy.random.default_rng()
+
+    def __len__(self):
+        return self.count
+
+    @property
+    def nbytes(self):
+        """Memory used by the particle arrays."""
+        return sum(
+            a.nbytes
+            for a in (self.pos, self.vel, self.life, self.ttl, self.color)
+        )
+
+    def clear(self):
+        """Removes all particles."""
+        self.count = 0
+
+    def emit(self, pos, xtype=None, step=1):
+        """Bursts a new explosion.
+
+        Particles over capacity are dropped.
+
+        Args:
+            pos: The X and Y positions on screen.
+            xtype: The explosion type.
+            step: Only one of every step particles is emitted.
+        """
+        amount, speed, ttl, colors = BURSTS.get(
+            xtype, BURSTS[Explosion.Type.ONE]
+        )
+        amount //= step
+        s = self.count
+        e = min(s + amount, self.capacity)
+        n = e - s
+        if not n:
+            return
+        angle = self.rng.uniform(0, 2 * numpy.pi, n)
+        velocity = self.rng.uniform(0.5, speed, n)
+        self.pos[s:e] = pos
+        self.vel[s:e, 0] = numpy.cos(angle) * velocity
+        self.vel[s:e, 1] = numpy.sin(angle) * velocity
+        self.ttl[s:e] = self.rng.uniform(ttl / 3, ttl, n)
+        self.life[s:e] = self.ttl[s:e]
+        self.color[s:e] = numpy.array(colors, numpy.float32)[
+            self.rng.integers(len(colors), size=n)
+        ]
+        self.count = e
+
+    def update(self):
+        """Moves all particles one tick and drops the dead ones."""
+        n = self.count
+        if not n:
+            return
+        self.pos[:n] += self.vel[:n]
+        self.vel[:n] *= 0.94
+        self.life[:n] -= 1
+        alive = self.life[:n] > 0
+        k = int(alive.sum())
+        if k < n:
+            for a in (self.pos, self.vel, self.life, self.ttl, self.color):
+                a[:k] = a[:n][alive]
+            self.count = k
+
+    def draw(self, surface):
+        """Draws all particles as 2x2 dots in a single pass.
+
+        Args:
+            surface: The target pygame.Surface (8, 16 or 32 bits).
+        """
+        n = self.count
+        if not n:
+            return
+        width, height = surface.get_size()
+        pos = self.pos[:n] - self.vel[:n] * (1 - self.alpha)
+        x = pos[:, 0].astype(numpy.intp)
+        y = pos[:, 1].astype(numpy.intp)
+        inside = (x >= 0) & (x < width - 1) & (y >= 0) & (y < height - 1)
+        x, y = x[inside], y[inside]
+        # Particles fade out as they get older.
+        fade = (self.life[:n] / self.ttl[:n])[inside, None]
+        rgb = (self.color[:n][inside] * fade).astype(numpy.uint32)
+        losses, shifts = surface.get_losses(), surface.get_shifts()
+        mapped = numpy.uint32(surface.get_masks()[3])
+        for i in range(3):
+            mapped = mapped | (rgb[:, i] >> losses[i]) << shifts[i]
+        pixels = pygame.surfarray.pixels2d(surface)
+        pixels[x, y] = mapped
+        pixels[x + 1, y] = mapped
+        pixels[x, y + 1] = mapped
+        pixels[x + 1, y + 1] = mapped
+        del pixels
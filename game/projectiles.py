@@ -0,0 +1,348 @@
+import math
+import time
+from collections import deque
+
+import numpy
+
+from game import settings
+from game.collision import (
+    count_pairs,
+    get_mask,
+    sweep_masks,
+    time_of_impact,
+)
+
+
+class Projectiles(object):
+    """Enemy shots kept in packed arrays.
+
+    Live shots are packed at the beginning of the arrays. Moving, culling
+    and collision against the player, shields, enemies and meteors are
+    done for all shots at once, and they are drawn with a single
+    Surface.blits call. Shots use the same frames and behave like the
+    EnemyLaser sprite.
+
+    Attributes:
+        FRAME_TICKS: Number of ticks each animation frame lasts.
+        IMPACT_TICKS: Number of ticks of the impact animation.
+        DAMAGE: Energy taken from the player on each hit.
+    """
+
+    FRAME_TICKS = 3
+    IMPACT_TICKS = 12
+    DAMAGE = 35
+
+    def __init__(self, game, capacity=settings.PROJECTILES_MAX):
+        """Initializes the shots arrays.
+
+        Args:
+            game: The running game instance.
+            capacity: The maximum number of live shots.
+        """
+        self.game = game
+        self.capacity = capacity
+        self.load_frames()
+        self.pos = numpy.zeros((capacity, 2), numpy.float32)
+        self.vel = numpy.zeros((capacity, 2), numpy.float32)
+        self.age = numpy.zeros(capacity, numpy.int32)
+        # Ticks since the shot has hit something, -1 while flying.
+        self.impact = numpy.zeros(capacity, numpy.int32)
+        self.count = 0
+        # How far the next tick is, used to interpolate when drawing.
+        self.alpha = 1
+        self.times = deque(maxlen=settings.TICK_RATE)
+
+    def __len__(self):
+        return self.count
+
+    def load_frames(self):
+        """Gets the shots frames and the sizes that depend on them.
+
+        Called again when the frames change.
+        """
+        self.frames = self.game.laser_img
+        self.offsets = numpy.array(
+            [(-f.get_width() // 2, -f.get_height() // 2) for f in self.frames]
+        )
+        self.radius = int(self.frames[1].get_width() * 0.9 / 2)
+
+    @property
+    def update_time(self):
+        """Average update time in milliseconds."""
+        return sum(self.times) / len(self.times) * 1000 if self.times else 0
+
+    def clear(self):
+        """Removes all shots."""
+        self.count = 0
+
+    def pack(self):
+        """Packs the live shots, for the rewind.
+
+        Returns:
+            The bytes of the shots rows of each array, one after another.
+        """
+        n = self.count
+        return b"".join(
+            a[:n].tobytes()
+            for a in (self.pos, self.vel, self.age, self.impact)
+        )
+
+    def restore(self, data):
+        """Puts back the shots packed by pack.
+
+        Args:
+            data: The bytes made by pack.
+        """
+        arrays = (self.pos, self.vel, self.age, self.impact)
+        n = len(data) // sum(a[:1].nbytes for a in arrays)
+        offset = 0
+        for a in arrays:
+            rows = a[:n]
+            rows[...] = numpy.frombuffer(
+                data, a.dtype, rows.size, offset
+            ).reshape(rows.shape)
+            offset += rows.nbytes
+        self.count = n
+
+    def fire(self, pos, speed):
+        """Fires a new shot, it's dropped when over capacity.
+
+        Args:
+            pos: The X and Y position of the bottom center of the shot.
+            speed: The speed of the shot on X and Y axis.
+        """
+        if self.count == self.capacity:
+            return
+        i = self.count
+        x, bottom = pos
+        self.pos[i] = (x, bottom - self.frames[1].get_height() / 2)
+        self.vel[i] = speed
+        self.age[i] = 0
+        self.impact[i] = -1
+        self.count += 1
+        self.game.effects.sound(self.game.shot_sfx)
+
+    def update(self):
+        """Moves, collides and culls all shots."""
+        start = time.perf_counter()
+        n = self.count
+        pos, vel = self.pos[:n], self.vel[:n]
+        age, impact = self.age[:n], self.impact[:n]
+        pos += vel
+        age += 1
+        impact[impact >= 0] += 1
+        self.collide(numpy.flatnonzero(impact < 0))
+
+        width, height = (
+            self.game.display.current_w,
+            self.game.display.current_h,
+        )
+        x, y = pos[:, 0], pos[:, 1]
+        keep = (
+            (x > -30)
+            & (x < width + 30)
+            & (y > -60)
+            & (y < height + 60)
+            & (impact < self.IMPACT_TICKS)
+        )
+        k = int(keep.sum())
+        if k < n:
+            for a in (self.pos, self.vel, self.age, self.impact):
+                a[:k] = a[:n][keep]
+            self.count = k
+        self.times.append(time.perf_counter() - start)
+
+    def collide(self, flying):
+        """Checks which flying shots have hit something on their way.
+
+        The path of each shot during the tick is tested against the player,
+        shields, enemies and meteors, so fast shots can't go through them,
+        and the first one on the way is hit.
+
+        Args:
+            flying: Indexes of the shots still flying.
+        """
+        if not len(flying):
+            return
+        vel = self.vel[flying]
+        start = self.pos[flying] - vel
+        # When each shot hits something and the speed of what it hits.
+        first = numpy.full(len(flying), numpy.inf, numpy.float32)
+        speeds = numpy.zeros((len(flying), 2), numpy.float32)
+
+        sprites = [
+            sprite
+            for group in (
+                self.game.shields,
+                self.game.enemies,
+                self.game.meteors,
+            )
+            for sprite in group
+        ]
+        if sprites:
+            count_pairs(len(flying) * len(sprites))
+            centers = numpy.array(
+                [s.rect.center for s in sprites], numpy.float32
+            )
+            radii = numpy.array([s.radius for s in sprites]) + self.radius
+            # Shields don't move, they stop shots.
+            moves = numpy.array(
+                [
+                    (getattr(s, "speedx", 0), getattr(s, "speedy", 0))
+                    for s in sprites
+                ],
+                numpy.float32,
+            )
+            times = self.impact_times(start, vel, centers, moves, radii)
+            target = times.argmin(axis=1)
+            first = times[numpy.arange(len(flying)), target]
+            speeds = moves[target]
+
+        player = self.game.player
+        if player.alive() and not player.hidden:
+            # Only shots crossing the player rect are tested one by one.
+            area = player.rect.inflate(self.radius * 2, self.radius * 2)
+            end = self.pos[flying]
+            near = (
+                (numpy.maximum(start[:, 0], end[:, 0]) >= area.left)
+                & (numpy.minimum(start[:, 0], end[:, 0]) < area.right)
+                & (numpy.maximum(start[:, 1], end[:, 1]) >= area.top)
+                & (numpy.minimum(start[:, 1], end[:, 1]) < area.bottom)
+            )
+            count_pairs(len(flying))
+            for j in numpy.flatnonzero(near):
+                time = self.sweep(flying[j], start[j], player)
+                if time is not None and time <= first[j]:
+                    self.game.effects.damage(player, self.DAMAGE)
+                    first[j] = time
+                    speeds[j] = 0
+
+        hit = first <= 1
+        if not hit.any():
+            return
+        index = flying[hit]
+        time = first[hit, None]
+        # From the point of impact shots move along with what they hit.
+        self.pos[index] = (
+            start[hit] + vel[hit] * time + speeds[hit] * (1 - time)
+        )
+        self.vel[index] = speeds[hit]
+        self.impact[index] = 0
+
+    @staticmethod
+    def impact_times(start, vel, centers, speeds, radii):
+        """Get when shots first get within circles, moving in straight lines.
+
+        Args:
+            start: The shots positions at the start of the tick.
+            vel: The shots speeds.
+            centers: The circles centers at the end of the tick.
+            speeds: The circles speeds.
+            radii: The circles radii, plus the shots radius.
+
+        Returns:
+            An array of fractions of the tick, one row per shot and one
+            column per circle, infinite when they don't meet.
+        """
+        # The shots paths as seen from each circle.
+        offset = start[:, None, :] - (centers - speeds)[None, :, :]
+        motion = vel[:, None, :] - speeds[None, :, :]
+        a = (motion**2).sum(axis=2)
+        b = (offset * motion).sum(axis=2)
+        c = (offset**2).sum(axis=2) - radii**2
+        discriminant = b * b - a * c
+        with numpy.errstate(divide="ignore", invalid="ignore"):
+            enter = (-b - numpy.sqrt(discriminant)) / a
+        inside = c <= 0
+        meet = inside | (
+            (a > 0) & (discriminant >= 0) & (enter >= 0) & (enter <= 1)
+        )
+        return numpy.where(meet, numpy.where(inside, 0, enter), numpy.inf)
+
+    def sweep(self, i, start, sprite):
+        """Get when a shot hits a sprite on its way, like EnemyLaser.
+
+        Args:
+            i: The shot index.
+            start: The X and Y position of the shot at the start of the
+                tick.
+            sprite: A sprite with rect and image.
+
+        Returns:
+            When it hits, a fraction of the tick, or None.
+        """
+        frame = self.frame(i)
+        image = self.frames[frame]
+        rect = image.get_rect(
+            topleft=(self.pos[i].astype(int) + self.offsets[frame]).tolist()
+        )
+        if settings.PIXEL_COLLISION:
+            reach = (
+                math.hypot(*rect.size) + math.hypot(*sprite.rect.size)
+            ) / 2
+        else:
+            radius = getattr(sprite, "radius", None)
+            if radius is None:
+                radius = math.hypot(*sprite.rect.size) / 2
+            reach = radius + self.radius
+        speedx = getattr(sprite, "speedx", 0)
+        speedy = getattr(sprite, "speedy", 0)
+        vx, vy = self.vel[i].tolist()
+        times = time_of_impact(
+            (
+                start[0] - sprite.rect.centerx + speedx,
+                start[1] - sprite.rect.centery + speedy,
+            ),
+            (vx - speedx, vy - speedy),
+            reach,
+        )
+        if times is None:
+            return None
+        if not settings.PIXEL_COLLISION:
+            return times[0]
+        return sweep_masks(get_mask(image), rect, (vx, vy), sprite, *times)
+
+    def frame(self, i):
+        """Get the animation frame of a single shot."""
+        return int(self.frame_indexes(slice(i, i + 1))[0])
+
+    def frame_indexes(self, index):
+        """Get the animation frames of the shots.
+
+        Flying shots loop over frames 1 to 3, after hitting something they
+        play frames 4 to 7.
+
+        Args:
+            index: Which shots, an index array or slice.
+
+        Returns:
+            An array of frame indexes.
+        """
+        flying = 1 + (self.age[index] // self.FRAME_TICKS) % 3
+        impact = 4 + self.impact[index] // self.FRAME_TICKS
+        return numpy.where(
+            self.impact[index] < 0, flying, numpy.minimum(impact, 7)
+        )
+
+    def draw(self, surface):
+        """Draws all shots with a single blits call.
+
+        Args:
+            surface: The target pygame.Surface.
+
+        Returns:
+            The number of blits.
+        """
+        n = self.count
+        if not n:
+            return 0
+        frames = self.frame_indexes(slice(0, n))
+        pos = self.pos[:n] - self.vel[:n] * (1 - self.alpha)
+        topleft = pos.astype(int) + self.offsets[frames]
+        surface.blits(
+            zip(
+                map(self.frames.__getitem__, frames.tolist()), topleft.tolist()
+            ),
+            False,
+        )
+        return n
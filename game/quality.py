@@ -0,0 +1,106 @@
+import logging
+from collections import deque
+
+import pygame
+
+from game import settings
+
+logger = logging.getLogger(__name__)
+
+
+class QualityGovernor(object):
+    """Lowers the quality when frames take too long and raises it back.
+
+    The time spent working on each frame is kept in a rolling window. When
+    the window is full and its average goes over the step down threshold
+    the quality is lowered one level, when it goes under the step up
+    threshold it's raised one level. The thresholds are apart and the
+    window starts over after every change so the quality doesn't bounce
+    between two levels.
+    """
+
+    def __init__(
+        self,
+        levels=settings.QUALITY_LEVELS,
+        window=settings.QUALITY_WINDOW,
+        down=settings.QUALITY_DOWN,
+        up=settings.QUALITY_UP,
+    ):
+        """Initializes the governor at the highest quality.
+
+        Args:
+            levels: A list of (rotation interval, explosion step, sound
+                channels, mob scale) tuples from the highest to the lowest
+                quality.
+            window: The number of frames averaged.
+            down: Average frame time over which the quality is lowered, as
+                a fraction of the frame budget.
+            up: Average frame time under which the quality is raised, as a
+                fraction of the frame budget.
+        """
+        self.levels = levels
+        self.budget = 1 / settings.FPS
+        self.down = down
+        self.up = up
+        self.times = deque(maxlen=window)
+        self.level = 0
+        self.apply()
+
+    @property
+    def frame_time(self):
+        """Average frame time in milliseconds."""
+        return sum(self.times) / len(self.times) * 1000 if self.times else 0
+
+    def apply(self):
+        """Sets the values of the current level."""
+        (
+            self.rotation_interval,
+            self.explosion_step,
+            self.channels,
+            self.mob_scale,
+        ) = self.levels[self.level]
+        pygame.mixer.set_num_channels(self.channels)
+
+    def frame(self, seconds):
+        """Records the time a frame took and adjusts the quality.
+
+        Args:
+            seconds: Time spent updating and drawing, without waiting.
+
+        Returns:
+            True if the quality has changed.
+        """
+        self.times.append(seconds)
+        if len(self.times) < self.times.maxlen:
+            return False
+        average = self.frame_time / 1000
+        if average > self.budget * self.down:
+            level = min(self.level + 1, len(self.levels) - 1)
+        elif average < self.budget * self.up:
+            level = max(self.level - 1, 0)
+        else:
+            return False
+        if level == self.level:
+            return False
+        self.level = level
+        self.apply()
+        logger.info(
+            "Quality level %d after %.1fms frames: meteors rotate every "
+            "%dms, explosions step %d frames, %d sound channels, %d%% mobs.",
+            self.level,
+            self.frame_time,
+            self.rotation_interval,
+            self.explosion_step,
+            self.channels,
+            self.mob_scale * 100,
+        )
+        self.times.clear()
+        return True
+
+    def report(self):
+        """Describes the current quality.
+
+        Returns:
+            A string with the level and the average frame time.
+        """
+        return f"quality {self.level} {self.frame_time:.2f}ms/frame"
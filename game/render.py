@@ -0,0 +1,425 @@
+import logging
+import time
+import weakref
+from collections import deque
+from enum import Enum
+
+import numpy
+import pygame
+
+from game import settings
+
+logger = logging.getLogger(__name__)
+
+
+class Layer(Enum):
+    """Render layers, drawn in this order."""
+
+    BACKGROUND = 0
+    MOBS = 1
+    SHOTS = 2
+    EXPLOSIONS = 3
+    HUD = 4
+
+
+class Renderer(object):
+    """Draws the game layer by layer.
+
+    A layer holds sprite groups and drawers. Sprites from all the groups
+    of a layer which are inside the viewport are submitted with a single
+    Surface.blits call, then the layer drawers are called. Drawers are
+    callables taking no arguments which may return how many blits they
+    did.
+
+    Sprites are drawn between their position before the last tick and
+    the current one, so motion looks smooth when drawing more frames than
+    ticks.
+
+    Attributes:
+        textures: True if sprites are drawn from textures, rotated when
+            copied by their rot angle instead of having rotated frames.
+    """
+
+    textures = False
+
+    def __init__(self, surface):
+        """Initializes the renderer.
+
+        Args:
+            surface: The target pygame.Surface.
+        """
+        self.surface = surface
+        self.viewport = surface.get_rect()
+        self.groups = {layer: [] for layer in Layer}
+        self.drawers = {layer: [] for layer in Layer}
+        self.blits = 0
+        self.culled = 0
+        self.previous = {}
+        self.alpha = 1
+        self.times = deque(maxlen=settings.FPS)
+
+    @property
+    def draw_time(self):
+        """Average draw time in milliseconds."""
+        return sum(self.times) / len(self.times) * 1000 if self.times else 0
+
+    def add(self, layer, *items):
+        """Adds sprite groups or drawers to a layer.
+
+        Args:
+            layer: A Layer.
+            items: Sprite groups (anything pygame sprites can be added to,
+                like entity indexes) or drawers.
+        """
+        for item in items:
+            if hasattr(item, "_spritegroup"):
+                self.groups[layer].append(item)
+            else:
+                self.drawers[layer].append(item)
+
+    def add_atlas(self, sheet):
+        """Does nothing, sprites are blitted from their own frames.
+
+        Args:
+            sheet: A Spritesheet.
+        """
+
+    def copy(self, image, dest):
+        """Draws an image that never changes, like a background layer.
+
+        Args:
+            image: A pygame.Surface, it must not be drawn on afterwards.
+            dest: Where its top left corner goes.
+        """
+        self.surface.blit(image, dest)
+
+    def save(self):
+        """Saves sprites positions, must be called before each tick."""
+        self.previous = {
+            sprite: sprite.rect.center
+            for groups in self.groups.values()
+            for group in groups
+            for sprite in group
+        }
+
+    def position(self, sprite):
+        """Get where a sprite should be drawn.
+
+        Args:
+            sprite: A pygame.sprite.Sprite.
+
+        Returns:
+            A pygame.Rect.
+        """
+        previous = self.previous.get(sprite)
+        if previous is None or self.alpha >= 1:
+            return sprite.rect
+        dx = previous[0] - sprite.rect.centerx
+        dy = previous[1] - sprite.rect.centery
+        # Sprites respawned or hidden should not slide across the screen.
+        if abs(dx) + abs(dy) > settings.INTERPOLATION_LIMIT:
+            return sprite.rect
+        t = 1 - self.alpha
+        return sprite.rect.move(round(dx * t), round(dy * t))
+
+    def batch(self, layer):
+        """Get the blits for the sprites of a layer.
+
+        Args:
+            layer: A Layer.
+
+        Returns:
+            A list of (image, rect) tuples.
+        """
+        colliderect = self.viewport.colliderect
+        batch = []
+        for group in self.groups[layer]:
+            for sprite in group:
+                rect = self.position(sprite)
+                if colliderect(rect):
+                    batch.append((sprite.image, rect))
+        return batch
+
+    def blit(self, batch):
+        """Draws a batch of sprites.
+
+        Args:
+            batch: A list made by batch().
+        """
+        self.surface.blits(batch, False)
+
+    def paint(self, layer):
+        """Calls the drawers of a layer.
+
+        Args:
+            layer: A Layer.
+
+        Returns:
+            The number of blits done by the drawers.
+        """
+        return sum(drawer() or 0 for drawer in self.drawers[layer])
+
+    def draw(self, alpha=1):
+        """Draws all layers.
+
+        Args:
+            alpha: How far the next tick is, from 0 to 1.
+        """
+        start = time.perf_counter()
+        self.alpha = alpha
+        blits = culled = 0
+        for layer in Layer:
+            batch = self.batch(layer)
+            if batch:
+                self.blit(batch)
+            blits += len(batch)
+            culled += sum(len(group) for group in self.groups[layer])
+            culled -= len(batch)
+            blits += self.paint(layer)
+        self.blits = blits
+        self.culled = culled
+        self.times.append(time.perf_counter() - start)
+
+    def present(self):
+        """Puts the frame on screen."""
+        pygame.display.flip()
+
+    def report(self):
+        """Describes the last frame.
+
+        Returns:
+            A string with the number of blits, culled sprites and the
+            average draw time.
+        """
+        return (
+            f"render {self.blits} blits {self.culled} culled "
+            f"{self.draw_time:.2f}ms"
+        )
+
+
+class TextureRenderer(Renderer):
+    """Draws sprites as copies of atlas regions with an SDL renderer.
+
+    Atlases are uploaded once as textures and each sprite is drawn copying
+    the region its frame was cut from, rotated when copied by its rot
+    angle. Images that are not atlas frames are uploaded the first time
+    they're drawn. SDL uses the GPU when there's one and its software
+    renderer otherwise.
+
+    Images that never change, like the background layers, are copied the
+    same way. Everything else (projectiles, particles, HUD and menus) is
+    still drawn on the canvas surface. Before sprites are copied on top of
+    it and when presenting the frame, the regions of the canvas drawn on
+    are uploaded and copied over what's been drawn so far, so layers keep
+    their order. The canvas is transparent elsewhere, those regions are
+    found scanning bands of rows for drawn pixels.
+
+    Attributes:
+        BAND: Rows scanned together, runs of bands drawn on are uploaded
+            as one region.
+    """
+
+    textures = True
+    BAND = 32
+
+    def __init__(self, surface, title):
+        """Opens a window with a renderer.
+
+        Args:
+            surface: The canvas, a pygame.Surface with per-pixel alpha.
+            title: The window title.
+
+        Raises:
+            ImportError: If pygame was built without SDL2.
+            RuntimeError: If SDL can't create the window or the renderer.
+        """
+        # Only needed by this backend, so it's not imported with the module.
+        from pygame._sdl2 import video
+
+        super().__init__(surface)
+        self.video = video
+        self.window = video.Window(title, surface.get_size())
+        self.renderer = video.Renderer(self.window)
+        self.canvas = video.Texture(
+            self.renderer, surface.get_size(), streaming=True
+        )
+        self.canvas.blend_mode = pygame.BLENDMODE_BLEND
+        self.dirty = False
+        self.fresh = True
+        self.regions = weakref.WeakKeyDictionary()
+        self.uploaded = weakref.WeakKeyDictionary()
+        self.uploads = 0
+        self.upload_area = 0
+        self.frame_uploads = 0
+        self.frame_upload_area = 0
+
+    def add_atlas(self, sheet):
+        """Uploads an atlas, its frames are copied from the texture.
+
+        Args:
+            sheet: A Spritesheet, frames cut afterwards are not known.
+        """
+        image = sheet.image.copy()
+        image.set_colorkey(sheet.color_key)
+        try:
+            texture = self.video.Texture.from_surface(self.renderer, image)
+        except RuntimeError as e:
+            # Like atlases bigger than the GPU allows.
+            logger.warning("Uploading frames one by one: %s", e)
+            return
+        for frame, area in sheet.regions.items():
+            self.regions[frame] = (texture, area)
+
+    def copy(self, image, dest):
+        """Copies an image that never changes, it's uploaded once.
+
+        Args:
+            image: A pygame.Surface, it must not be drawn on afterwards.
+            dest: Where its top left corner goes.
+        """
+        self.flush()
+        self.start()
+        texture, area = self.region(image)
+        texture.draw(area, pygame.Rect(dest, image.get_size()))
+
+    def region(self, image):
+        """Get where an image is drawn from.
+
+        Args:
+            image: A pygame.Surface.
+
+        Returns:
+            A (texture, area) tuple, area is None for the whole texture.
+        """
+        region = self.regions.get(image)
+        if region is None:
+            region = self.uploaded.get(image)
+        if region is None:
+            texture = self.video.Texture.from_surface(self.renderer, image)
+            region = self.uploaded[image] = (texture, None)
+        return region
+
+    def batch(self, layer):
+        """Get the copies for the sprites of a layer.
+
+        Args:
+            layer: A Layer.
+
+        Returns:
+            A list of (image, rect, angle) tuples.
+        """
+        colliderect = self.viewport.colliderect
+        batch = []
+        for group in self.groups[layer]:
+            for sprite in group:
+                rect = self.position(sprite)
+                if colliderect(rect):
+                    batch.append(
+                        (sprite.image, rect, getattr(sprite, "rot", 0))
+                    )
+        return batch
+
+    def blit(self, batch):
+        """Copies a batch of sprites over the canvas.
+
+        Args:
+            batch: A list made by batch().
+        """
+        self.flush()
+        self.start()
+        region = self.region
+        for image, rect, angle in batch:
+            texture, area = region(image)
+            # SDL rotates clockwise, pygame counterclockwise.
+            texture.draw(area, rect, -angle)
+
+    def paint(self, layer):
+        """Calls the drawers of a layer, they draw on the canvas.
+
+        Args:
+            layer: A Layer.
+
+        Returns:
+            The number of blits done by the drawers.
+        """
+        if self.drawers[layer]:
+            self.dirty = True
+        return super().paint(layer)
+
+    def start(self):
+        """Clears the window before the first copy of a frame."""
+        if self.fresh:
+            self.renderer.clear()
+            self.fresh = False
+
+    def changed(self):
+        """Get the regions of the canvas drawn on since it was cleared.
+
+        Returns:
+            A list of pygame.Rect.
+        """
+        pixels = pygame.surfarray.pixels2d(self.surface)
+        height = pixels.shape[1]
+        bands = numpy.logical_or.reduceat(
+            pixels.any(axis=0), range(0, height, self.BAND)
+        )
+        # Where runs of drawn bands start and stop.
+        edges = numpy.flatnonzero(numpy.diff(bands, prepend=0, append=0))
+        rects = []
+        for first, last in zip(edges[::2], edges[1::2]):
+            top = first * self.BAND
+            bottom = min(last * self.BAND, height)
+            columns = numpy.flatnonzero(pixels[:, top:bottom].any(axis=1))
+            rects.append(
+                pygame.Rect(
+                    columns[0],
+                    top,
+                    columns[-1] - columns[0] + 1,
+                    bottom - top,
+                )
+            )
+        return rects
+
+    def flush(self):
+        """Copies the canvas regions drawn on, if any, and clears them."""
+        if not self.dirty:
+            return
+        self.dirty = False
+        rects = self.changed()
+        if not rects:
+            return
+        self.start()
+        for rect in rects:
+            self.canvas.update(self.surface.subsurface(rect), rect)
+            self.canvas.draw(rect, rect)
+            self.surface.fill((0, 0, 0, 0), rect)
+            self.upload_area += rect.w * rect.h
+        self.uploads += len(rects)
+
+    def present(self):
+        """Puts the frame on screen."""
+        # Scenes draw on the canvas outside draw() too.
+        self.dirty = True
+        self.flush()
+        self.renderer.present()
+        self.fresh = True
+        self.frame_uploads = self.uploads
+        self.frame_upload_area = self.upload_area
+        self.uploads = 0
+        self.upload_area = 0
+
+    def report(self):
+        """Describes the last frame.
+
+        Returns:
+            A string with the number of copies, culled sprites, canvas
+            regions uploaded and how much of the canvas they cover, and
+            the average draw time.
+        """
+        width, height = self.surface.get_size()
+        share = self.frame_upload_area / (width * height)
+        return (
+            f"render {self.blits} copies {self.culled} culled "
+            f"{self.frame_uploads} uploads ({share:.0%}) "
+            f"{self.draw_time:.2f}ms"
+        )
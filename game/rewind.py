@@ -0,0 +1,396 @@
+import math
+import sys
+import time
+import zlib
+from array import array
+from collections import deque
+from enum import Enum
+
+from game import settings
+
+
+class Segment(object):
+    """A keyframe followed by the ticks encoded against it.
+
+    Every tick of a segment shares the same roster (the sprites alive and
+    the groups they belong to) and the same table of images, so the ticks
+    themselves only hold numbers. Enemy shots come and go too often to
+    share a roster, each tick keeps its own copy of them.
+    """
+
+    def __init__(self, roster):
+        """Starts a new segment.
+
+        Args:
+            roster: A tuple of (sprite, groups) pairs.
+        """
+        self.roster = roster
+        self.sprites = tuple(sprite for sprite, _ in roster)
+        self.images = []
+        self.images_index = {}
+        self.ticks = []
+        self.shots = []
+        self.size = 16 * len(roster)
+        # The last tick decoded and its packed state, stepping back from it
+        # only takes the delta popped.
+        self.decoded = None
+
+    def image_id(self, image):
+        """Interns an image returning its position in the table.
+
+        Args:
+            image: A pygame.Surface shown by some sprite.
+
+        Returns:
+            The image position in the segment table.
+        """
+        index = self.images_index.get(image)
+        if index is None:
+            index = len(self.images)
+            self.images_index[image] = index
+            self.images.append(image)
+            self.size += 16
+        return index
+
+    def replace_images(self, replacements):
+        """Swaps images in the table, keeping their positions.
+
+        Args:
+            replacements: A dict of old to new pygame.Surface.
+        """
+        self.images = [replacements.get(i, i) for i in self.images]
+        self.images_index = {image: i for i, image in enumerate(self.images)}
+
+    def add(self, delta, shots):
+        """Appends a tick.
+
+        Args:
+            delta: The packed state for the keyframe, otherwise the XOR
+                between this tick and the previous one.
+            shots: The enemy shots packed by Projectiles.pack.
+        """
+        self.ticks.append(zlib.compress(delta, 1))
+        self.shots.append(zlib.compress(shots, 1))
+        self.size += sys.getsizeof(self.ticks[-1])
+        self.size += sys.getsizeof(self.shots[-1])
+
+    def pop(self):
+        """Drops the last tick.
+
+        Returns:
+            The size the tick took.
+        """
+        tick = self.ticks.pop()
+        shots = self.shots.pop()
+        if self.decoded is not None and self.decoded[0] == len(self.ticks):
+            index, raw = self.decoded
+            self.decoded = (
+                (index - 1, xor(raw, zlib.decompress(tick)))
+                if self.ticks
+                else None
+            )
+        return sys.getsizeof(tick) + sys.getsizeof(shots)
+
+    def decode(self, index):
+        """Rebuilds the packed state of a tick.
+
+        It starts from the last tick decoded when it's not after it, so
+        going back tick by tick decodes the segment only once.
+
+        Args:
+            index: The tick position within the segment.
+
+        Returns:
+            An array with the packed state.
+        """
+        if self.decoded is not None and self.decoded[0] <= index:
+            start, raw = self.decoded
+        else:
+            start, raw = 0, zlib.decompress(self.ticks[0])
+        for tick in self.ticks[start + 1 : index + 1]:
+            raw = xor(raw, zlib.decompress(tick))
+        self.decoded = (index, raw)
+        state = array("d")
+        state.frombytes(raw)
+        return state
+
+    def decode_shots(self, index):
+        """Get the enemy shots of a tick.
+
+        Args:
+            index: The tick position within the segment.
+
+        Returns:
+            The shots packed by Projectiles.pack.
+        """
+        return zlib.decompress(self.shots[index])
+
+
+def xor(a, b):
+    """XOR two byte strings of the same length."""
+    n = int.from_bytes(a, "little") ^ int.from_bytes(b, "little")
+    return n.to_bytes(len(a), "little")
+
+
+class Rewind(object):
+    """Records the last seconds of a game so it can be played backwards.
+
+    Every tick the state of each sprite in Game.sprites is packed into an
+    array of numbers. The first tick of a segment is stored as a keyframe
+    and the following ones as the XOR against the previous tick, which is
+    mostly zeros and compresses really well. Enemy shots are packed apart
+    and compressed as they are. Segments live in a ring buffer limited by
+    both the number of ticks and a hard memory cap.
+
+    Attributes:
+        HEADER: Number of slots used by the game state.
+        ATTRIBUTES: Sprite attributes packed, when a sprite has them.
+        FLAGS: The attributes restored as booleans.
+        FIELDS: Number of slots used by each sprite: its center, the
+            attributes, its state, its target and its image.
+    """
+
+    HEADER = 7
+    ATTRIBUTES = (
+        "speedx",
+        "speedy",
+        "subx",
+        "suby",
+        "radius",
+        "damage",
+        "rot",
+        "rot_speed",
+        "animating",
+        "repeat_animation",
+        "delay",
+        "bounce",
+        "reload",
+        "respawn",
+        "shield",
+        "reloading",
+        "cooldown",
+        "waypoint",
+        "attack",
+        "volleys",
+        "fired",
+        "frame",
+        "age",
+    )
+    FLAGS = frozenset(("animating", "shield", "reloading"))
+    FIELDS = 2 + len(ATTRIBUTES) + 4
+
+    def __init__(
+        self,
+        game,
+        seconds=settings.REWIND_SECONDS,
+        memory=settings.REWIND_MEMORY,
+        keyframe=settings.REWIND_KEYFRAME,
+    ):
+        """Initializes the rewind buffer.
+
+        Args:
+            game: The running game instance.
+            seconds: How many seconds of history to keep.
+            memory: The hard memory cap in bytes.
+            keyframe: The maximum number of ticks between keyframes.
+        """
+        self.game = game
+        self.capacity = seconds * settings.TICK_RATE
+        self.memory = memory
+        self.keyframe = keyframe
+        self.segments = deque()
+        self.ticks = 0
+        self.size = 0
+        self.last = None
+        self.record_time = 0
+        self.recorded = 0
+
+    def clear(self):
+        """Forgets all the history."""
+        self.segments.clear()
+        self.ticks = 0
+        self.size = 0
+        self.last = None
+
+    def replace_images(self, replacements):
+        """Swaps images in the history, for when assets are reloaded.
+
+        Args:
+            replacements: A dict of old to new pygame.Surface.
+        """
+        for segment in self.segments:
+            segment.replace_images(replacements)
+
+    def pack(self, segment):
+        """Packs the current game state.
+
+        Args:
+            segment: The segment used to intern sprite images.
+
+        Returns:
+            An array with the packed state.
+        """
+        player = self.game.player
+        state = array(
+            "d",
+            (
+                self.game.score,
+                self.game.level,
+                self.game.enemies_remaining,
+                player.lives,
+                player.energy,
+                player.cannon,
+                player.hidden,
+            ),
+        )
+        for sprite in segment.sprites:
+            state.append(sprite.rect.centerx)
+            state.append(sprite.rect.centery)
+            state.extend(getattr(sprite, name, 0) for name in self.ATTRIBUTES)
+            # Boss states, other sprites have none or one that isn't
+            # simulated.
+            phase = getattr(sprite, "state", None)
+            state.append(phase.value if isinstance(phase, Enum) else -1)
+            # Targets are a position, with no Y when only X matters, or
+            # None.
+            target = getattr(sprite, "target", None) or (math.nan, None)
+            state.append(target[0])
+            state.append(math.nan if target[1] is None else target[1])
+            state.append(segment.image_id(sprite.image))
+        return state
+
+    def record(self):
+        """Records the current tick."""
+        start = time.perf_counter()
+        sprites = tuple(self.game.sprites)
+        segment = self.segments[-1] if self.segments else None
+        size = segment.size if segment else 0
+        # A new keyframe is needed whenever sprites were added or killed.
+        if (
+            segment is None
+            or segment.sprites != sprites
+            or len(segment.ticks) >= self.keyframe
+        ):
+            segment = Segment(
+                tuple((sprite, tuple(sprite.groups())) for sprite in sprites)
+            )
+            self.segments.append(segment)
+            self.last = None
+            size = 0
+        state = self.pack(segment)
+        shots = self.game.projectiles.pack()
+        if self.last is None:
+            segment.add(state.tobytes(), shots)
+        else:
+            segment.add(xor(self.last.tobytes(), state.tobytes()), shots)
+        self.size += segment.size - size
+        self.last = state
+        self.ticks += 1
+        self.evict()
+        self.record_time += time.perf_counter() - start
+        self.recorded += 1
+
+    def evict(self):
+        """Drops the oldest segments while over the limits.
+
+        The newest segment is always kept.
+        """
+        while len(self.segments) > 1 and (
+            self.ticks > self.capacity or self.size > self.memory
+        ):
+            segment = self.segments.popleft()
+            self.ticks -= len(segment.ticks)
+            self.size -= segment.size
+
+    def step_back(self):
+        """Goes one tick back in time.
+
+        Returns:
+            False if there is no more history to go back to.
+        """
+        if self.ticks < 2:
+            return False
+        segment = self.segments[-1]
+        size = segment.pop()
+        self.ticks -= 1
+        if segment.ticks:
+            segment.size -= size
+            self.size -= size
+        else:
+            self.segments.pop()
+            self.size -= segment.size
+            segment = self.segments[-1]
+        index = len(segment.ticks) - 1
+        self.last = segment.decode(index)
+        self.restore(segment, self.last, segment.decode_shots(index))
+        return True
+
+    def restore(self, segment, state, shots):
+        """Puts the game back in a recorded state.
+
+        Args:
+            segment: The segment the state belongs to.
+            state: An array with the packed state.
+            shots: The enemy shots packed by Projectiles.pack.
+        """
+        self.game.projectiles.restore(shots)
+        for sprite in self.game.sprites.sprites():
+            if sprite not in segment.sprites:
+                sprite.kill()
+
+        player = self.game.player
+        (
+            self.game.score,
+            self.game.level,
+            self.game.enemies_remaining,
+            player.lives,
+            player.energy,
+            player.cannon,
+            player.hidden,
+        ) = (int(value) for value in state[: self.HEADER])
+        player.hidden = bool(player.hidden)
+
+        for i, (sprite, groups) in enumerate(segment.roster):
+            offset = self.HEADER + i * self.FIELDS
+            fields = state[offset : offset + self.FIELDS]
+            cx, cy = fields[:2]
+            phase, x, y, image = fields[-4:]
+            sprite.add(*groups)
+            for name, value in zip(self.ATTRIBUTES, fields[2:-4]):
+                if hasattr(sprite, name):
+                    setattr(
+                        sprite,
+                        name,
+                        bool(value) if name in self.FLAGS else number(value),
+                    )
+            if isinstance(getattr(sprite, "state", None), Enum):
+                sprite.state = type(sprite.state)(int(phase))
+            if hasattr(sprite, "target"):
+                sprite.target = (
+                    None
+                    if math.isnan(x)
+                    else (int(x), None if math.isnan(y) else int(y))
+                )
+            sprite.image = segment.images[int(image)]
+            sprite.rect = sprite.image.get_rect()
+            sprite.rect.center = (int(cx), int(cy))
+
+    def report(self):
+        """Describes the recording cost.
+
+        Returns:
+            A string with the average recording time per tick, the memory
+            used per second of history and the seconds available.
+        """
+        tick = self.record_time / self.recorded * 1000 if self.recorded else 0
+        seconds = self.ticks / settings.TICK_RATE
+        per_second = self.size / seconds / 1024 if seconds else 0
+        return (
+            f"rewind {tick:.2f}ms/tick {per_second:.1f}KB/s "
+            f"{seconds:.1f}s {self.size / 1024:.0f}KB"
+        )
+
+
+def number(value):
+    """Converts a stored float back to int when it has no fraction."""
+    return int(value) if value.is_integer() else value
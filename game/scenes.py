@@ -0,0 +1,331 @@
+import logging
+import time
+from collections import deque
+
+import pygame
+
+from game import settings
+from game.controls import Action
+
+logger = logging.getLogger(__name__)
+
+
+class Scene(object):
+    """A screen of the game, like the main menu or the game itself.
+
+    Scenes are created once and reused, entering a scene must not load
+    anything. The topmost scene of the stack is updated once per tick and
+    drawn once per frame.
+
+    Attributes:
+        still: True if the background doesn't scroll in the scene.
+    """
+
+    still = False
+
+    def __init__(self, game):
+        """Initializes the scene.
+
+        Args:
+            game: The running game instance.
+        """
+        self.game = game
+
+    def render(self):
+        """Renders the static texts of the scene.
+
+        Called again when the font changes.
+        """
+
+    def start(self):
+        """Called when the scene becomes the topmost one."""
+
+    def stop(self):
+        """Called when the scene stops being the topmost one."""
+
+    def update(self):
+        """Updates the scene one tick."""
+
+    def idle(self):
+        """Tells if the scene only changes with input.
+
+        Scenes that do are only redrawn when input comes once the player
+        stops using them, instead of at FPS.
+        """
+        return False
+
+    def draw(self, alpha=1):
+        """Draws the scene.
+
+        Args:
+            alpha: How far the next tick is, from 0 to 1.
+        """
+
+
+class SceneStack(object):
+    """Stack of scenes driven by the game main loop.
+
+    Only the topmost scene is updated and drawn. The time from a switch
+    until the new scene has drawn its first frame is measured.
+    """
+
+    def __init__(self):
+        """Initializes an empty stack."""
+        self.scenes = []
+        self.started = None
+        self.times = deque(maxlen=10)
+
+    def __len__(self):
+        return len(self.scenes)
+
+    @property
+    def top(self):
+        """The topmost scene or None."""
+        return self.scenes[-1] if self.scenes else None
+
+    @property
+    def transition_time(self):
+        """Average transition time in milliseconds."""
+        return sum(self.times) / len(self.times) * 1000 if self.times else 0
+
+    def switching(self):
+        """Exits the topmost scene before changing it."""
+        if self.started is None:
+            self.started = time.perf_counter()
+        if self.scenes:
+            self.scenes[-1].stop()
+
+    def push(self, scene):
+        """Puts a scene over the current one.
+
+        Args:
+            scene: A Scene.
+        """
+        self.switching()
+        self.scenes.append(scene)
+        scene.start()
+
+    def pop(self):
+        """Goes back to the previous scene."""
+        self.switching()
+        self.scenes.pop()
+        if self.scenes:
+            self.scenes[-1].start()
+
+    def switch(self, scene):
+        """Replaces all scenes with a new one.
+
+        Args:
+            scene: A Scene.
+        """
+        self.switching()
+        self.scenes.clear()
+        self.scenes.append(scene)
+        scene.start()
+
+    def clear(self):
+        """Removes all scenes, ending the main loop."""
+        self.switching()
+        self.scenes.clear()
+        self.started = None
+
+    def update(self):
+        """Updates the topmost scene."""
+        if self.scenes:
+            self.scenes[-1].update()
+
+    def draw(self, alpha=1):
+        """Draws the topmost scene.
+
+        Args:
+            alpha: How far the next tick is, from 0 to 1.
+        """
+        if not self.scenes:
+            return
+        self.scenes[-1].draw(alpha)
+        if self.started is not None:
+            self.times.append(time.perf_counter() - self.started)
+            logger.debug(
+                "Switched to %s in %.2fms",
+                type(self.scenes[-1]).__name__,
+                self.times[-1] * 1000,
+            )
+            self.started = None
+
+
+class Play(Scene):
+    """The game itself."""
+
+    def start(self):
+        """Starts the music if it's not playing yet."""
+        if not pygame.mixer.music.get_busy():
+            pygame.mixer.music.play(loops=-1)
+        self.game.garbage.start()
+
+    def stop(self):
+        """Lets garbage be collected as usual."""
+        self.game.garbage.stop()
+
+    def update(self):
+        """Runs a game tick and handles pausing and leaving."""
+        state = self.game.input.state
+        if Action.BACK in state.pressed:
+            self.leave()
+            return
+        if Action.PAUSE in state.pressed:
+            self.game.scenes.push(self.game.pause)
+            return
+        self.game.rewinding = Action.REWIND in state.held
+        self.game.step()
+        if not self.game.player.alive():
+            self.game.scenes.push(self.game.game_over)
+
+    def leave(self):
+        """Goes back to the main menu."""
+        self.game.scenes.switch(self.game.main_menu)
+        pygame.mixer.music.fadeout(500)
+        logger.info(self.game.renderer.report())
+        logger.info(self.game.rewind.report())
+        logger.info(self.game.garbage.report())
+
+    def draw(self, alpha=1):
+        """Draws the game.
+
+        Args:
+            alpha: How far the next tick is, from 0 to 1.
+        """
+        self.game.draw_world(alpha)
+
+
+class Pause(Scene):
+    """The game stopped, drawn dimmed under a message."""
+
+    still = True
+
+    def __init__(self, game):
+        """Renders the static layer of the scene.
+
+        Args:
+            game: The running game instance.
+        """
+        super().__init__(game)
+        self.render()
+
+    def render(self):
+        """Renders the message over a dimmed layer."""
+        game = self.game
+        self.layer = pygame.Surface(
+            (game.display.current_w, game.display.current_h), pygame.SRCALPHA
+        )
+        self.layer.fill((0, 0, 0, 160))
+        centerx = game.display.current_w / 2
+        centery = game.display.current_h / 2
+        for text, pos, size in (
+            ("Paused", (centerx, centery - 48), settings.FONT_LG_SIZE),
+            ("[P] resume.", (centerx, centery + 24), None),
+            ("[Escape] main menu.", (centerx, centery + 48), None),
+        ):
+            surface = game.render_text(text, size or settings.FONT_SIZE)
+            self.layer.blit(surface, surface.get_rect(midtop=pos))
+
+    def start(self):
+        """Pauses the music and the background."""
+        pygame.mixer.music.pause()
+        self.game.starfield.pause()
+
+    def stop(self):
+        """Resumes the music and the background."""
+        pygame.mixer.music.unpause()
+        self.game.starfield.resume()
+
+    def idle(self):
+        """Nothing moves while paused."""
+        return True
+
+    def update(self):
+        """Resumes or leaves the game."""
+        state = self.game.input.state
+        if Action.PAUSE in state.pressed or Action.CONFIRM in state.pressed:
+            self.game.scenes.pop()
+        elif Action.BACK in state.pressed:
+            self.game.play.leave()
+
+    def draw(self, alpha=1):
+        """Draws the game as it was when paused and the message.
+
+        Args:
+            alpha: Ignored, the game is not moving.
+        """
+        self.game.draw_world()
+        self.game.renderer.copy(self.layer, (0, 0))
+
+
+class GameOver(Scene):
+    """The game after the player lost all lives."""
+
+    def __init__(self, game):
+        """Renders the static layer of the scene.
+
+        Args:
+            game: The running game instance.
+        """
+        super().__init__(game)
+        self.render()
+        self.ticks = 0
+
+    def render(self):
+        """Renders the message."""
+        game = self.game
+        self.texts = []
+        centerx = game.display.current_w / 2
+        centery = game.display.current_h / 2
+        for text, pos, size in (
+            ("Game Over", (centerx, centery - 48), settings.FONT_LG_SIZE),
+            ("[Return] play again.", (centerx, centery + 24), None),
+            ("[Escape] main menu.", (centerx, centery + 48), None),
+        ):
+            surface = game.render_text(text, size or settings.FONT_SIZE)
+            self.texts.append((surface, surface.get_rect(midtop=pos)))
+
+    def start(self):
+        """Lets the game run a while longer."""
+        self.ticks = 0
+
+    def idle(self):
+        """Once the game freezes it only changes with input."""
+        return (
+            not self.game.autoplay and self.ticks >= settings.GAME_OVER_TICKS
+        )
+
+    def update(self):
+        """Keeps the game running for a while, then freezes it, until the
+        player chooses what to do.
+
+        When autoplaying a new game starts right away.
+        """
+        state = self.game.input.state
+        if self.game.autoplay:
+            logger.info(
+                "Autoplay game over at level %d with %d points, %s",
+                self.game.level,
+                self.game.score,
+                self.game.controller.report(),
+            )
+        if Action.CONFIRM in state.pressed or self.game.autoplay:
+            self.game.new()
+            self.game.scenes.switch(self.game.play)
+        elif Action.BACK in state.pressed:
+            self.game.play.leave()
+        elif self.ticks < settings.GAME_OVER_TICKS:
+            self.ticks += 1
+            self.game.rewinding = False
+            self.game.step()
+
+    def draw(self, alpha=1):
+        """Draws the game and the message.
+
+        Args:
+            alpha: How far the next tick is, from 0 to 1.
+        """
+        self.game.draw_world(alpha)
+        self.game.screen.blits(self.texts, False)
@@ -1,7 +1,32 @@
 import os
 
 # General settings.
-FPS = 30
+# The simulation runs at a fixed TICK_RATE while frames are drawn at up to
+# FPS, interpolating sprites positions between ticks.
+TICK_RATE = 30
+FPS = 60
+# How the main loop waits for the next frame: "blocking" sleeps, "asyncio"
+# runs frames from an asyncio event loop so tasks can run between them.
+MAIN_LOOP = "blocking"
+# How late in milliseconds a frame may start, with the asyncio main loop,
+# before it's reported.
+ASYNC_JITTER = 2
+# How long in milliseconds the asyncio main loop yields to tasks, instead
+# of sleeping, right before a frame. It keeps the CPU busy meanwhile.
+ASYNC_SPIN = 1
+# Screens waiting for input (menu, pause and game over) stop drawing at FPS
+# once no input came for IDLE_DELAY seconds, they sleep until an event
+# comes or IDLE_TIMEOUT seconds go by. IDLE_POLL is how often, in seconds,
+# events are checked for instead with the asyncio main loop.
+IDLE_DELAY = 0.5
+IDLE_TIMEOUT = 1
+IDLE_POLL = 0.05
+# Ticks the game keeps running after a game over before freezing.
+GAME_OVER_TICKS = 2 * TICK_RATE
+# Ticks run at most per frame when catching up.
+MAX_TICKS_PER_FRAME = 5
+# Sprites moving more than this (in pixels) in a tick are not interpolated.
+INTERPOLATION_LIMIT = 64
 WIDTH = 720
 HEIGHT = 720
 
@@ -18,15 +43,20 @@ RES_DIR = os.path.join(os.path.dirname(__file__), "res")
 FNT_DIR = os.path.join(RES_DIR, "font")
 SND_DIR = os.path.join(RES_DIR, "sound")
 SPR_DIR = os.path.join(RES_DIR, "sprite")
+BOSS_DIR = os.path.join(RES_DIR, "boss")
+
+# Bosses definitions.
+BOSSES_DEF = os.path.join(BOSS_DIR, "bosses.json")
+# Number of directions precomputed for aimed bullet patterns.
+AIM_DIRECTIONS = 64
 
 # Image resources.
 SPRITESHEET_IMG = os.path.join(SPR_DIR, "sheet.png")
 PLAYER_SPRITESHEET_IMG = os.path.join(SPR_DIR, "player_spritesheet.png")
-PLAYER_IMG = (f"ship0{i:02}.png" for i in range(76))
+PLAYER_IMG = tuple(f"ship0{i:02}.png" for i in range(76))
 PLAYER_ICO_IMG = "playerLife3_orange.png"
 ENEMIES_SPRITESHEET_IMG = os.path.join(SPR_DIR, "enemies_spritesheet.png")
-ENEMIES_IMG = (f"ship{i}{j:02}.png" for i in range(20) for j in range(60))
-BOSSES_IMG = ["spaceShips_001.png"]
+ENEMIES_IMG = tuple(f"ship{i}{j:02}.png" for i in range(20) for j in range(60))
 METEORS_IMG = (
     "meteorBrown_big1.png",
     "meteorBrown_big2.png",
@@ -50,7 +80,7 @@ METEORS_IMG = (
     "meteorGrey_tiny2.png",
 )
 EXPLOSIONS_SPRITESHEET_IMG = os.path.join(SPR_DIR, "exp_spritesheet.png")
-EXPLOSIONS_IMG = (
+EXPLOSIONS_IMG = tuple(
     f"explosion{k}{i:02}.png"
     for k, r in enumerate([64, 71, 82, 74, 65])
     for i in range(r)
@@ -71,7 +101,20 @@ LASER_IMG = (
     "laserRed11.png",
     "laserRed09.png",
 )
-SHIELD_IMG = ["shield1.png", "shield2.png", "shield3.png"]
+SHIELD_IMG = ("shield1.png", "shield2.png", "shield3.png")
+# How sprites are drawn: "surface" blits them on the display surface,
+# "texture" copies them from atlas textures with an SDL renderer.
+RENDER_BACKEND = "surface"
+# Path of a file where spritesheets are decoded once and shared, memory
+# mapped, by every game on the host. None decodes them in each game.
+ASSET_STORE = None
+# How each frame set blits fastest on this host, measured when missing.
+BLIT_FORMATS_FILE = os.path.join(SPR_DIR, "blit_formats.json")
+# Reload the spritesheets, sounds and font while the game runs when their
+# files change, checked every HOT_RELOAD_INTERVAL seconds. Meant for
+# tuning assets, only the changed frames are cut again.
+HOT_RELOAD = False
+HOT_RELOAD_INTERVAL = 0.5
 
 # SFX resources.
 MAIN_THEME_SFX = os.path.join(SND_DIR, "sfx_railJet.ogg")
@@ -94,5 +137,119 @@ MENU_FONT_FOCUS_COLOR = (255, 255, 255)
 # Player settings.
 SPEED = 5
 
+# Use pixel perfect collision for shots.
+PIXEL_COLLISION = True
+
+# Find what enemies, meteors and shots may hit in a worker process, while
+# frames are drawn, so each sprite only tests those. The worker gets up to
+# CAPACITY sprites and finds up to PAIRS pairs, expecting sprites to stray
+# up to MARGIN pixels a tick from their course. VERIFY checks every list
+# against a whole group scan, for testing.
+COLLISION_WORKER = False
+COLLISION_WORKER_CAPACITY = 4096
+COLLISION_WORKER_PAIRS = 65536
+COLLISION_WORKER_MARGIN = 8
+COLLISION_WORKER_VERIFY = False
+
+# Draw explosions with particles instead of the explosions spritesheet.
+PARTICLE_EXPLOSIONS = True
+PARTICLES_MAX = 8192
+
+# Starfield layers as (stars, speed in px/s, brightness, radius) and the
+# budget in milliseconds for drawing them.
+STARFIELD_LAYERS = [(160, 12, 110, 1), (70, 35, 180, 1), (25, 80, 255, 2)]
+STARFIELD_BUDGET = 2.0
+
+# Keep enemy shots in arrays instead of EnemyLaser sprites.
+BULLET_ENGINE = True
+PROJECTILES_MAX = 8192
+
+# Entity components, each one is a system and they are updated in this
+# order every tick.
+ENTITY_SYSTEMS = (
+    "players",
+    "shields",
+    "enemies",
+    "bosses",
+    "meteors",
+    "shots",
+    "enemies_shots",
+    "pows",
+    "explosions",
+)
+
+# Maximum number of sprites spawned per tick.
+SPAWN_LIMIT = 8
+
+# Rewind settings (hold backspace to rewind).
+REWIND_SECONDS = 30
+REWIND_MEMORY = 32 * 1024 * 1024
+REWIND_KEYFRAME = 30
+
+# Input bindings, keys are given by their pygame names and gamepad
+# buttons by their numbers. Sticks and hats always move the player.
+KEY_BINDINGS = {
+    "left": ["left", "a"],
+    "right": ["right", "d"],
+    "up": ["up", "w"],
+    "down": ["down", "s"],
+    "fire": ["space"],
+    "confirm": ["return"],
+    "back": ["escape"],
+    "rewind": ["backspace"],
+    "pause": ["p"],
+}
+PAD_BINDINGS = {
+    "fire": [0],
+    "confirm": [1],
+    "back": [6],
+    "rewind": [4],
+    "pause": [7],
+}
+PAD_DEADZONE = 0.5
+
+# Quality levels from the highest to the lowest: meteor rotation interval
+# (ms), explosion frames advanced per tick (particles emitted are divided
+# by it), sound channels and the fraction of mob_limit spawned.
+QUALITY_LEVELS = (
+    (50, 1, 8, 1.0),
+    (100, 1, 8, 0.9),
+    (100, 2, 6, 0.8),
+    (200, 2, 6, 0.7),
+    (400, 3, 4, 0.6),
+)
+# Frames averaged before changing the quality.
+QUALITY_WINDOW = 60
+# Average frame time, as a fraction of 1 / FPS, over which the quality is
+# lowered and under which it's raised.
+QUALITY_DOWN = 0.9
+QUALITY_UP = 0.5
+
+# Telemetry is off unless a target is set, either a file path or
+# "tcp://host:port". Run "python -m game.telemetry" for a local collector.
+TELEMETRY_TARGET = None
+# "openmetrics" or "ndjson".
+TELEMETRY_FORMAT = "openmetrics"
+# Seconds between snapshots and how many can wait to be written.
+TELEMETRY_INTERVAL = 5
+TELEMETRY_QUEUE = 64
+
+# Garbage collection: "default" leaves it to Python, "deferred" freezes
+# the assets and only collects at the end of frames while playing, the
+# youngest generation after GC_YOUNG_LIMIT allocations and the others at
+# wave transitions. Collections made mid-frame longer than GC_HITCH (ms)
+# are logged.
+GC_MODE = "deferred"
+GC_YOUNG_LIMIT = 20000
+GC_HITCH = 2
+
+# Autoplay bot (run with --autoplay): decision time budget per tick (ms),
+# grid cell side, ticks ahead where moves are tried and the maximum
+# number of threats considered.
+AUTOPLAY_BUDGET = 0.5
+AUTOPLAY_CELL = 64
+AUTOPLAY_LOOKAHEAD = (3, 6, 10, 15, 22, 30)
+AUTOPLAY_THREATS = 48
+
 # Set visual resources for debugging.
 DEBUG = False
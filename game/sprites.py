@@ -1,24 +1,68 @@
+import math
 import random
+import weakref
 from enum import Enum
-from xml.dom import minidom
+from operator import itemgetter
 
 import pygame
 
 from game import settings
+from game.collision import collide_circle, collide_rect_80, sweep
+from game.controls import Action, InputState
+
+
+def ticks(milliseconds):
+    """Get how many ticks it takes for more than a duration to pass.
+
+    Gameplay timers count ticks, so they stop along with the simulation
+    and play the same no matter how fast frames come.
+
+    Args:
+        milliseconds: The duration.
+
+    Returns:
+        The number of ticks.
+    """
+    return milliseconds * settings.TICK_RATE // 1000 + 1
 
 
 class Spritesheet(object):
     """Manage image spritesheets."""
 
-    def __init__(self, file_name, color_key=settings.BLACK):
+    def __init__(
+        self, file_name, color_key=settings.BLACK, store=None, image=None
+    ):
         """
         Args:
             file_name (str): Spritesheet (full path) file name.
+            store (AssetStore): Where to get the decoded spritesheet and
+                its frames from, instead of decoding and copying them.
+            image (pygame.Surface): The decoded spritesheet, instead of
+                loading file_name.
         """
         super(Spritesheet, self).__init__()
-        self.image = pygame.image.load(file_name).convert()
-        self.info = minidom.parse(file_name.replace(".png", ".xml"))
+        # Only needed while loading, so it's not imported with the module.
+        from xml.etree import ElementTree
+
+        self.file_name = file_name
+        self.store = store
+        if image is not None:
+            self.image = image
+        elif store is None:
+            self.image = pygame.image.load(file_name).convert()
+        else:
+            self.image = store.atlas(file_name)
+        # Image name to position and size, parsed once for all lookups.
+        self.info = {
+            node.get("n"): tuple(int(node.get(k)) for k in "xywh")
+            for node in ElementTree.parse(
+                file_name.replace(".png", ".xml")
+            ).iter("sprite")
+        }
         self.color_key = color_key
+        # Frames cut so far and where they were cut from, dropped along
+        # with them.
+        self.regions = weakref.WeakKeyDictionary()
 
     def get_info(self, image_name):
         """Get image position and size.
@@ -38,19 +82,12 @@ class Spritesheet(object):
         Raises:
             ValueError: If no entry was found for image_name.
         """
-        nodes = self.info.getElementsByTagName("sprite")
-        for node in nodes:
-            if node.getAttribute("n") == image_name:
-                return map(
-                    int,
-                    (
-                        node.getAttribute("x"),
-                        node.getAttribute("y"),
-                        node.getAttribute("w"),
-                        node.getAttribute("h"),
-                    ),
-                )
-        raise ValueError(f"{image_name} not found in spritesheet.")
+        try:
+            return self.info[image_name]
+        except KeyError:
+            raise ValueError(
+                f"{image_name} not found in spritesheet."
+            ) from None
 
     def get_image(self, image_name):
         """Get image by name.
@@ -62,26 +99,34 @@ class Spritesheet(object):
             A pygame.Surface instance representing the image.
         """
         x, y, width, height = self.get_info(image_name)
+        if self.store is not None:
+            # A view of the stored spritesheet, transparent by alpha.
+            image = self.store.frame(self.file_name, (x, y, width, height))
+            self.regions[image] = pygame.Rect(x, y, width, height)
+            return image
         image = pygame.Surface((width, height))
         image.blit(self.image, (0, 0), (x, y, width, height))
         # image = pygame.transform.scale(
         #     image, (int(width * 0.50), int(height * 0.50))
         # )
         image.set_colorkey(self.color_key)
+        self.regions[image] = pygame.Rect(x, y, width, height)
         return image
 
 
 class Player(pygame.sprite.Sprite):
     """Player's spaceship."""
 
-    def __init__(self, game, groups=[]):
+    component = "players"
+
+    def __init__(self, game):
         """Initializes a new player.
 
         Args:
             game: The running game instance.
-            groups: A list of pygame.sprite.Group.
         """
-        super(Player, self).__init__(groups)
+        super(Player, self).__init__()
+        game.entities.add(self)
         self.game = game
         self.frames = self.game.player_img
         self.image = self.frames[0]
@@ -94,23 +139,26 @@ class Player(pygame.sprite.Sprite):
         self.lives = 3
         self.shield = False
         self.hidden = False
-        self.hidden_since = 0
+        # Ticks left before the player is back.
+        self.respawn = 0
         self.last_update = 0
+        self.controller = game.controller
+        self.state = InputState.EMPTY
 
     def move(self):
         """Moves player on X and Y axis."""
         if self.hidden:
             return
 
-        keys = pygame.key.get_pressed()
+        state = self.state
         # Moves player left/right/up/down.
-        if keys[pygame.K_LEFT]:
+        if state.active(Action.LEFT):
             self.rect.x -= settings.SPEED
-        if keys[pygame.K_RIGHT]:
+        if state.active(Action.RIGHT):
             self.rect.x += settings.SPEED
-        if keys[pygame.K_UP]:
+        if state.active(Action.UP):
             self.rect.y -= settings.SPEED
-        if keys[pygame.K_DOWN]:
+        if state.active(Action.DOWN):
             self.rect.y += settings.SPEED
         # If player reaches the boundaries stop moving.
         if self.rect.right > self.game.display.current_w - 10:
@@ -127,16 +175,13 @@ class Player(pygame.sprite.Sprite):
         if self.hidden:
             return
 
-        keys = pygame.key.get_pressed()
-        now = pygame.time.get_ticks()
-        time_needed = 400 if self.cannon < 5 else 200
-        elapsed_time = now - self.reload > time_needed
-        if keys[pygame.K_SPACE] and elapsed_time:
-            self.reload = now
+        if self.reload:
+            self.reload -= 1
+        if self.state.active(Action.FIRE) and not self.reload:
+            self.reload = ticks(400 if self.cannon < 5 else 200)
             params = {
                 "game": self.game,
                 "speed": (0, -10),
-                "groups": [self.game.sprites, self.game.shots],
             }
             shots = []
             if self.cannon == 1:
@@ -180,32 +225,22 @@ class Player(pygame.sprite.Sprite):
             return
 
         enemies_hits = pygame.sprite.spritecollide(
-            self,
-            self.game.enemies,
-            True,
-            pygame.sprite.collide_rect_ratio(0.8),
+            self, self.game.enemies, False, collide_rect_80
         )
         meteors_hits = pygame.sprite.spritecollide(
-            self,
-            self.game.meteors,
-            True,
-            pygame.sprite.collide_rect_ratio(0.8),
+            self, self.game.meteors, False, collide_rect_80
         )
         pows_hits = pygame.sprite.spritecollide(
-            self, self.game.pows, True, pygame.sprite.collide_rect_ratio(0.8)
+            self, self.game.pows, True, collide_rect_80
         )
 
         for hit in enemies_hits + meteors_hits:
-            self.energy -= hit.radius * 2
-            hit.destroy()
-            if self.energy <= 0:
-                self.die()
-            else:
-                self.game.hit_sfx.play()
+            self.game.effects.damage(self, hit.radius * 2)
+            self.game.effects.kill(hit)
 
         # Applys power up accordingly to its type.
         for hit in pows_hits:
-            self.game.pows_sfx[hit.type.value].play()
+            self.game.effects.sound(self.game.pows_sfx[hit.type.value])
             if hit.type == Pow.Type.BLUE:
                 self.cannon += 1
             elif hit.type == Pow.Type.GREEN:
@@ -216,8 +251,10 @@ class Player(pygame.sprite.Sprite):
             elif hit.type == Pow.Type.YELLOW:
                 if not self.shield:
                     self.shield = True
-                    Shield(
-                        self.game, self, [self.game.shields, self.game.sprites]
+                    self.game.effects.spawn(
+                        Shield,
+                        self.game,
+                        self,
                     )
 
     def animate(self):
@@ -232,34 +269,51 @@ class Player(pygame.sprite.Sprite):
         Checks if the player is alive and perform
         all animations like moving and shooting.
         """
+        self.state = self.controller.control(self)
         self.move()
         self.hit()
         self.shoot()
         self.animate()
 
         # Puts the player back in the game.
-        if self.hidden and pygame.time.get_ticks() - self.hidden_since > 2000:
-            self.hide()
+        if self.hidden:
+            self.respawn -= 1
+            if not self.respawn:
+                self.hide()
 
     def hide(self):
         """(Un)Hide the player."""
         self.hidden = not self.hidden
-        self.hidden_since = pygame.time.get_ticks()
+        self.respawn = ticks(2000) if self.hidden else 0
         self.rect.centerx = self.game.display.current_w / 2
         self.rect.bottom = self.game.display.current_h + (
             200 if self.hidden else -10
         )
 
+    def take_damage(self, amount):
+        """Reduces the player's energy.
+
+        Args:
+            amount: How much energy is lost.
+
+        Returns:
+            True if the player has died.
+        """
+        if self.hidden:
+            return False
+        self.energy -= amount
+        if self.energy <= 0:
+            self.die()
+            return True
+        self.game.effects.sound(self.game.hit_sfx)
+        return False
+
     def die(self):
         """Perform animation, play sounds, loses a life
         and regenerate the players energy."""
-        Explosion(
-            self.game,
-            self.rect.center,
-            [self.game.explosions, self.game.sprites],
-        )
+        self.game.effects.spawn(self.game.explode, self.rect.center)
         self.hide()
-        self.game.killed_sfx.play()
+        self.game.effects.sound(self.game.killed_sfx)
         self.lives -= 1
         self.energy = 100
         self.cannon = 1
@@ -268,14 +322,16 @@ class Player(pygame.sprite.Sprite):
 class Enemy(pygame.sprite.Sprite):
     """Enemies spaceship."""
 
-    def __init__(self, game, groups=[]):
+    component = "enemies"
+
+    def __init__(self, game):
         """Initializes a new enemy.
 
         Args:
             game: The running game instance.
-            groups: A list of pygame.sprite.Group.
         """
-        super(Enemy, self).__init__(groups)
+        super(Enemy, self).__init__()
+        game.entities.add(self)
         self.game = game
         rand_ship = random.randint(0, 19)
         s, e = rand_ship * 60, (rand_ship * 60) + 60
@@ -293,6 +349,7 @@ class Enemy(pygame.sprite.Sprite):
             self.game.display.current_w - self.rect.width
         )
         self.rect.y = random.randrange(-100, -40)
+        self.game.broadphase.moved(self)
         self.speedx = random.randrange(-3, 3)
         self.speedy = random.randrange(1, 8)
 
@@ -304,9 +361,9 @@ class Enemy(pygame.sprite.Sprite):
     def hit(self):
         """Checks if the enemy has hit something."""
         if pygame.sprite.spritecollide(
-            self, self.game.shields, False, pygame.sprite.collide_circle
+            self, self.game.shields, False, collide_circle
         ):
-            self.destroy()
+            self.game.effects.kill(self)
 
     def animate(self):
         """Animate the ship."""
@@ -331,21 +388,28 @@ class Enemy(pygame.sprite.Sprite):
         ):
             self.spawn()
 
+    def take_damage(self, amount):
+        """Damages the enemy, the player scores if it is destroyed.
+
+        Args:
+            amount: How much damage.
+
+        Returns:
+            True if the enemy has been destroyed.
+        """
+        return self.game.effects.wear(self, amount)
+
     def destroy(self):
         """Destroys enemy and spawn a new one."""
         if random.random() > 0.9:
-            Pow(
+            self.game.effects.spawn(
+                Pow,
                 self.game,
                 self.rect.center,
-                [self.game.pows, self.game.sprites],
             )
-        Explosion(
-            self.game,
-            self.rect.center,
-            [self.game.explosions, self.game.sprites],
-        )
+        self.game.effects.spawn(self.game.explode, self.rect.center)
         self.kill()
-        self.game.spawn_enemy()
+        self.game.effects.spawn(self.game.spawn_enemy)
 
 
 class Boss(pygame.sprite.Sprite):
@@ -355,6 +419,8 @@ class Boss(pygame.sprite.Sprite):
         State: A subclass defining the sprite state.
     """
 
+    component = "bosses"
+
     class State(Enum):
         """Sprite states.
 
@@ -368,15 +434,15 @@ class Boss(pygame.sprite.Sprite):
         SEEKING = 1
         ATTACKING = 2
 
-    def __init__(self, game, which=None, groups=[]):
+    def __init__(self, game, which=None):
         """Initializes a new boss.
 
         Args:
             game: The running game instance.
             which: The positional number of the boss in the game.
-            groups: A list of pygame.sprite.Group.
         """
-        super(Boss, self).__init__(groups)
+        super(Boss, self).__init__()
+        game.entities.add(self)
         self.game = game
         self.image = (
             self.game.bosses_img[which]
@@ -422,104 +488,155 @@ class Boss(pygame.sprite.Sprite):
         self.shoot()
         self.animate()
 
+    def take_damage(self, amount):
+        """Damages the boss, the player scores if it is destroyed.
+
+        Args:
+            amount: How much damage.
+
+        Returns:
+            True if the boss has been destroyed.
+        """
+        return self.game.effects.wear(self, amount)
+
     def destroy(self):
         """Destroys the boss and start the next level."""
-        Explosion(
-            self.game,
-            self.rect.center,
-            [self.game.explosions, self.game.sprites],
-        )
+        self.game.effects.spawn(self.game.explode, self.rect.center)
         self.kill()
+        self.game.level += 1
         self.game.enemies_remaining = 100
         self.game.release_mobs()
+        # Collect while the next wave is coming in.
+        self.game.garbage.collect()
 
 
-class BossOne(Boss):
-    """Describes first boss moving pattern and attack."""
+class ScriptedBoss(Boss):
+    """A boss whose moves and attacks come from its definition.
 
-    def __init__(self, game, groups=[]):
-        """Initializes the first boss.
+    After arriving the boss seeks a target, which is either the player or
+    the next point of its path, then attacks firing volleys of its current
+    pattern. After reloading it seeks again using the next attack.
+    """
+
+    def __init__(self, game, which=0):
+        """Initializes a boss.
 
         Args:
             game: The running game instance.
-            groups: A list of pygame.sprite.Group.
+            which: The position of the boss definition in game.bosses_def.
         """
-        super(BossOne, self).__init__(game, 0, groups)
-        self.endurance = 300
+        super(ScriptedBoss, self).__init__(game, which)
+        self.definition = self.game.bosses_def[which]
+        self.endurance = self.definition["endurance"]
         self.speedx = 0
         self.speedy = 0
+        self.target = None
+        self.waypoint = 0
+        self.attack = 0
+        self.volleys = 0
+        self.fired = 0
         self.reloading = False
-        self.reload_time = 0
-        self.shots = 10
-        self.last_shot = 0
+        # Ticks left before the next volley and the end of the reload.
+        self.cooldown = 0
+        self.reload = 0
+
+    def next_target(self):
+        """Get where the boss should go before attacking.
+
+        Returns:
+            The X and Y positions of the target, Y is None when only the
+            horizontal position matters.
+        """
+        movement = self.definition["movement"]
+        if movement["type"] == "track":
+            return self.game.player.rect.centerx, None
+        points = movement["points"]
+        x, y = points[self.waypoint % len(points)]
+        self.waypoint += 1
+        return (
+            int(x * self.game.display.current_w),
+            int(y * self.game.display.current_h),
+        )
 
     def move(self):
         """Updates boss position."""
         if self.state == Boss.State.ARRIVING:
-            if self.rect.y < 100:
-                self.speedy = 2
+            arrive = self.definition["arrive"]
+            if self.rect.y < arrive["y"]:
+                self.speedy = arrive["speed"]
             else:
                 self.speedy = 0
-                self.gotox = self.game.player.rect.centerx
+                self.target = self.next_target()
                 self.state = Boss.State.SEEKING
         elif self.state == Boss.State.SEEKING:
-            if self.gotox not in range(
-                self.rect.centerx - 2, self.rect.centerx + 3
-            ):
-                self.speedx = 2 if self.rect.centerx < self.gotox else -2
-            else:
+            speed = self.definition["movement"]["speed"]
+            x, y = self.target
+            dx = x - self.rect.centerx
+            dy = 0 if y is None else y - self.rect.centery
+            if abs(dx) <= speed and abs(dy) <= speed:
                 self.speedx = 0
+                self.speedy = 0
                 self.state = Boss.State.ATTACKING
-        elif self.state == Boss.State.ATTACKING:
-            self.gotox = self.game.player.rect.centerx
+            else:
+                self.speedx = max(-speed, min(speed, dx))
+                self.speedy = max(-speed, min(speed, dy))
 
         self.rect.x += self.speedx
         self.rect.y += self.speedy
 
     def shoot(self):
-        """Shoots."""
+        """Fires the current attack."""
+        attacks = self.definition["attacks"]
+        attack = attacks[self.attack % len(attacks)]
+        if self.cooldown:
+            self.cooldown -= 1
         if self.state == Boss.State.ATTACKING and not self.reloading:
-            if self.shots:
-                now = pygame.time.get_ticks()
-                if now - self.last_shot > 200:
-                    self.last_shot = now
-                    self.shots -= 1
-                    EnemyLaser(
-                        self.game,
-                        (self.rect.centerx - 32, self.rect.bottom + 30),
-                        [self.game.enemies_shots, self.game.sprites],
-                        (-2, 10),
-                    )
-                    EnemyLaser(
-                        self.game,
-                        (self.rect.centerx + 32, self.rect.bottom + 30),
-                        [self.game.enemies_shots, self.game.sprites],
-                        (2, 10),
-                    )
+            if self.volleys < attack["volleys"]:
+                if not self.cooldown:
+                    self.cooldown = ticks(attack["interval"])
+                    self.volleys += 1
+                    self.fire(attack["pattern"])
             else:
                 self.reloading = True
-                self.reload_time = pygame.time.get_ticks()
+                self.reload = ticks(self.definition["reload"])
         elif self.reloading:
-            now = pygame.time.get_ticks()
-            if now - self.reload_time > 1000:
-                self.shots = 10
+            self.reload -= 1
+            if not self.reload:
+                self.volleys = 0
+                self.attack += 1
                 self.reloading = False
+                self.target = self.next_target()
                 self.state = Boss.State.SEEKING
 
+    def fire(self, pattern):
+        """Fires a volley.
+
+        Args:
+            pattern: A bosses.Pattern instance.
+        """
+        x, y = self.rect.centerx, self.rect.bottom
+        player = self.game.player.rect
+        aim = math.degrees(math.atan2(player.centery - y, player.centerx - x))
+        for dx, dy, speedx, speedy in pattern.volley(self.fired, aim):
+            self.game.enemy_shot((x + dx, y + dy), (speedx, speedy))
+        self.fired += 1
+
 
 class Laser(pygame.sprite.Sprite):
     """A Laser shot."""
 
-    def __init__(self, game, pos=(0, 0), groups=[], speed=(0, -10)):
+    component = "shots"
+
+    def __init__(self, game, pos=(0, 0), speed=(0, -10)):
         """Initializes a new laser shot.
 
         Args:
             game: The running game instance.
             pos: The X and Y initial position for the shot.
-            groups: A list of pygame.sprite.Group.
             speed: The speed of the laser shot on X and Y axis.
         """
-        super(Laser, self).__init__(groups)
+        super(Laser, self).__init__()
+        game.entities.add(self)
         self.game = game
         self.frames = self.game.laser_img
         self.image = self.frames[1]
@@ -527,44 +644,61 @@ class Laser(pygame.sprite.Sprite):
         self.radius = int(self.rect.width * 0.9 / 2)
         self.rect.centerx, self.rect.bottom = pos
         self.speedx, self.speedy = speed
+        self.subx = self.suby = 0
         self.animating = False
         self.repeat_animation = 0
-        self.last_update = 0
-        self.game.shot_sfx.play()
+        # Ticks left before the next frame.
+        self.delay = 0
+        self.game.effects.sound(self.game.shot_sfx)
 
-    def hit(self):
-        """Checks if the shot has hit something."""
-        # If the shot has hit an enemy it causes some damage.
-        enemies_hits = pygame.sprite.spritecollide(
-            self, self.game.enemies, False, pygame.sprite.collide_circle
+    def hit(self, start):
+        """Checks if the shot has hit something on its way.
+
+        Args:
+            start: The X and Y center of the shot before it moved.
+        """
+        near = self.game.broadphase.near
+        hits = (
+            sweep(self, start, near(self, self.game.enemies))
+            + sweep(self, start, self.game.bosses)
+            + sweep(self, start, near(self, self.game.meteors))
         )
-        bosses_hits = pygame.sprite.spritecollide(
-            self, self.game.bosses, False, pygame.sprite.collide_circle
+        if not hits:
+            return
+        time, hit = min(hits, key=itemgetter(0))
+        self.stop(start, time, hit)
+        # If the shot has hit an enemy it causes some damage, if it has
+        # hit a meteor the laser is just gone.
+        if hit not in self.game.meteors:
+            # If the enemy dies the laser is gone too.
+            self.game.effects.damage(hit, 5, self)
+
+    def stop(self, start, time, hit):
+        """Moves the shot back where it hit something and sticks it there.
+
+        Args:
+            start: The X and Y center of the shot before it moved.
+            time: When it hit, a fraction of the tick.
+            hit: The sprite hit.
+        """
+        speedx = getattr(hit, "speedx", 0)
+        speedy = getattr(hit, "speedy", 0)
+        # From the point of impact it moves along with what it hit.
+        x, y = self.rect.center
+        self.rect.center = (
+            round(start[0] + (x - start[0]) * time + speedx * (1 - time)),
+            round(start[1] + (y - start[1]) * time + speedy * (1 - time)),
         )
-        for hit in enemies_hits + bosses_hits:
-            hit.damage += 5
-            # If the enemy has died the player scores.
-            if hit.damage >= hit.endurance:
-                self.game.score += hit.endurance
-                hit.destroy()
-                self.kill()
-            else:
-                self.speedy = hit.speedy
-                self.speedx = hit.speedx
-                self.animating = True
-        # If the shot has hit a meteor just kill the laser.
-        for hit in pygame.sprite.spritecollide(
-            self, self.game.meteors, False, pygame.sprite.collide_circle
-        ):
-            self.speedy = hit.speedy
-            self.speedx = hit.speedx
-            self.animating = True
+        self.subx = self.suby = 0
+        self.speedx, self.speedy = speedx, speedy
+        self.animating = True
 
     def animate(self):
         """Perform laser animation when it hits something."""
-        now = pygame.time.get_ticks()
-        if now - self.last_update > 90:
-            self.last_update = now
+        if self.delay:
+            self.delay -= 1
+        if not self.delay:
+            self.delay = ticks(90)
             index = self.frames.index(self.image)
             if self.animating:
                 if index == 7:
@@ -584,9 +718,18 @@ class Laser(pygame.sprite.Sprite):
             self.rect.center = center
 
     def move(self):
-        """Updates laser shot position."""
-        self.rect.x += self.speedx
-        self.rect.y += self.speedy
+        """Updates laser shot position.
+
+        Fractions of a pixel are carried to the next move, so shots at any
+        angle keep their course.
+        """
+        self.subx += self.speedx
+        self.suby += self.speedy
+        dx, dy = int(self.subx), int(self.suby)
+        self.subx -= dx
+        self.suby -= dy
+        self.rect.x += dx
+        self.rect.y += dy
 
     def update(self):
         """Update laser shot sprite.
@@ -594,9 +737,10 @@ class Laser(pygame.sprite.Sprite):
         Performs animation moving up and checks if
         it's hit something or left the screen.
         """
+        start = self.rect.center
         self.move()
         if not self.animating:
-            self.hit()
+            self.hit(start)
         self.animate()
 
         # If the laser shot has left the screen kill it.
@@ -611,53 +755,47 @@ class Laser(pygame.sprite.Sprite):
 class EnemyLaser(Laser):
     """Enemy laser shot."""
 
-    def hit(self):
-        """Checks if the shot has hit something."""
-        for hit in pygame.sprite.spritecollide(
-            self, self.game.players, False, pygame.sprite.collide_circle
-        ):
-            hit.energy -= 35
-            if hit.energy <= 0:
-                hit.die()
-            else:
-                self.speedy = 0
-                self.speedx = 0
-                self.animating = True
-                self.game.hit_sfx.play()
+    component = "enemies_shots"
+
+    def hit(self, start):
+        """Checks if the shot has hit something on its way.
+
+        Args:
+            start: The X and Y center of the shot before it moved.
+        """
+        near = self.game.broadphase.near
+        hits = (
+            sweep(self, start, self.game.players)
+            + sweep(self, start, near(self, self.game.enemies))
+            + sweep(self, start, near(self, self.game.meteors))
+            + sweep(self, start, self.game.shields, pixels=False)
+        )
+        if not hits:
+            return
+        time, hit = min(hits, key=itemgetter(0))
         # If the shot has hit an enemy, a meteor or a shield
         # just kill the laser.
-        enemies_hits = pygame.sprite.spritecollide(
-            self, self.game.enemies, False, pygame.sprite.collide_circle
-        )
-        meteors_hits = pygame.sprite.spritecollide(
-            self, self.game.meteors, False, pygame.sprite.collide_circle
-        )
-        for hit in enemies_hits + meteors_hits:
-            self.speedy = hit.speedy
-            self.speedx = hit.speedx
-            self.animating = True
-        if pygame.sprite.spritecollide(
-            self, self.game.shields, False, pygame.sprite.collide_circle
-        ):
-            self.speedy = 0
-            self.speedx = 0
-            self.animating = True
+        if hit in self.game.players:
+            self.game.effects.damage(hit, 35)
+        self.stop(start, time, hit)
 
 
 class Meteor(pygame.sprite.Sprite):
     """A meteor."""
 
-    def __init__(self, game, groups=[]):
+    component = "meteors"
+
+    def __init__(self, game):
         """Initializes a new meteor.
 
         Args:
             game: The running game instance.
-            groups: A list of pygame.sprite.Group.
         """
-        super(Meteor, self).__init__(groups)
+        super(Meteor, self).__init__()
+        game.entities.add(self)
         self.game = game
         self._image = random.choice(self.game.meteors_img)
-        self.image = self._image.copy()
+        self.image = self._image
         self.rect = self.image.get_rect()
         self.radius = int(self.rect.width * 0.9 / 2)
         self.spawn()
@@ -668,21 +806,27 @@ class Meteor(pygame.sprite.Sprite):
             self.game.display.current_w - self.rect.width
         )
         self.rect.y = random.randrange(-100, -40)
+        self.game.broadphase.moved(self)
         self.speedx = random.randrange(-3, 3)
         self.speedy = random.randrange(1, 4)
         self.rot = 0
         self.rot_speed = random.randrange(-8, 8)
-        self.last_rotation = 0
-        self.last_collision = 0
+        # Ticks left before the next rotation and the next bounce.
+        self.delay = 0
+        self.bounce = 0
 
     def rotate(self):
         """Rotates the meteor."""
-        now = pygame.time.get_ticks()
-        if now - self.last_rotation > 50:
-            self.last_rotation = now
+        if self.delay:
+            self.delay -= 1
+        if not self.delay:
+            self.delay = ticks(self.game.quality.rotation_interval)
             self.rot = (self.rot + self.rot_speed) % 360
+            if self.game.renderer.textures:
+                # The frame is rotated when it's drawn.
+                return
+            # Rotated copies keep the colorkey or alpha of the original.
             image = pygame.transform.rotate(self._image, self.rot)
-            image.set_colorkey(settings.BLACK)
             center = self.rect.center
             self.image = image
             self.rect = self.image.get_rect()
@@ -690,25 +834,28 @@ class Meteor(pygame.sprite.Sprite):
 
     def hit(self):
         """Checks if the meteor has hit another meteor."""
+        if self.bounce:
+            self.bounce -= 1
         for hit in pygame.sprite.spritecollide(
-            self, self.game.meteors, False, pygame.sprite.collide_circle
+            self,
+            self.game.broadphase.near(self, self.game.meteors),
+            False,
+            collide_circle,
         ):
             # Ignore self collision.
             if hit != self:
-                now = pygame.time.get_ticks()
-                # If the last collision occurred at least 3s ago
+                # If the last collision occurred at least 2s ago
                 # and it did not hit the center of the meteor.
-                if (
-                    self.last_collision == 0
-                    or now - self.last_collision > 2000
-                ) and not hit.rect.collidepoint(self.rect.center):
-                    self.last_collision = now
+                if not self.bounce and not hit.rect.collidepoint(
+                    self.rect.center
+                ):
+                    self.bounce = ticks(2000)
                     # If the meteor hit was way too small destroy it.
                     if (
                         self.radius > hit.radius
                         and self.radius - hit.radius > 40
                     ):
-                        self.destroy()
+                        self.game.effects.kill(self)
                     else:
                         # Perform some changes in the meteor course.
                         if self.rect.top > hit.rect.top:
@@ -720,9 +867,9 @@ class Meteor(pygame.sprite.Sprite):
                         self.rot_speed *= -1
         # If it hits a shield it has to be destroyed.
         if pygame.sprite.spritecollide(
-            self, self.game.shields, False, pygame.sprite.collide_circle
+            self, self.game.shields, False, collide_circle
         ):
-            self.destroy()
+            self.game.effects.kill(self)
 
     def move(self):
         """Updates the meteor position."""
@@ -744,19 +891,16 @@ class Meteor(pygame.sprite.Sprite):
             or self.rect.right < -10
             or self.rect.left > self.game.display.current_w + 10
         ):
-            self.game.spawn_meteor()
+            self.game.effects.spawn(self.game.spawn_meteor)
             self.kill()
 
     def destroy(self):
         """Destroys the meteor and spawn a new one."""
-        Explosion(
-            self.game,
-            self.rect.center,
-            [self.game.explosions, self.game.sprites],
-            Explosion.Type.TWO,
+        self.game.effects.spawn(
+            self.game.explode, self.rect.center, Explosion.Type.TWO
         )
         self.kill()
-        self.game.spawn_meteor()
+        self.game.effects.spawn(self.game.spawn_meteor)
 
 
 class Explosion(pygame.sprite.Sprite):
@@ -766,6 +910,8 @@ class Explosion(pygame.sprite.Sprite):
         Type: A sub-class defining explosion types.
     """
 
+    component = "explosions"
+
     class Type(Enum):
         """Explosion types.
 
@@ -788,16 +934,16 @@ class Explosion(pygame.sprite.Sprite):
                 index = 0
             return members[index]
 
-    def __init__(self, game, pos, groups=[], xtype=None):
+    def __init__(self, game, pos, xtype=None):
         """Initializes an explosion animation.
 
         Args:
             game: The running game instance.
             pos: The X and Y positions on screen.
-            groups: A list of pygame.sprite.Group.
             xtype: The explosion type.
         """
-        super(Explosion, self).__init__(groups)
+        super(Explosion, self).__init__()
+        game.entities.add(self)
         self.game = game
         self.type = (
             xtype if type(xtype) == Explosion.Type else Explosion.Type.ONE
@@ -808,11 +954,12 @@ class Explosion(pygame.sprite.Sprite):
         self.rect = self.image.get_rect()
         self.rect.center = pos
         self.last_update = 0
-        self.game.explosion_sfx.play()
+        self.game.effects.sound(self.game.explosion_sfx)
 
     def update(self):
         """Animates the explosion till it self destroy."""
-        index = self.frames.index(self.image) + 1
+        index = self.frames.index(self.image)
+        index += self.game.quality.explosion_step
         if index < len(self.frames):
             center = self.rect.center
             self.image = self.frames[index]
@@ -829,6 +976,8 @@ class Pow(pygame.sprite.Sprite):
         Type: A sub-class defining power up types.
     """
 
+    component = "pows"
+
     class Type(Enum):
         """Power up types.
 
@@ -844,16 +993,16 @@ class Pow(pygame.sprite.Sprite):
         RED = 2
         YELLOW = 3
 
-    def __init__(self, game, pos, groups=[], ptype=None):
+    def __init__(self, game, pos, ptype=None):
         """Initializes a power up.
 
         Args:
             game: The running game instance.
             pos: The X and Y positions on screen.
-            groups: A list of pygame.sprite.Group.
             ptype: The power up type.
         """
-        super(Pow, self).__init__(groups)
+        super(Pow, self).__init__()
+        game.entities.add(self)
         self.game = game
         self.type = (
             ptype if type(ptype) == Pow.Type else Pow.Type(random.randrange(4))
@@ -878,15 +1027,17 @@ class Pow(pygame.sprite.Sprite):
 class Shield(pygame.sprite.Sprite):
     """Spaceship Shield."""
 
-    def __init__(self, game, player, groups=[]):
+    component = "shields"
+
+    def __init__(self, game, player):
         """Initializes a spaceship shield.
 
         Args:
             game: The running game instance.
             player: The player raising the shield.
-            groups: A list of pygame.sprite.Group.
         """
-        super(Shield, self).__init__(groups)
+        super(Shield, self).__init__()
+        game.entities.add(self)
         self.game = game
         self.player = player
         self.frame = 1
@@ -894,9 +1045,10 @@ class Shield(pygame.sprite.Sprite):
         self.rect = self.image.get_rect()
         self.rect.center = self.player.rect.center
         self.radius = int(self.rect.width / 2)
-        self.fps = 3000
-        self.ttl = 6000
-        self.last_update = pygame.time.get_ticks()
+        # Ticks each frame is shown and ticks the shield lasts.
+        self.fps = ticks(3000)
+        self.ttl = ticks(6000)
+        self.age = 0
 
     def move(self):
         """Updates the shield position."""
@@ -908,14 +1060,11 @@ class Shield(pygame.sprite.Sprite):
         It switches from a high to a low shield,
         after that it destroys itself.
         """
-        now = pygame.time.get_ticks()
-        diff = now - self.last_update
-        if self.ttl <= 0:
+        self.age += 1
+        if self.age >= self.ttl:
             self.player.shield = False
             self.kill()
-        elif diff > self.fps:
-            self.ttl -= diff
-            self.last_update = now
+        elif self.age % self.fps == 0:
             self.frame -= 1
             center = self.rect.center
             self.image = self.game.shield_img[self.frame]
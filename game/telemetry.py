@@ -0,0 +1,277 @@
+import argparse
+import bisect
+import json
+import logging
+import math
+import os
+import queue
+import socket
+import socketserver
+import sys
+import threading
+import time
+
+from game import collision, settings
+
+logger = logging.getLogger(__name__)
+
+
+def openmetrics(snapshot):
+    """Formats a snapshot as OpenMetrics text.
+
+    The snapshots of a stream make one exposition, the exporter ends it
+    with "# EOF" when the stream closes.
+
+    Args:
+        snapshot: A dict made by Telemetry.snapshot.
+
+    Returns:
+        A string.
+    """
+    stamp = snapshot["time"]
+    lines = ["# TYPE game_frame_seconds histogram"]
+    cumulative = 0
+    for le, count in zip(Telemetry.BUCKETS, snapshot["frame_buckets"]):
+        cumulative += count
+        le = "+Inf" if math.isinf(le) else le
+        lines.append(
+            f'game_frame_seconds_bucket{{le="{le}"}} {cumulative} {stamp}'
+        )
+    lines.append(f"game_frame_seconds_count {snapshot['frames']} {stamp}")
+    lines.append(
+        f"game_frame_seconds_sum {snapshot['frame_seconds_sum']} {stamp}"
+    )
+    lines.append("# TYPE game_sprites gauge")
+    for group, count in snapshot["sprites"].items():
+        lines.append(f'game_sprites{{group="{group}"}} {count} {stamp}')
+    for name, kind, key in (
+        ("game_collision_pairs", "counter", "collision_pairs"),
+        ("game_dropped_snapshots", "counter", "dropped"),
+        ("game_gc_pause_seconds", "counter", "gc_pause_seconds"),
+        ("game_gc_unsafe_collections", "counter", "gc_unsafe_collections"),
+        ("game_asset_load_seconds", "gauge", "asset_load_seconds"),
+        ("game_memory_bytes", "gauge", "memory_bytes"),
+    ):
+        if snapshot[key] is None:
+            continue
+        lines.append(f"# TYPE {name} {kind}")
+        suffix = "_total" if kind == "counter" else ""
+        lines.append(f"{name}{suffix} {snapshot[key]} {stamp}")
+    return "\n".join(lines) + "\n"
+
+
+def ndjson(snapshot):
+    """Formats a snapshot as a line of JSON.
+
+    Args:
+        snapshot: A dict made by Telemetry.snapshot.
+
+    Returns:
+        A string.
+    """
+    return json.dumps(snapshot, separators=(",", ":")) + "\n"
+
+
+FORMATS = {"openmetrics": openmetrics, "ndjson": ndjson}
+# Written once at the end of a stream.
+FOOTERS = {"openmetrics": "# EOF\n", "ndjson": ""}
+
+
+def memory_used():
+    """Get the memory the process uses now, its resident set size.
+
+    Returns:
+        The size in bytes or None if it can't be known.
+    """
+    try:
+        # Only Linux has it, the peak elsewhere wouldn't be a gauge.
+        with open("/proc/self/statm") as statm:
+            pages = int(statm.read().split()[1])
+    except (OSError, IndexError, ValueError):
+        return None
+    return pages * os.sysconf("SC_PAGE_SIZE")
+
+
+class Telemetry(object):
+    """Exports frame and gameplay metrics from a background thread.
+
+    The game only updates a few counters on each frame and, once per
+    interval, puts a snapshot of the metrics in a bounded queue. Snapshots
+    are dropped when the queue is full so the game never waits for the
+    exporter. The exporter thread formats the snapshots and writes them to
+    a file or a TCP socket.
+
+    Attributes:
+        BUCKETS: Upper bounds of the frame time histogram in seconds.
+    """
+
+    BUCKETS = (0.002, 0.004, 0.008, 0.016, 0.033, 0.066, 0.1, math.inf)
+
+    def __init__(
+        self,
+        game,
+        target=settings.TELEMETRY_TARGET,
+        format=settings.TELEMETRY_FORMAT,
+        interval=settings.TELEMETRY_INTERVAL,
+        size=settings.TELEMETRY_QUEUE,
+    ):
+        """Initializes the telemetry and starts the exporter.
+
+        Args:
+            game: The running game instance.
+            target: A file path, "tcp://host:port" or None to disable the
+                telemetry.
+            format: "openmetrics" or "ndjson".
+            interval: Seconds between snapshots.
+            size: The maximum number of snapshots waiting to be written.
+        """
+        self.game = game
+        self.target = target
+        self.format = FORMATS[format]
+        self.footer = FOOTERS[format]
+        self.interval = interval
+        self.counts = [0] * len(self.BUCKETS)
+        self.frames = 0
+        self.total = 0.0
+        self.dropped = 0
+        self.last = time.monotonic()
+        self.queue = queue.Queue(maxsize=size)
+        self.output = None
+        self.failing = False
+        self.thread = None
+        if target:
+            self.thread = threading.Thread(
+                target=self.export, name="telemetry", daemon=True
+            )
+            self.thread.start()
+
+    def frame(self, seconds):
+        """Records the time a frame took, snapshots once per interval.
+
+        Args:
+            seconds: Time spent updating and drawing, without waiting.
+        """
+        if self.thread is None:
+            return
+        self.counts[bisect.bisect_left(self.BUCKETS, seconds)] += 1
+        self.frames += 1
+        self.total += seconds
+        now = time.monotonic()
+        if now - self.last >= self.interval:
+            self.last = now
+            self.publish()
+
+    def snapshot(self):
+        """Get the current metrics, must be called by the game thread.
+
+        Returns:
+            A dict of plain values.
+        """
+        return {
+            "time": round(time.time(), 3),
+            "frames": self.frames,
+            "frame_seconds_sum": round(self.total, 6),
+            "frame_buckets": list(self.counts),
+            "sprites": self.game.entities.counts(),
+            "collision_pairs": collision.pairs,
+            "dropped": self.dropped,
+            "gc_pause_seconds": round(self.game.garbage.total, 6),
+            "gc_unsafe_collections": self.game.garbage.unsafe,
+            "asset_load_seconds": round(self.game.load_time, 6),
+            "memory_bytes": memory_used(),
+        }
+
+    def publish(self):
+        """Queues a snapshot, it's dropped if the exporter is behind."""
+        try:
+            self.queue.put_nowait(self.snapshot())
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self):
+        """Queues a last snapshot and waits a bit for the exporter."""
+        if self.thread is None:
+            return
+        self.publish()
+        try:
+            self.queue.put(None, timeout=1)
+        except queue.Full:
+            return
+        self.thread.join(timeout=2)
+
+    def open(self):
+        """Opens the target, called by the exporter thread."""
+        if self.target.startswith("tcp://"):
+            host, port = self.target[6:].rsplit(":", 1)
+            self.output = socket.create_connection((host, int(port)), 5)
+        else:
+            self.output = open(self.target, "a", encoding="utf-8")
+
+    def write(self, text):
+        """Writes to the target, called by the exporter thread."""
+        if self.output is None:
+            self.open()
+        if isinstance(self.output, socket.socket):
+            self.output.sendall(text.encode())
+        else:
+            self.output.write(text)
+            self.output.flush()
+
+    def export(self):
+        """Writes queued snapshots until None is queued."""
+        while True:
+            snapshot = self.queue.get()
+            if snapshot is None:
+                break
+            try:
+                self.write(self.format(snapshot))
+                self.failing = False
+            except OSError as e:
+                # Snapshots are dropped until the target is back.
+                if not self.failing:
+                    logger.warning(
+                        "Telemetry to %s failed: %s", self.target, e
+                    )
+                self.failing = True
+                if self.output is not None:
+                    self.output.close()
+                    self.output = None
+        if self.output is not None:
+            try:
+                self.write(self.footer)
+            except OSError:
+                pass
+            self.output.close()
+
+
+class Collector(socketserver.StreamRequestHandler):
+    """Prints whatever a game sends, a stand-in for a real collector."""
+
+    def handle(self):
+        for line in self.rfile:
+            sys.stdout.write(line.decode())
+            sys.stdout.flush()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Listens for game telemetry and prints it."
+    )
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=9464)
+    args = parser.parse_args()
+    with socketserver.ThreadingTCPServer(
+        (args.host, args.port), Collector
+    ) as server:
+        print(
+            f"Set TELEMETRY_TARGET to tcp://{args.host}:{args.port}",
+            file=sys.stderr,
+        )
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
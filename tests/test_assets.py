@@ -0,0 +1,81 @@
+import os
+
+import pytest
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import pygame  # noqa: E402
+
+from game import settings  # noqa: E402
+from game.assets import AssetStore  # noqa: E402
+
+RED = (200, 10, 20)
+GREEN = (10, 200, 20)
+
+
+@pytest.fixture
+def sheets(tmp_path):
+    """Two small spritesheets with a transparent black border."""
+    pygame.display.init()
+    pygame.display.set_mode((1, 1))
+    paths = []
+    for name, color, size in (
+        ("a.png", RED, (30, 20)),
+        ("b.png", GREEN, (7, 9)),
+    ):
+        image = pygame.Surface(size)
+        image.fill(settings.BLACK)
+        image.fill(color, (1, 1, size[0] - 2, size[1] - 2))
+        path = str(tmp_path / name)
+        pygame.image.save(image, path)
+        paths.append(path)
+    yield paths
+    AssetStore.stores.clear()
+    pygame.display.quit()
+
+
+def test_round_trip(sheets, tmp_path):
+    file_name = str(tmp_path / "assets.bin")
+    store = AssetStore.open(file_name, sheets)
+    assert AssetStore.open(file_name, sheets) is store
+    for sheet, color in zip(sheets, (RED, GREEN)):
+        atlas = store.atlas(sheet)
+        assert atlas.get_size() == pygame.image.load(sheet).get_size()
+        assert atlas.get_at((0, 0)).a == 0
+        assert atlas.get_at((1, 1)) == (*color, 255)
+        offset = store.index[os.path.abspath(sheet)][0]
+        assert (store.start + offset) % AssetStore.ALIGNMENT == 0
+    frame = store.frame(sheets[0], (1, 1, 4, 4))
+    assert frame.get_parent() is store.atlas(sheets[0])
+    assert store.frame(sheets[0], [1, 1, 4, 4]) is frame
+
+    # Another process maps the same file without building it again.
+    before = os.stat(file_name).st_mtime_ns
+    loaded = AssetStore(file_name, sheets)
+    assert os.stat(file_name).st_mtime_ns == before
+    assert loaded.index == store.index
+    assert loaded.atlas(sheets[1]).get_at((3, 3)) == (*GREEN, 255)
+
+
+def test_drawing_leaves_the_file_alone(sheets, tmp_path):
+    file_name = str(tmp_path / "assets.bin")
+    store = AssetStore(file_name, sheets)
+    with open(file_name, "rb") as f:
+        data = f.read()
+    store.frame(sheets[0], (0, 0, 10, 10)).fill((1, 2, 3))
+    assert store.atlas(sheets[0]).get_at((5, 5)) == (1, 2, 3, 255)
+    with open(file_name, "rb") as f:
+        assert f.read() == data
+    other = AssetStore(file_name, sheets)
+    assert other.atlas(sheets[0]).get_at((5, 5)) == (*RED, 255)
+
+
+def test_rebuilt_when_a_sheet_changes(sheets, tmp_path):
+    file_name = str(tmp_path / "assets.bin")
+    AssetStore(file_name, sheets)
+    image = pygame.Surface((12, 12))
+    image.fill(GREEN)
+    pygame.image.save(image, sheets[0])
+    store = AssetStore(file_name, sheets)
+    assert store.atlas(sheets[0]).get_size() == (12, 12)
+    assert store.atlas(sheets[0]).get_at((0, 0)) == (*GREEN, 255)
@@ -0,0 +1,36 @@
+import os
+import random
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import pygame  # noqa: E402
+
+from game.background import Starfield  # noqa: E402
+
+
+def test_stars_wrap_around_the_tile():
+    pygame.display.init()
+    pygame.display.set_mode((1, 1))
+    width, height, radius = 60, 40, 3
+    random.seed(7)
+    starfield = Starfield((width, height), [(200, 10, 255, radius)])
+    layer = starfield.layers[0][0]
+    # The same stars, in the order the starfield picked them.
+    random.seed(7)
+    stars = [
+        (
+            random.randrange(width),
+            random.randrange(height),
+            random.randint(127, 255),
+        )
+        for _ in range(200)
+    ]
+    crossing = 0
+    for x, y, _ in stars:
+        if y < radius or y >= height - radius:
+            crossing += 1
+        # The column through the center is lit on both sides of a seam.
+        for dy in range(-radius + 1, radius):
+            assert layer.get_at((x, (y + dy) % height))[:3] != (0, 0, 0)
+    assert crossing
+    pygame.display.quit()
@@ -0,0 +1,121 @@
+import json
+import os
+from types import SimpleNamespace
+from xml.etree import ElementTree
+
+import pytest
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import pygame  # noqa: E402
+
+from game import settings  # noqa: E402
+from game.bosses import Pattern, load_bosses  # noqa: E402
+from game.entities import Registry  # noqa: E402
+from game.sprites import Boss, ScriptedBoss  # noqa: E402
+
+
+def write(tmp_path, data):
+    path = tmp_path / "bosses.json"
+    path.write_text(json.dumps(data))
+    return str(path)
+
+
+def test_load_bosses_compiles_shared_patterns():
+    bosses = load_bosses()
+    assert [b["name"] for b in bosses] == ["one", "two", "three"]
+    for boss in bosses:
+        assert boss["endurance"] > 0 and boss["reload"] > 0
+        assert boss["movement"]["type"] in ("track", "path")
+        for attack in boss["attacks"]:
+            pattern = attack["pattern"]
+            assert isinstance(pattern, Pattern)
+            assert attack["volleys"] > 0 and attack["interval"] > 0
+    # Attacks using the same pattern share it.
+    twins = [
+        attack["pattern"]
+        for boss in bosses
+        for attack in boss["attacks"]
+        if attack["pattern"].volleys[0][0][:2] == (-32, 30)
+    ]
+    assert len(twins) == 2 and twins[0] is twins[1]
+
+
+def test_boss_images_are_in_the_spritesheet():
+    names = {
+        node.get("n")
+        for node in ElementTree.parse(
+            settings.SPRITESHEET_IMG.replace(".png", ".xml")
+        ).iter("sprite")
+    }
+    for boss in load_bosses():
+        assert boss["image"] in names
+
+
+def test_load_bosses_rejects_unknown_patterns(tmp_path):
+    boss = {"attacks": [{"pattern": "missing"}]}
+    with pytest.raises(KeyError):
+        load_bosses(write(tmp_path, {"patterns": {}, "bosses": [boss]}))
+    patterns = {"odd": {"type": "zigzag"}}
+    with pytest.raises(ValueError):
+        load_bosses(write(tmp_path, {"patterns": patterns, "bosses": []}))
+
+
+def test_patterns_volleys():
+    spread = Pattern({"type": "spread", "count": 5, "arc": 90, "speed": 10})
+    speeds = [(round(x), round(y)) for _, _, x, y in spread.volley(0)]
+    assert speeds == [(7, 7), (4, 9), (0, 10), (-4, 9), (-7, 7)]
+    spiral = Pattern({"type": "spiral", "count": 4, "step": 12})
+    assert len(spiral.volleys) == 30
+    assert spiral.volley(0) != spiral.volley(1)
+    assert spiral.volley(30) == spiral.volley(0)
+    aimed = Pattern({"type": "aimed", "count": 1, "speed": 10})
+    ((_, _, x, y),) = aimed.volley(0, aim=0)
+    assert (round(x), round(y)) == (10, 0)
+    ((_, _, x, y),) = aimed.volley(5, aim=90)
+    assert (round(x), round(y)) == (0, 10)
+
+
+@pytest.fixture
+def game():
+    return SimpleNamespace(
+        entities=Registry(),
+        display=SimpleNamespace(current_w=480, current_h=600),
+        player=SimpleNamespace(rect=pygame.Rect(300, 500, 40, 40)),
+        bosses_img=[pygame.Surface((100, 80))] * 3,
+        bosses_def=load_bosses(),
+        enemy_shot=lambda pos, speed: None,
+    )
+
+
+def run(boss, state, limit=1000):
+    """Updates a boss until it gets in a state."""
+    for _ in range(limit):
+        if boss.state == state:
+            return
+        boss.update()
+    raise AssertionError(f"{boss.state} never became {state}")
+
+
+def test_tracking_boss_arrives_and_attacks_above_the_player(game):
+    boss = ScriptedBoss(game, 0)
+    assert boss.state == Boss.State.ARRIVING
+    run(boss, Boss.State.SEEKING)
+    assert boss.rect.y >= boss.definition["arrive"]["y"]
+    run(boss, Boss.State.ATTACKING)
+    speed = boss.definition["movement"]["speed"]
+    assert abs(boss.rect.centerx - game.player.rect.centerx) <= speed
+
+
+def test_path_boss_visits_its_points_in_turn(game):
+    boss = ScriptedBoss(game, 1)
+    points = boss.definition["movement"]["points"]
+    for x, y in points + points[:1]:
+        run(boss, Boss.State.ATTACKING)
+        speed = boss.definition["movement"]["speed"]
+        assert abs(boss.rect.centerx - x * 480) <= speed + 1
+        assert abs(boss.rect.centery - y * 600) <= speed + 1
+        attack = boss.attack
+        run(boss, Boss.State.SEEKING)
+        # Each attack is followed by the next one.
+        assert boss.attack == attack + 1
@@ -0,0 +1,78 @@
+import os
+import random
+from types import SimpleNamespace
+
+import pytest
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import pygame  # noqa: E402
+
+from game.broadphase import GROUPS, PAIRS, Broadphase  # noqa: E402
+from game.entities import Index  # noqa: E402
+
+
+class Body(pygame.sprite.Sprite):
+    """A sprite with what the broadphase reads."""
+
+    def __init__(self, component, group):
+        super().__init__(group)
+        self.component = component
+        size = random.randint(4, 60), random.randint(4, 60)
+        self.rect = pygame.Rect((0, 0), size)
+        self.rect.center = random.randint(0, 480), random.randint(0, 600)
+        self.radius = random.randint(2, max(size) // 2)
+        self.speedx = random.randint(-10, 10)
+        self.speedy = random.randint(-10, 10)
+
+    def update(self):
+        """Moves by a speed changed less than the margin."""
+        self.speedx += random.randint(-3, 3)
+        self.speedy += random.randint(-3, 3)
+        self.rect.move_ip(self.speedx, self.speedy)
+
+
+@pytest.fixture
+def game():
+    random.seed(1)
+    game = SimpleNamespace(**{name: Index(name) for name in GROUPS})
+    for name in GROUPS:
+        for _ in range(40):
+            Body(name, getattr(game, name))
+    return game
+
+
+@pytest.fixture
+def broadphase(game):
+    broadphase = Broadphase(game, worker=True, capacity=512, max_pairs=8192)
+    yield broadphase
+    broadphase.close()
+
+
+def test_near_finds_what_a_full_scan_finds(game, broadphase):
+    for _ in range(5):
+        broadphase.submit()
+        for name in GROUPS:
+            for sprite in getattr(game, name):
+                sprite.update()
+        # Unknown to the worker, added after the arrays were written.
+        fresh = Body("meteors", game.meteors)
+        teleported = random.choice(game.enemies.sprites())
+        teleported.rect.center = fresh.rect.center
+        broadphase.moved(teleported)
+        for source, target in PAIRS:
+            group = getattr(game, target)
+            for sprite in getattr(game, source):
+                found = broadphase.near(sprite, group)
+                positions = [group.positions[s] for s in found]
+                assert positions == sorted(positions)
+                area = Broadphase.reach(sprite)
+                scan = {
+                    s
+                    for s in group
+                    if s is not sprite
+                    and area.colliderect(Broadphase.reach(s))
+                }
+                assert scan <= set(found)
+    assert broadphase.queries
+    assert broadphase.narrowed
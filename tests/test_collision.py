@@ -0,0 +1,51 @@
+import os
+
+import pytest
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import pygame  # noqa: E402
+
+from game.collision import sweep  # noqa: E402
+
+
+def body(size, center, radius):
+    sprite = pygame.sprite.Sprite()
+    sprite.image = pygame.Surface(size)
+    sprite.rect = sprite.image.get_rect(center=center)
+    sprite.radius = radius
+    return sprite
+
+
+@pytest.mark.parametrize("pixels", [True, False])
+def test_fast_shot_hits_a_thin_target_on_its_way(pixels):
+    # A wide and thin target, and a shot moving 40 pixels a tick upwards
+    # from below it to above it.
+    target = body((80, 4), (100, 100), 2)
+    start = (100, 125)
+    shot = body((6, 20), (100, 85), 3)
+    assert not shot.rect.colliderect(target.rect)
+    assert not pygame.sprite.collide_circle(shot, target)
+    hits = sweep(shot, start, [target], pixels)
+    assert [hit for _, hit in hits] == [target]
+    time = hits[0][0]
+    assert 0 < time < 1
+
+
+@pytest.mark.parametrize("pixels", [True, False])
+def test_shot_passing_beside_a_target_misses(pixels):
+    target = body((80, 4), (100, 100), 2)
+    shot = body((6, 20), (160, 85), 3)
+    assert sweep(shot, (160, 125), [target], pixels) == []
+
+
+def test_moving_target_is_swept_along():
+    # The target moved 30 pixels right during the tick, the shot only
+    # met its corner early in the tick.
+    target = body((20, 4), (130, 100), 2)
+    target.speedx, target.speedy = 30, 0
+    shot = body((6, 20), (100, 85), 3)
+    assert not shot.rect.colliderect(target.rect)
+    hits = sweep(shot, (100, 125), [target], True)
+    assert [hit for _, hit in hits] == [target]
+    assert hits[0][0] < 0.5
@@ -0,0 +1,101 @@
+import os
+
+import pytest
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import pygame  # noqa: E402
+
+from game.controls import Action, Input, InputState  # noqa: E402
+
+
+@pytest.fixture
+def controls():
+    pygame.display.init()
+    pygame.display.set_mode((1, 1))
+    pygame.event.clear()
+    yield Input()
+    pygame.display.quit()
+
+
+def post(kind, **attributes):
+    pygame.event.post(pygame.event.Event(kind, **attributes))
+
+
+def key(kind, name):
+    post(kind, key=pygame.key.key_code(name))
+
+
+def tick(controls):
+    controls.pump()
+    return controls.sample()
+
+
+def test_keys_map_to_actions(controls):
+    key(pygame.KEYDOWN, "a")
+    key(pygame.KEYDOWN, "space")
+    key(pygame.KEYDOWN, "z")
+    state = tick(controls)
+    assert state.held == {Action.LEFT, Action.FIRE}
+    assert state.pressed == {Action.LEFT, Action.FIRE}
+    assert len(state.events) == 3
+    # Nothing new happened, the keys are still held.
+    state = tick(controls)
+    assert state.held == {Action.LEFT, Action.FIRE}
+    assert not state.pressed and not state.events
+    key(pygame.KEYUP, "a")
+    state = tick(controls)
+    assert state.held == {Action.FIRE}
+    assert state.released == {Action.LEFT}
+
+
+def test_tap_between_ticks_counts(controls):
+    key(pygame.KEYDOWN, "return")
+    key(pygame.KEYUP, "return")
+    state = tick(controls)
+    assert Action.CONFIRM not in state.held
+    assert state.active(Action.CONFIRM)
+    assert not tick(controls).active(Action.CONFIRM)
+
+
+def test_bind_replaces_keys(controls):
+    controls.bind(Action.FIRE, pygame.K_f, pygame.K_g)
+    key(pygame.KEYDOWN, "space")
+    assert not tick(controls).held
+    key(pygame.KEYDOWN, "g")
+    assert tick(controls).held == {Action.FIRE}
+
+
+def test_gamepad_buttons_and_hat(controls):
+    post(pygame.JOYBUTTONDOWN, button=0, instance_id=0, joy=0)
+    post(pygame.JOYHATMOTION, value=(-1, 1), hat=0, instance_id=0, joy=0)
+    state = tick(controls)
+    assert state.held == {Action.FIRE, Action.LEFT, Action.UP}
+    post(pygame.JOYBUTTONUP, button=0, instance_id=0, joy=0)
+    post(pygame.JOYHATMOTION, value=(0, 1), hat=0, instance_id=0, joy=0)
+    state = tick(controls)
+    assert state.held == {Action.UP}
+    assert state.released == {Action.FIRE, Action.LEFT}
+
+
+def test_stick_deadzone(controls):
+    controls.move(0.3, -0.9)
+    assert controls.sample().held == {Action.UP}
+    controls.move(0.9, 0.1)
+    assert controls.sample().held == {Action.RIGHT}
+
+
+@pytest.mark.parametrize("kind", [pygame.QUIT, pygame.WINDOWCLOSE])
+def test_closing_the_window_quits(controls, kind):
+    post(kind)
+    assert tick(controls).quit
+    assert not tick(controls).quit
+
+
+def test_waited_event_is_pumped(controls):
+    key(pygame.KEYDOWN, "p")
+    controls.wait(1)
+    assert tick(controls).held == {Action.PAUSE}
+    controls.clear()
+    assert controls.state is InputState.EMPTY
+    assert not tick(controls).held
@@ -0,0 +1,91 @@
+import os
+import random
+from types import SimpleNamespace
+
+import pytest
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import pygame  # noqa: E402
+
+from game.effects import Effects  # noqa: E402
+from game.entities import Registry  # noqa: E402
+from game.sprites import Enemy  # noqa: E402
+
+
+class Sound(object):
+    """Counts how many times it's played."""
+
+    def __init__(self):
+        self.plays = 0
+
+    def play(self):
+        self.plays += 1
+
+
+@pytest.fixture
+def game():
+    random.seed(1)
+    game = SimpleNamespace(
+        entities=Registry(),
+        display=SimpleNamespace(current_w=480, current_h=600),
+        enemies_img=[pygame.Surface((40, 40))] * 1200,
+        broadphase=SimpleNamespace(moved=lambda sprite: None),
+        score=0,
+        spawned=[],
+    )
+    game.effects = Effects(game, spawn_limit=3)
+    game.explode = lambda *args: game.spawned.append("explosion")
+    game.spawn_enemy = lambda: game.spawned.append("enemy")
+    return game
+
+
+def shot(game):
+    return pygame.sprite.Sprite(game.entities["shots"])
+
+
+def test_kill_is_scored_once_when_hit_twice_in_a_tick(game):
+    enemy = Enemy(game)
+    first, second = shot(game), shot(game)
+    game.effects.damage(enemy, enemy.endurance, first)
+    game.effects.damage(enemy, enemy.endurance, second)
+    game.effects.apply()
+    assert game.score == enemy.endurance
+    assert not enemy.alive()
+    # Only the shot that destroyed it is gone.
+    assert not first.alive()
+    assert second.alive()
+    game.effects.apply()
+    assert game.score == enemy.endurance
+
+
+def test_damage_adds_up_within_a_tick(game):
+    enemy = Enemy(game)
+    for _ in range(enemy.endurance - 1):
+        game.effects.damage(enemy, 1)
+    game.effects.apply()
+    assert enemy.alive() and game.score == 0
+    game.effects.damage(enemy, 1)
+    game.effects.apply()
+    assert not enemy.alive() and game.score == enemy.endurance
+
+
+def test_spawns_over_the_limit_wait_for_the_next_ticks(game):
+    spawned = []
+    for i in range(8):
+        game.effects.spawn(spawned.append, i)
+    game.effects.apply()
+    assert spawned == [0, 1, 2]
+    game.effects.apply()
+    assert spawned == [0, 1, 2, 3, 4, 5]
+    game.effects.apply()
+    assert spawned == list(range(8))
+
+
+def test_sounds_play_once_per_tick(game):
+    sound = Sound()
+    for _ in range(5):
+        game.effects.sound(sound)
+    game.effects.apply()
+    game.effects.apply()
+    assert sound.plays == 1
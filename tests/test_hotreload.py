@@ -0,0 +1,99 @@
+import os
+import time
+from types import SimpleNamespace
+
+import pytest
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import pygame  # noqa: E402
+
+from game import Spritesheet  # noqa: E402
+from game.hotreload import HotReload  # noqa: E402
+
+RED = (200, 10, 20)
+GREEN = (10, 200, 20)
+BLUE = (10, 20, 200)
+
+
+def save(file_name, left, right):
+    """Writes a spritesheet of two frames, bumping its modification time."""
+    image = pygame.Surface((20, 10))
+    image.fill(left, (0, 0, 10, 10))
+    image.fill(right, (10, 0, 10, 10))
+    pygame.image.save(image, file_name)
+    stamp = time.time_ns() + 10**9
+    os.utime(file_name, ns=(stamp, stamp))
+
+
+@pytest.fixture
+def game(tmp_path):
+    pygame.display.init()
+    pygame.display.set_mode((1, 1))
+    file_name = str(tmp_path / "sheet.png")
+    save(file_name, RED, GREEN)
+    (tmp_path / "sheet.xml").write_text(
+        "<TextureAtlas>"
+        '<sprite n="a.png" x="0" y="0" w="10" h="10"/>'
+        '<sprite n="b.png" x="10" y="0" w="10" h="10"/>'
+        "</TextureAtlas>"
+    )
+    sheet = Spritesheet(file_name)
+    frames = [sheet.get_image("a.png"), sheet.get_image("b.png")]
+    sprite = pygame.sprite.Sprite()
+    sprite.image = frames[0]
+    sprite.rect = sprite.image.get_rect(center=(50, 50))
+    sprite.frames = list(frames)
+    game = SimpleNamespace(
+        spritesheet=SimpleNamespace(file_name=None),
+        formats=SimpleNamespace(choose=lambda name, frames: frames),
+        laser_img=frames,
+        bosses_img=[],
+        meteors_img=[],
+        sprites=[sprite],
+        sprite=sprite,
+        rewind=SimpleNamespace(segments=[], replace_images=lambda r: None),
+        projectiles=SimpleNamespace(load_frames=lambda: None),
+    )
+    game.frame_sets = lambda: [("laser", sheet, ["a.png", "b.png"])]
+    yield game
+    pygame.display.quit()
+
+
+def reload(hot_reload):
+    """Runs frames until the changed files are loaded and swapped in."""
+    hot_reload.frame()
+    while hot_reload.pending is not None:
+        hot_reload.pending.exception(timeout=5)
+        hot_reload.frame()
+
+
+def test_only_changed_frames_are_swapped(game):
+    hot_reload = HotReload(game, True, interval=0)
+    old = list(game.laser_img)
+    frames = game.laser_img
+    save(game.frame_sets()[0][1].file_name, BLUE, GREEN)
+    reload(hot_reload)
+    hot_reload.close()
+    # The set is changed in place.
+    assert game.laser_img is frames
+    assert game.laser_img[0] is not old[0]
+    assert game.laser_img[0].get_at((5, 5))[:3] == BLUE
+    assert game.laser_img[1] is old[1]
+    assert game.sprite.image is game.laser_img[0]
+    assert game.sprite.frames == game.laser_img
+
+
+def test_broken_file_is_loaded_once_fixed(game):
+    hot_reload = HotReload(game, True, interval=0)
+    old = list(game.laser_img)
+    file_name = game.frame_sets()[0][1].file_name
+    with open(file_name, "wb") as f:
+        f.write(b"half written")
+    reload(hot_reload)
+    assert game.laser_img == old
+    save(file_name, RED, BLUE)
+    reload(hot_reload)
+    hot_reload.close()
+    assert game.laser_img[0] is old[0]
+    assert game.laser_img[1].get_at((5, 5))[:3] == BLUE
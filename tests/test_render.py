@@ -0,0 +1,57 @@
+import os
+
+import pytest
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import pygame  # noqa: E402
+
+from game.render import TextureRenderer  # noqa: E402
+
+
+@pytest.fixture
+def renderer():
+    pygame.display.init()
+    pygame.display.set_mode((1, 1), pygame.HIDDEN)
+    surface = pygame.Surface((100, 200), pygame.SRCALPHA)
+    try:
+        renderer = TextureRenderer(surface, "test")
+    except (ImportError, RuntimeError) as e:
+        pytest.skip(f"No SDL renderer: {e}")
+    yield renderer
+    pygame.display.quit()
+
+
+def test_only_drawn_regions_are_uploaded(renderer):
+    renderer.surface.fill((255, 0, 0, 255), (10, 5, 4, 4))
+    renderer.surface.fill((0, 255, 0, 255), (60, 40, 8, 30))
+    renderer.surface.fill((0, 0, 255, 255), (20, 150, 2, 2))
+    assert renderer.changed() == [
+        pygame.Rect(10, 0, 58, 96),
+        pygame.Rect(20, 128, 2, 32),
+    ]
+    renderer.present()
+    assert renderer.frame_uploads == 2
+    assert renderer.frame_upload_area == 58 * 96 + 2 * 32
+    assert not renderer.changed()
+    window = renderer.renderer.to_surface()
+    assert window.get_at((61, 41))[:3] == (0, 255, 0)
+    assert window.get_at((21, 151))[:3] == (0, 0, 255)
+    assert window.get_at((30, 30))[:3] == (0, 0, 0)
+    # Nothing drawn, nothing uploaded.
+    renderer.present()
+    assert renderer.frame_uploads == 0
+
+
+def test_static_images_are_uploaded_once(renderer):
+    background = pygame.Surface((100, 200))
+    background.fill((0, 0, 90))
+    for _ in range(3):
+        renderer.copy(background, (0, 0))
+        renderer.surface.fill((255, 255, 255, 255), (0, 0, 10, 10))
+        renderer.present()
+        assert renderer.frame_upload_area == 10 * 32
+    assert len(renderer.uploaded) == 1
+    window = renderer.renderer.to_surface()
+    assert window.get_at((50, 100))[:3] == (0, 0, 90)
+    assert window.get_at((5, 5))[:3] == (255, 255, 255)
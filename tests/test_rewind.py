@@ -0,0 +1,237 @@
+import os
+import random
+from types import SimpleNamespace
+
+import pytest
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import pygame  # noqa: E402
+
+from game.projectiles import Projectiles  # noqa: E402
+from game.rewind import Rewind  # noqa: E402
+from game.bosses import load_bosses  # noqa: E402
+from game.entities import Registry  # noqa: E402
+from game.sprites import Boss, Player, ScriptedBoss, Shield  # noqa: E402
+
+IMAGES = [pygame.Surface(size) for size in ((10, 12), (24, 20), (40, 36))]
+
+
+class Body(pygame.sprite.Sprite):
+    """A sprite with every field the rewind packs."""
+
+    def __init__(self, number, *groups):
+        super().__init__(*groups)
+        self.number = number
+        self.image = random.choice(IMAGES)
+        self.rect = self.image.get_rect(
+            center=(random.randint(0, 480), random.randint(0, 600))
+        )
+        for name in Rewind.ATTRIBUTES:
+            setattr(self, name, False if name in Rewind.FLAGS else 0)
+        self.state = Boss.State.ARRIVING
+        self.target = None
+
+    def update(self):
+        self.rect.move_ip(self.speedx, int(self.speedy))
+        self.speedx = random.randint(-8, 8)
+        self.speedy = random.uniform(-8, 8)
+        self.subx = random.random()
+        for name in Rewind.ATTRIBUTES[4:]:
+            if name in Rewind.FLAGS:
+                setattr(self, name, random.random() < 0.5)
+            elif random.random() < 0.3:
+                setattr(self, name, random.randint(-100, 100))
+        self.state = random.choice(list(Boss.State))
+        self.target = random.choice(
+            (None, (random.randint(0, 480), None), self.rect.center)
+        )
+        if random.random() < 0.2:
+            self.image = random.choice(IMAGES)
+            self.rect = self.image.get_rect(center=self.rect.center)
+
+
+def snapshot(game):
+    """Get everything the rewind restores."""
+    player = game.player
+    header = (
+        game.score,
+        game.level,
+        game.enemies_remaining,
+        player.lives,
+        player.energy,
+        player.cannon,
+        player.hidden,
+    )
+    shots = game.projectiles
+    shots = tuple(
+        a[: shots.count].tolist()
+        for a in (shots.pos, shots.vel, shots.age, shots.impact)
+    )
+    return (
+        header,
+        shots,
+        sorted(
+            (
+                sprite.number,
+                sprite.rect.center,
+                sprite.rect.size,
+                sprite.speedx,
+                sprite.speedy,
+                sprite.damage,
+                sprite.rot,
+                sprite.animating,
+                id(sprite.image),
+                sorted(id(group) for group in sprite.groups()),
+            )
+            for sprite in game.sprites
+        ),
+    )
+
+
+@pytest.fixture
+def game():
+    random.seed(1)
+    game = SimpleNamespace(
+        sprites=pygame.sprite.Group(),
+        enemies=pygame.sprite.Group(),
+        score=0,
+        level=0,
+        enemies_remaining=50,
+        player=SimpleNamespace(lives=3, energy=100, cannon=1, hidden=False),
+        laser_img=[pygame.Surface((8, 20)) for _ in range(8)],
+        effects=SimpleNamespace(sound=lambda sound: None),
+        shot_sfx=None,
+    )
+    game.projectiles = Projectiles(game, 64)
+    game.spawned = 0
+    for _ in range(20):
+        spawn(game)
+    return game
+
+
+def spawn(game):
+    groups = [game.sprites]
+    if random.random() < 0.5:
+        groups.append(game.enemies)
+    Body(game.spawned, *groups)
+    game.spawned += 1
+
+
+def tick(game):
+    game.sprites.update()
+    shots = game.projectiles
+    n = shots.count
+    shots.pos[:n] += shots.vel[:n]
+    shots.age[:n] += 1
+    shots.impact[:n][shots.impact[:n] >= 0] += 1
+    if n and random.random() < 0.2:
+        shots.impact[random.randrange(n)] = 0
+    # Shots come and go without starting new segments.
+    if random.random() < 0.5:
+        shots.fire(
+            (random.uniform(0, 480), random.uniform(0, 600)),
+            (random.uniform(-3, 3), random.uniform(2, 10)),
+        )
+    if n and random.random() < 0.2:
+        shots.count -= 1
+    game.player.energy -= random.random() < 0.3
+    game.player.hidden = random.random() < 0.1
+    # Kills and spawns start new segments.
+    if random.random() < 0.1:
+        sprite = random.choice(game.sprites.sprites())
+        sprite.kill()
+        game.score += 10
+        game.enemies_remaining -= 1
+    if random.random() < 0.1:
+        spawn(game)
+
+
+def test_step_back_restores_every_tick(game):
+    rewind = Rewind(game, seconds=60, memory=2**30, keyframe=16)
+    snapshots = []
+    for _ in range(300):
+        tick(game)
+        rewind.record()
+        snapshots.append(snapshot(game))
+    assert len(rewind.segments) > 300 // 16
+    for expected in reversed(snapshots[:-1]):
+        assert rewind.step_back()
+        assert snapshot(game) == expected
+    assert not rewind.step_back()
+
+
+def test_recording_resumes_after_stepping_back(game):
+    rewind = Rewind(game, seconds=60, memory=2**30, keyframe=16)
+    snapshots = []
+    for _ in range(100):
+        tick(game)
+        rewind.record()
+        snapshots.append(snapshot(game))
+    for _ in range(40):
+        rewind.step_back()
+    del snapshots[-40:]
+    for _ in range(100):
+        tick(game)
+        rewind.record()
+        snapshots.append(snapshot(game))
+    for expected in reversed(snapshots[:-1]):
+        assert rewind.step_back()
+        assert snapshot(game) == expected
+
+
+def test_step_back_restores_bosses_and_shields():
+    entities = Registry()
+    game = SimpleNamespace(
+        entities=entities,
+        sprites=entities.all,
+        score=0,
+        level=0,
+        enemies_remaining=50,
+        display=SimpleNamespace(current_w=480, current_h=600),
+        player_img=[pygame.Surface((40, 40))],
+        shield_img=[pygame.Surface((60, 60)), pygame.Surface((80, 80))],
+        bosses_img=[pygame.Surface((100, 80))] * 3,
+        bosses_def=load_bosses(),
+        controller=None,
+        projectiles=SimpleNamespace(pack=bytes, restore=lambda data: None),
+    )
+    game.enemy_shot = lambda pos, speed: None
+    game.player = player = Player(game)
+    boss = ScriptedBoss(game, 1)
+    player.shield = True
+    shield = Shield(game, player)
+    rewind = Rewind(game, seconds=60, memory=2**30, keyframe=16)
+
+    def state():
+        return (
+            player.shield,
+            shield.alive(),
+            shield.frame,
+            shield.age,
+            shield.radius,
+            boss.rect.center,
+            boss.state,
+            boss.target,
+            boss.waypoint,
+            boss.attack,
+            boss.volleys,
+            boss.fired,
+            boss.reloading,
+            boss.cooldown,
+            boss.reload,
+        )
+
+    states = []
+    for _ in range(600):
+        boss.update()
+        if shield.alive():
+            shield.update()
+        rewind.record()
+        states.append(state())
+    # The shield went down and the boss went through every phase.
+    assert not shield.alive() and not player.shield
+    assert boss.attack > 1
+    for expected in reversed(states[:-1]):
+        assert rewind.step_back()
+        assert state() == expected
@@ -0,0 +1,63 @@
+import json
+import socketserver
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from game.telemetry import Collector, Telemetry
+
+
+@pytest.fixture
+def game():
+    return SimpleNamespace(
+        entities=SimpleNamespace(counts=lambda: {"mobs": 3, "bullets": 1}),
+        garbage=SimpleNamespace(total=0.0, unsafe=0),
+        load_time=0.25,
+    )
+
+
+@pytest.fixture
+def server():
+    """Runs the stand-in collector on a free port."""
+    server = socketserver.ThreadingTCPServer(("localhost", 0), Collector)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+    thread.join()
+
+
+def export(game, server, format, snapshots, capsys):
+    """Sends snapshots to the collector and gets what it printed."""
+    target = "tcp://localhost:%d" % server.server_address[1]
+    telemetry = Telemetry(game, target, format, interval=0)
+    for _ in range(snapshots - 1):
+        telemetry.frame(0.005)
+    # Closing publishes the last snapshot.
+    telemetry.close()
+    assert telemetry.dropped == 0
+    # Waits for the handlers, so everything sent has been printed.
+    server.shutdown()
+    server.server_close()
+    return capsys.readouterr().out.splitlines()
+
+
+def test_openmetrics_stream_has_one_eof(game, server, capsys):
+    lines = export(game, server, "openmetrics", 3, capsys)
+    assert lines.count("# EOF") == 1
+    assert lines[-1] == "# EOF"
+    assert lines.count("# TYPE game_frame_seconds histogram") == 3
+    assert 'game_sprites{group="mobs"} 3' in "\n".join(lines)
+    counts = [line for line in lines if line.startswith("game_frame_sec")]
+    assert counts[-2].split()[:2] == ["game_frame_seconds_count", "2"]
+
+
+def test_ndjson_stream(game, server, capsys):
+    lines = export(game, server, "ndjson", 2, capsys)
+    snapshots = [json.loads(line) for line in lines]
+    assert [snapshot["frames"] for snapshot in snapshots] == [1, 1]
+    assert snapshots[0]["frame_buckets"][2] == 1
+    assert snapshots[0]["sprites"] == {"mobs": 3, "bullets": 1}
+    assert snapshots[0]["asset_load_seconds"] == 0.25
@@ -0,0 +1,74 @@
+import itertools
+import os
+from types import SimpleNamespace
+
+import pytest
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import pygame  # noqa: E402
+
+from game.bosses import load_bosses  # noqa: E402
+from game.entities import Registry  # noqa: E402
+from game.sprites import Boss, ScriptedBoss, Shield, ticks  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def paused(monkeypatch):
+    """Makes a minute of wall-clock time pass between every two ticks."""
+    clock = itertools.count(0, 60000)
+    monkeypatch.setattr(pygame.time, "get_ticks", lambda: next(clock))
+
+
+@pytest.fixture
+def game():
+    return SimpleNamespace(
+        entities=Registry(),
+        display=SimpleNamespace(current_w=480, current_h=600),
+        player=SimpleNamespace(
+            rect=pygame.Rect(220, 500, 40, 40), shield=True
+        ),
+        shield_img=[pygame.Surface((60, 60)), pygame.Surface((80, 80))],
+        bosses_img=[pygame.Surface((100, 80))],
+        bosses_def=load_bosses(),
+        shots=[],
+    )
+
+
+def test_shield_lasts_its_ticks(game):
+    shield = Shield(game, game.player)
+    for _ in range(ticks(3000) - 1):
+        shield.update()
+    assert shield.image is game.shield_img[1]
+    shield.update()
+    assert shield.image is game.shield_img[0]
+    for _ in range(ticks(6000) - ticks(3000) - 1):
+        shield.update()
+    assert shield.alive() and game.player.shield
+    shield.update()
+    assert not shield.alive() and not game.player.shield
+
+
+def test_boss_fires_volleys_a_tick_interval_apart(game):
+    boss = ScriptedBoss(game, 0)
+    game.enemy_shot = lambda pos, speed: game.shots.append(boss.volleys)
+    boss.state = Boss.State.ATTACKING
+    boss.target = boss.rect.center
+    attack = boss.definition["attacks"][0]
+    fired = []
+    for tick in range((attack["volleys"] - 1) * ticks(attack["interval"]) + 1):
+        shots = len(game.shots)
+        boss.update()
+        if len(game.shots) > shots:
+            fired.append(tick)
+    assert len(fired) == attack["volleys"]
+    assert {b - a for a, b in zip(fired, fired[1:])} == {
+        ticks(attack["interval"])
+    }
+    boss.update()
+    assert boss.reloading
+    for _ in range(ticks(boss.definition["reload"])):
+        assert boss.reloading
+        boss.update()
+    assert not boss.reloading
+    assert boss.state == Boss.State.SEEKING